@@ -1,5 +1,4 @@
 import os
-import requests
 from flask import Flask, jsonify, request
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask_cors import CORS
@@ -18,6 +17,11 @@ NGROK_HEADERS = {"ngrok-skip-browser-warning": "true", "User-Agent": "stitch-das
 # Helpers
 # ─────────────────────────────────────────────────────────────
 
+def _http():
+    """requests se importa en la primera petición (cold start de Vercel más corto)."""
+    import requests
+    return requests
+
 def fetch_status(url, label):
     """Fetches /api/status from a bot URL. Returns a dict with meta info."""
     if not url:
@@ -25,7 +29,7 @@ def fetch_status(url, label):
     try:
         # Añadir header ngrok si la URL es de ngrok
         headers = NGROK_HEADERS if "ngrok" in url else {}
-        r = requests.get(f"{url}/api/status", timeout=TIMEOUT, headers=headers)
+        r = _http().get(f"{url}/api/status", timeout=TIMEOUT, headers=headers)
         data = r.json()
         data["instance"]  = label
         data["reachable"] = True
@@ -36,14 +40,14 @@ def fetch_status(url, label):
 def proxy_get(url, path):
     try:
         headers = NGROK_HEADERS if "ngrok" in url else {}
-        r = requests.get(f"{url}{path}", timeout=TIMEOUT, headers=headers)
+        r = _http().get(f"{url}{path}", timeout=TIMEOUT, headers=headers)
         return jsonify(r.json())
     except Exception as e:
         return jsonify({"status": "error", "message": str(e), "url": url}), 502
 
 def proxy_post(url, path):
     try:
-        r = requests.post(f"{url}{path}", json=request.json, timeout=TIMEOUT)
+        r = _http().post(f"{url}{path}", json=request.json, timeout=TIMEOUT)
         return jsonify(r.json())
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 502
@@ -24,6 +24,9 @@ GITHUB_BRANCH = os.getenv("GITHUB_BRANCH", "main")
 BOT_DIR       = Path(__file__).parent
 STATE_FILE    = BOT_DIR / "autoupdate_state.json"
 CHECK_INTERVAL = 10 * 60  # 10 minutos
+LOCK_FILE      = BOT_DIR / "bot_mt5.lock"   # Lock de trading (ver handoff.py)
+HANDOFF_TIMEOUT = 180  # Máximo para que el bot nuevo tome el relevo
+HANDOFF_GRACE   = 15   # Margen para la salida ordenada del bot anterior
 
 _SSL = ssl.create_default_context()
 _SSL.check_hostname = False
@@ -85,33 +88,66 @@ def git_pull() -> bool:
         return False
 
 
-def restart_bot():
-    """Reinicia bot y dashboard. Lanza un helper que espera y relanza auto_update."""
-    log("🔄 Reiniciando procesos...")
+def _lock_pid():
+    """Pid de la instancia que tiene el lock de trading (handoff.py)."""
     try:
-        my_pid = os.getpid()
+        return json.loads(LOCK_FILE.read_text(encoding="utf-8")).get("pid")
+    except Exception:
+        return None
 
-        # Matar solo bot_mt5 y dashboard_mt5, NO auto_update ni este proceso
-        for pattern in ["bot_mt5.py", "dashboard_mt5.py"]:
-            subprocess.run(
-                ["wmic", "process", "where", f"CommandLine like '%{pattern}%'", "delete"],
-                capture_output=True
-            )
-        time.sleep(2)
-        log("   ✅ bot_mt5 y dashboard detenidos")
 
-        # Relanzar dashboard y bot
-        for script in ["dashboard_mt5.py", "bot_mt5.py"]:
-            if (BOT_DIR / script).exists():
-                subprocess.Popen(
-                    [sys.executable, str(BOT_DIR / script)],
-                    cwd=str(BOT_DIR),
-                    creationflags=subprocess.CREATE_NEW_PROCESS_GROUP
-                )
-                log(f"   ✅ {script} relanzado")
-                time.sleep(3)
+def _kill_processes(pattern: str, except_pid: int | None = None):
+    query = f"CommandLine like '%{pattern}%'"
+    if except_pid:
+        query += f" and ProcessId != {except_pid}"
+    subprocess.run(["wmic", "process", "where", query, "delete"], capture_output=True)
+
 
-        log("   ✅ Reinicio completo — auto_update sigue corriendo")
+def restart_bot():
+    """
+    Relevo sin downtime: el bot nuevo arranca con --handoff, calienta cachés y
+    avisa que está listo; el viejo drena y le transfiere el lock de trading.
+    Solo si el relevo no llega en HANDOFF_TIMEOUT se mata al proceso anterior.
+    """
+    log("🔄 Reiniciando procesos (handoff)...")
+    try:
+        # Dashboard: no opera → reinicio directo
+        _kill_processes("dashboard_mt5.py")
+        time.sleep(2)
+        if (BOT_DIR / "dashboard_mt5.py").exists():
+            subprocess.Popen(
+                [sys.executable, str(BOT_DIR / "dashboard_mt5.py")],
+                cwd=str(BOT_DIR),
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP
+            )
+            log("   ✅ dashboard_mt5.py relanzado")
+
+        # Bot: el nuevo arranca ANTES de parar el viejo
+        new_bot = subprocess.Popen(
+            [sys.executable, str(BOT_DIR / "bot_mt5.py"), "--handoff"],
+            cwd=str(BOT_DIR),
+            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+        log(f"   🚀 bot_mt5.py nuevo lanzado (pid {new_bot.pid}) — esperando relevo...")
+
+        deadline = time.time() + HANDOFF_TIMEOUT
+        while time.time() < deadline:
+            if new_bot.poll() is not None:
+                log(f"   ❌ El bot nuevo terminó (code {new_bot.returncode}) — el anterior sigue operando")
+                return
+            if _lock_pid() == new_bot.pid:
+                log("   ✅ Relevo completado: el bot nuevo tiene el lock de trading")
+                # Margen para que el anterior termine su salida ordenada; después se
+                # retira cualquier resto (p.ej. una versión previa sin lock)
+                time.sleep(HANDOFF_GRACE)
+                _kill_processes("bot_mt5.py", except_pid=new_bot.pid)
+                return
+            time.sleep(2)
+
+        # Fallback: el anterior no respondió (versión sin handoff o colgado)
+        log(f"   ⚠️ Sin relevo en {HANDOFF_TIMEOUT}s — deteniendo el bot anterior")
+        _kill_processes("bot_mt5.py", except_pid=new_bot.pid)
+        log("   ✅ Bot anterior detenido; el nuevo toma el lock al quedar huérfano")
     except Exception as e:
         log(f"   ⚠️ Error al reiniciar: {e}")
 
@@ -1,16 +1,23 @@
 """
 backtest.py — Motor de backtesting con datos históricos de Binance
-Simula la estrategia EMA + RSI + ADX barra a barra
+Simula la estrategia EMA + RSI + ADX barra a barra, con el filtro de funding
+de strategy.check_signal y el coste de funding de las posiciones abiertas
+(historia de funding_history.py).
 """
 
 import argparse
+import numpy as np
 import pandas as pd
 from tabulate import tabulate
 from binance.client import Client
 
 import config
+from funding_history import FundingLedger, funding_asof, get_funding_history
 from indicators import add_indicators
+from kline_downloader import INTERVAL_MS, get_history
+from kline_parser import klines_to_frame
 from risk_manager import calc_sl_tp
+from strategy import FUNDING_RATE_THRESHOLD
 import logger
 
 
@@ -18,29 +25,43 @@ def download_historical_data(symbol: str, interval: str, limit: int = 1000) -> p
     """
     Descarga datos históricos de Binance Futures (sin API key, datos públicos).
     Usa el endpoint de Futuros para soportar pares como XAUUSDT que no están en Spot.
+
+    `limit` no tiene tope: kline_downloader pagina en paralelo y cachea la
+    historia en disco (solo se descargan las velas nuevas).
     """
+    try:
+        df = get_history(symbol, interval, limit=limit)
+        if not df.empty:
+            return df
+    except Exception as e:
+        logger.warning(f"{symbol}: descarga de Futuros fallida ({e}) — probando Spot")
+    # Fallback a spot si el par no está en futuros (máx. 1000 velas)
+    config.use_binance_endpoint()
     client = Client("", "")  # Sin auth para datos públicos
-    # Usar futures_klines para soportar XAUUSDT y otros pares solo disponibles en Futuros
+    raw = client.get_klines(symbol=symbol, interval=interval, limit=min(limit, 1000))
+    return klines_to_frame(raw)
+
+
+def load_funding(symbol: str, interval: str, df: pd.DataFrame) -> tuple[pd.Series, FundingLedger] | None:
+    """
+    Funding alineado con las velas: tasa conocida al CIERRE de cada vela (la
+    señal se evalúa ahí) y libro de pagos. None si no hay historia (p. ej. Spot).
+    """
     try:
-        raw = client.futures_klines(symbol=symbol, interval=interval, limit=limit)
-    except Exception:
-        # Fallback a spot si el par no está en futuros
-        raw = client.get_klines(symbol=symbol, interval=interval, limit=limit)
-    df = pd.DataFrame(raw, columns=[
-        "timestamp", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades",
-        "taker_buy_base", "taker_buy_quote", "ignore"
-    ])
-    df = df[["timestamp", "open", "high", "low", "close", "volume"]].copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    for col in ["open", "high", "low", "close", "volume"]:
-        df[col] = df[col].astype(float)
-    df.set_index("timestamp", inplace=True)
-    return df
+        start = df.index[0] - pd.Timedelta(days=1)   # Incluye la liquidación previa a la primera vela
+        funding = get_funding_history(symbol, start=start.to_pydatetime())
+    except Exception as e:
+        logger.warning(f"{symbol}: sin historia de funding ({e}) — backtest sin funding")
+        return None
+    if funding.empty:
+        logger.warning(f"{symbol}: sin historia de funding — backtest sin funding")
+        return None
+    rates = funding_asof(df.index, funding, delay=pd.Timedelta(milliseconds=INTERVAL_MS.get(interval, 0)))
+    return rates, FundingLedger(funding, df["close"])
 
 
 def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
-                 initial_capital: float = 10000.0) -> dict:
+                 initial_capital: float = 10000.0, use_funding: bool = True) -> dict:
     """
     Ejecuta el backtest para un par y retorna las métricas.
 
@@ -49,6 +70,7 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
         interval:        Timeframe
         limit:           Número de velas históricas
         initial_capital: Capital inicial en USDT
+        use_funding:     Aplicar el filtro de funding y cobrar/pagar funding
 
     Returns:
         Diccionario con métricas del backtest
@@ -66,6 +88,16 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
     df = add_indicators(df)
     logger.info(f"  Velas disponibles tras indicadores: {len(df)}")
 
+    # ── Funding: filtro de sesgo precalculado para toda la historia ───────
+    funding = load_funding(symbol, interval, df) if use_funding else None
+    ledger = None
+    block_long = block_short = np.zeros(len(df), dtype=bool)
+    if funding is not None:
+        rates, ledger = funding
+        block_long = (rates >= FUNDING_RATE_THRESHOLD).to_numpy()     # Longs pagan → sin LONG
+        block_short = (rates <= -FUNDING_RATE_THRESHOLD).to_numpy()   # Shorts pagan → sin SHORT
+    blocked = 0
+
     # ── Simulación barra a barra ──────────────────────────────────────────
     capital    = initial_capital
     trades     = []
@@ -75,6 +107,7 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
     tp_price   = 0.0
     trade_side = ""
     qty        = 0.0
+    entry_time = None
 
     for i in range(1, len(df) - 1):
         row      = df.iloc[i]      # Vela cerrada (señal)
@@ -98,6 +131,9 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
                     pnl = (exit_price - entry_price) * qty
                 else:
                     pnl = (entry_price - exit_price) * qty
+                # Liquidaciones de funding mientras la posición estuvo abierta
+                funding_pnl = ledger.pnl(trade_side, qty, entry_time, next_row.name) if ledger is not None else 0.0
+                pnl += funding_pnl
 
                 capital += pnl
                 trades.append({
@@ -109,6 +145,7 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
                     "sl":        sl_price,
                     "tp":        tp_price,
                     "qty":       qty,
+                    "funding":   round(funding_pnl, 2),
                     "pnl":       round(pnl, 2),
                     "result":    result,
                     "capital":   round(capital, 2),
@@ -138,6 +175,9 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
 
         if signal is None:
             continue
+        if (signal == "LONG" and block_long[i]) or (signal == "SHORT" and block_short[i]):
+            blocked += 1
+            continue
 
         # ── Abrir posición ────────────────────────────────────────────────
         entry_price = next_row["open"]  # Entrada al open de la siguiente vela
@@ -150,11 +190,12 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
 
         in_trade   = True
         trade_side = signal
+        entry_time = next_row.name
 
     # ── Métricas ──────────────────────────────────────────────────────────
     if not trades:
         logger.warning(f"{symbol}: Sin operaciones en el backtest.")
-        return {"symbol": symbol, "trades": 0}
+        return {"symbol": symbol, "trades": 0, "funding_blocked": blocked}
 
     trades_df = pd.DataFrame(trades)
     wins      = trades_df[trades_df["result"] == "WIN"]
@@ -183,6 +224,8 @@ def run_backtest(symbol: str, interval: str = "1h", limit: int = 1000,
         "avg_win":       round(avg_win, 2),
         "avg_loss":      round(avg_loss, 2),
         "max_drawdown":  round(max_drawdown, 2),
+        "funding_pnl":   round(trades_df["funding"].sum(), 2),
+        "funding_blocked": blocked,
         "final_capital": round(capital, 2),
     }
 
@@ -200,11 +243,11 @@ def print_results(results: list[dict]):
         return
 
     headers = ["Par", "Trades", "Win Rate", "PnL Total", "Profit Factor",
-               "Max DD", "Capital Final"]
+               "Max DD", "Funding", "Bloq. Funding", "Capital Final"]
     rows = []
     for r in results:
         if r.get("trades", 0) == 0:
-            rows.append([r["symbol"], 0, "-", "-", "-", "-", "-"])
+            rows.append([r["symbol"], 0, "-", "-", "-", "-", "-", r.get("funding_blocked", "-"), "-"])
             continue
         rows.append([
             r["symbol"],
@@ -213,6 +256,8 @@ def print_results(results: list[dict]):
             f"${r['total_pnl']:+.2f}",
             r["profit_factor"],
             f"{r['max_drawdown']:.1f}%",
+            f"${r['funding_pnl']:+.2f}",
+            r["funding_blocked"],
             f"${r['final_capital']:.2f}",
         ])
 
@@ -229,13 +274,14 @@ if __name__ == "__main__":
     parser.add_argument("--interval", default="1h",    help="Timeframe (default: 1h)")
     parser.add_argument("--limit",    default=1000, type=int, help="Número de velas (default: 1000)")
     parser.add_argument("--capital",  default=10000.0, type=float, help="Capital inicial USDT (default: 10000)")
+    parser.add_argument("--no-funding", action="store_true", help="Ignorar el funding (filtro y pagos)")
     args = parser.parse_args()
 
     symbols = [args.symbol] if args.symbol else config.SYMBOLS
     all_results = []
 
     for sym in symbols:
-        result = run_backtest(sym, args.interval, args.limit, args.capital)
+        result = run_backtest(sym, args.interval, args.limit, args.capital, use_funding=not args.no_funding)
         all_results.append(result)
 
     print_results(all_results)
@@ -10,7 +10,7 @@ import argparse
 from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 import pandas as pd
-from binance.client import Client
+from kline_downloader import get_history
 
 # ── Parámetros ────────────────────────────────────────────────────────────
 ASIAN_START_H  = 0
@@ -32,25 +32,18 @@ TRAIL_DISTANCE_MULT = 0.5  # Trailing stop a 0.5× rango de distancia
 EOD_CLOSE_H        = 16    # Hora UTC para cierre forzado (fin sesión NY)
 
 SYMBOL = "XAUUSDT"
-client = Client("", "")
 
 def download(symbol, interval, days):
     print(f"📥 Descargando {days}d de {symbol} {interval}...")
     end = datetime.now(timezone.utc)
     start = end - timedelta(days=days)
     try:
-        raw = client.futures_historical_klines(symbol, interval,
-              start.strftime("%d %b %Y"), end.strftime("%d %b %Y"))
+        df = get_history(symbol, interval, start=start, end=end)   # Paralelo + caché en disco
     except Exception as e:
         print(f"❌ Error: {e}"); return pd.DataFrame()
-    if not raw:
+    if df.empty:
         print("❌ Sin datos"); return pd.DataFrame()
-    df = pd.DataFrame(raw, columns=["ts","open","high","low","close","volume",
-         "ct","qv","tr","tbb","tbq","ig"])
-    df = df[["ts","open","high","low","close","volume"]].copy()
-    df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
-    for c in ["open","high","low","close","volume"]: df[c] = df[c].astype(float)
-    df.set_index("ts", inplace=True)
+    df.index = df.index.tz_localize("UTC").rename("ts")
     print(f"✅ {len(df)} velas ({df.index[0].date()} → {df.index[-1].date()})")
     return df
 
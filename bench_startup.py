@@ -0,0 +1,104 @@
+"""
+bench_startup.py — Benchmark de tiempo de importación (arranque / cold start)
+=============================================================================
+Mide con `python -X importtime` lo que cuesta importar cada punto de entrada
+(bot_mt5, dashboards, función de Vercel) en un intérprete nuevo y lo compara
+con un presupuesto en ms. Sale con código 1 si alguno se pasa, para poder
+usarlo antes de desplegar:
+
+    python bench_startup.py                 # todos los módulos, 3 repeticiones
+    python bench_startup.py bot_mt5 -n 5    # solo bot_mt5
+    python bench_startup.py --top 15        # más imports lentos por módulo
+
+Se toma la MEDIANA de N ejecuciones (la primera suele pagar la caché de disco).
+Los presupuestos se pueden ajustar con STARTUP_BUDGET_<MODULO>_MS, p.ej.
+STARTUP_BUDGET_BOT_MT5_MS=1500.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# módulo → presupuesto por defecto (ms)
+BUDGETS_MS = {
+    "bot_mt5":       1200,
+    "dashboard_mt5": 900,
+    "dashboard":     700,
+    "indicators":    500,
+    "api.index":     400,
+}
+
+# Módulos que solo deberían cargarse bajo demanda
+LAZY_MODULES = ("pandas_ta", "analyze_losses", "strategy_eurusd", "binance", "requests")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def budget_for(module: str) -> float:
+    env = f"STARTUP_BUDGET_{module.replace('.', '_').upper()}_MS"
+    return float(os.getenv(env, BUDGETS_MS.get(module, 1000)))
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """[(módulo, self_us, cumulative_us, profundidad)] en el orden de -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+def measure(module: str) -> tuple[float, list]:
+    """Importa `module` en un proceso nuevo. Retorna (ms totales, filas de importtime)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    rows = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "error"
+        raise RuntimeError(error)
+    # Las filas de profundidad 0 son imports de primer nivel (incluido el propio módulo)
+    total_us = sum(cum for _, _, cum, depth in rows if depth == 0)
+    return total_us / 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de importación con presupuesto")
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS_MS))
+    parser.add_argument("-n", "--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="imports más lentos a mostrar")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        budget = budget_for(module)
+        try:
+            runs = [measure(module) for _ in range(max(1, args.runs))]
+        except RuntimeError as e:
+            print(f"⚠️  {module:<15} no importable: {e}")
+            failed = True
+            continue
+        runs.sort(key=lambda r: r[0])
+        total_ms, rows = runs[len(runs) // 2]
+        spread = statistics.pstdev(r[0] for r in runs)
+        ok = total_ms <= budget
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {module:<15} {total_ms:7.0f} ms  (±{spread:.0f})  presupuesto {budget:.0f} ms")
+
+        loaded = {name.split(".")[0] for name, *_ in rows}
+        eager = [m for m in LAZY_MODULES if m in loaded]
+        if eager:
+            print(f"   ⚠️  cargados al importar (deberían ser diferidos): {', '.join(eager)}")
+        for name, self_us, cum_us, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+            print(f"   {cum_us / 1000:7.1f} ms  {'  ' * depth}{name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
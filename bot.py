@@ -12,18 +12,23 @@ import logger
 from exchange import BinanceFuturesExchange
 from strategy import check_signal, get_entry_price, get_atr
 from risk_manager import calc_sl_tp, calc_position_size, apply_leverage, validate_risk
+from scanner import UniverseScanner
 
 # Intervalo en segundos entre ciclos del bot
 # 1h = 3600s, pero chequeamos cada 60s para no perdernos el cierre de vela
 CHECK_INTERVAL_SECONDS = 60
 
 
-def run_cycle(exchange: BinanceFuturesExchange, dry_run: bool = False):
+def run_cycle(exchange: BinanceFuturesExchange, dry_run: bool = False,
+              scanner: UniverseScanner | None = None):
     """
     Ejecuta un ciclo completo del bot:
     1. Para cada par, descarga velas
     2. Calcula señal
     3. Si hay señal y no hay posición abierta → coloca orden
+
+    Con `scanner` (modo --scan) los pares a evaluar son los mejores candidatos
+    del escaneo de todo el universo USDT-M en vez de config.SYMBOLS.
     """
     logger.info(f"─── Ciclo {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC ───")
 
@@ -40,7 +45,14 @@ def run_cycle(exchange: BinanceFuturesExchange, dry_run: bool = False):
     balance = exchange.get_balance()
     logger.info(f"💰 Balance disponible: {balance:.2f} USDT")
 
-    for symbol in config.SYMBOLS:
+    symbols = config.SYMBOLS
+    if scanner is not None:
+        try:
+            symbols = scanner.top_symbols()
+        except Exception as e:
+            logger.error(f"Escáner falló ({e}) — usando config.SYMBOLS")
+
+    for symbol in symbols:
         # Saltar si ya hay posición abierta en este par
         if symbol in open_symbols:
             logger.info(f"{symbol}: Posición ya abierta. Saltando.")
@@ -114,11 +126,19 @@ def main():
         "--dry-run", action="store_true",
         help="Modo simulación: calcula señales pero NO coloca órdenes reales"
     )
+    parser.add_argument(
+        "--no-user-stream", action="store_true",
+        help="No usar el user data stream: consultar posiciones y balance por REST en cada ciclo"
+    )
+    parser.add_argument(
+        "--scan", action="store_true",
+        help="Escanear todos los perpetuos USDT-M y operar los mejores candidatos en vez de config.SYMBOLS"
+    )
     args = parser.parse_args()
 
     mode = "DRY-RUN (simulación)" if args.dry_run else "LIVE (Testnet)"
     logger.info(f"🤖 Bot iniciado en modo: {mode}")
-    logger.info(f"   Pares: {', '.join(config.SYMBOLS)}")
+    logger.info(f"   Pares: {'universo USDT-M (escáner)' if args.scan else ', '.join(config.SYMBOLS)}")
     logger.info(f"   Timeframe: {config.TIMEFRAME}")
     logger.info(f"   Testnet: {config.USE_TESTNET}")
 
@@ -130,13 +150,16 @@ def main():
         return
 
     exchange = BinanceFuturesExchange()
+    if not args.no_user_stream:
+        exchange.start_user_stream()
+    scanner = UniverseScanner(config.TIMEFRAME) if args.scan else None
 
     logger.info(f"⏱️  Ciclo cada {CHECK_INTERVAL_SECONDS}s. Presiona Ctrl+C para detener.\n")
 
     try:
         while True:
             try:
-                run_cycle(exchange, dry_run=args.dry_run)
+                run_cycle(exchange, dry_run=args.dry_run, scanner=scanner)
             except Exception as e:
                 logger.error(f"Error en ciclo: {e}")
 
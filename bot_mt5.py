@@ -12,15 +12,18 @@ Uso:
     python bot_mt5.py --risk 1.5
 """
 
-import MetaTrader5 as mt5
+from mt5_io import mt5   # API de MT5 tras un único lock (ver mt5_io.py)
 import pandas as pd
 import time
 import argparse
+import atexit
 import csv
 import os
 import json
 from pathlib import Path
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass, asdict
 
@@ -32,9 +35,20 @@ if sys.stdout.encoding.lower() != 'utf-8':
     except: pass
 
 import logger
+import latency
 import telegram_notify as tg
-from analyze_losses import generate_weekly_report
-import strategy_eurusd as strat_eur
+from state_store import StateStore
+from candle_cache import CandleCache
+from symbol_registry import SymbolRegistry
+from equity_monitor import EquityMonitor
+from virtual_engine import VirtualEngine
+import strategy_registry
+from strategy_registry import BarView, CONFIG_TF, register
+from shadow import ShadowBook
+from regime_cache import DailyRegimeCache
+from warm_start import WarmStart
+from handoff import TradingLock
+from config_reload import ConfigReloader
 import numpy as np
 from dotenv import load_dotenv
 
@@ -168,6 +182,12 @@ SYMBOL_CONFIGS = {
     },
 }
 
+# 👥 Variantes en modo sombra (cartera virtual propia, mismo feed que el símbolo)
+# Cada variante: "name" + overrides sobre SYMBOL_CONFIGS (strategy, adx_min...).
+# Solo se evalúan sobre las velas que ya descarga la estrategia principal, p.ej.:
+#   "XAUUSD": [{"name": "TMD1_ADX25", "strategy": "TREND_MOMENTUM_D1", "adx_min": 25.0}]
+SHADOW_VARIANTS: dict[str, list[dict]] = {}
+
 # Parámetros Comunes
 ASIAN_START_H  = 0
 ASIAN_END_H    = 6
@@ -197,11 +217,16 @@ PROP_FIRM = {
 }
 
 STATE_FILE     = "bot_state_mt5_v5.json"
+STATE_HISTORY_FILE = "bot_state_mt5_v5_history.json"  # Campos cold (historial, tickets)
 TRADE_HISTORY_FILE = "trade_history.csv"  # Historial persistente de 30 días
 MAX_RECONNECT_ATTEMPTS = 10
 RECONNECT_DELAY_SECS   = 30
 DAILY_SUMMARY_HOUR     = 17
 
+# Evaluación concurrente de señales (un worker por símbolo, con límite)
+SIGNAL_WORKERS      = int(os.getenv("SIGNAL_WORKERS", 4))
+SIGNAL_TIMEOUT_SECS = float(os.getenv("SIGNAL_TIMEOUT_SECS", 20))
+
 # ─────────────────────────────────────────────────────────────────────────────
 # ESTADO PERSISTENTE
 # ─────────────────────────────────────────────────────────────────────────────
@@ -273,12 +298,42 @@ def load_trade_history(days: int = 30) -> list:
     return result
 
 
+# Escritura diferida + atómica: save_state() solo marca, flush_state() escribe 1 vez/ciclo
+_state_store = StateStore(STATE_FILE, STATE_HISTORY_FILE)
+
+# Serializa ejecución de órdenes, filtro USD y mutaciones del estado entre
+# los workers de señales y el hilo principal (manage_positions, flush_state)
+_execution_lock = threading.RLock()
+
+# Carteras sombra por variante (state["shadow"]), resueltas con el VirtualEngine
+_shadow = ShadowBook(SHADOW_VARIANTS, _execution_lock)
+
+
 def save_state(state: dict):
+    """Marca el estado como modificado. La escritura se coalesce en flush_state()."""
+    _state_store.mark_dirty()
+
+
+def flush_state(state: dict, force: bool = True):
+    """
+    Refresca radar/cuenta/posiciones/historial y escribe el estado a disco.
+    Se llama una vez al final de cada ciclo (force=True mantiene vivo last_update
+    para el watchdog de auto_update aunque nada haya cambiado).
+    """
+    if not (force or _state_store.dirty):
+        return
+    with latency.span("save_state"), _execution_lock:
+        _flush_state_locked(state)
+
+
+def _flush_state_locked(state: dict):
     state["last_update"] = datetime.now(timezone.utc).isoformat()
     state["running"] = True
     try:
         # Añadir Radar de Señales
         state["radar"] = calculate_radar()
+        state["candle_cache"] = _candle_cache.stats()
+        state["latency"] = latency.summary()
 
         # Añadir info de cuenta si está conectado
         acct = mt5.account_info()
@@ -303,91 +358,108 @@ def save_state(state: dict):
                     "profit": p.profit
                 })
 
-        # Obtener historial de trades cerrados hoy con datos completos
+        # Obtener historial de trades cerrados hoy con datos completos.
+        # Cursor de deals: solo se piden (y se reconcilian) los deals posteriores
+        # al último procesado; closed_trades_today se acumula durante el día.
         try:
             today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
             now_utc = datetime.now(timezone.utc)
-            deals = mt5.history_deals_get(today, now_utc)
-            orders = mt5.history_orders_get(today, now_utc)
-            
-            # Mapear órdenes por ticket (NO por position_id, para evitar sobrescritura)
-            order_map = {}  # order_ticket -> order
-            if orders:
-                for o in orders:
-                    order_map[o.ticket] = o
-            
-            closed = []
-            if deals:
-                for d in deals:
-                    if d.entry == 1 and d.symbol:  # 1 = cierre de posición
-                        time_open = ""
-                        price_open = d.price  # fallback
-                        sl = 0.0
-                        tp = 0.0
-                        
-                        # Buscar el deal de APERTURA para obtener precio, SL, TP reales
-                        open_deals = mt5.history_deals_get(position=d.position_id)
-                        if open_deals:
-                            for od in open_deals:
-                                if od.entry == 0:  # 0 = apertura
-                                    price_open = round(od.price, 5)
-                                    time_open = str(datetime.fromtimestamp(od.time, tz=timezone.utc))
-                                    # Buscar la orden de apertura por ticket del deal
-                                    open_order = order_map.get(od.order)
-                                    if open_order:
-                                        sl = round(open_order.sl, 2)
-                                        tp = round(open_order.tp, 2)
-                                    break
-                        
-                        trade_record = {
-                            "ticket": d.position_id,
-                            "time_close": str(datetime.fromtimestamp(d.time, tz=timezone.utc)),
-                            "time_open": time_open,
-                            "symbol": d.symbol,
-                            "direction": "LONG" if d.type == 0 else "SHORT",
-                            "volume": round(d.volume, 2),
-                            "price_open": price_open,
-                            "price_close": round(d.price, 5),
-                            "sl": sl,
-                            "tp": tp,
-                            "pnl": round(d.profit, 2),
-                            "balance_after": round(acct.balance if acct else 0, 2),
-                            "source": BOT_INSTANCE
-                        }
-                        closed.append(trade_record)
-                        # Guardar en CSV solo si es un ticket NUEVO (evita duplicados en cada save_state)
-                        ticket_key = str(d.position_id)
-                        saved_tickets = state.setdefault("_saved_tickets", [])
-                        if ticket_key not in saved_tickets:
-                            if save_trade_history(trade_record):
-                                saved_tickets.append(ticket_key)
-                                logger.info(f"💾 Historial guardado: {d.symbol} #{ticket_key} PnL={trade_record['pnl']}")
-                                # Actualizar consecutive_losses para que PropFirmGuard funcione
-                                if float(trade_record.get('pnl', 0)) >= 0:
-                                    state["consecutive_losses"] = 0
-                                else:
-                                    state["consecutive_losses"] = state.get("consecutive_losses", 0) + 1
-                                logger.info(f"📊 Pérdidas consecutivas: {state['consecutive_losses']}")
-                        # Limpiar tickets de días anteriores del tracker en memoria
-                        if len(saved_tickets) > 500:
-                            state["_saved_tickets"] = saved_tickets[-200:]
-            
-            state["closed_trades_today"] = closed
-            # Incluir últimos 30 días en el estado para el dashboard
-            state["trade_history"] = load_trade_history(30)
+            today_str = today.strftime("%Y-%m-%d")
+            cursor = state.get("deal_cursor") or {}
+            reload_history = "trade_history" not in state
+            if cursor.get("day") != today_str:
+                cursor = {"day": today_str, "time": int(today.timestamp()), "deals": []}
+                state["closed_trades_today"] = []
+                reload_history = True
+            cursor = {"day": cursor["day"], "time": cursor["time"], "deals": list(cursor["deals"])}
+            closed = state.setdefault("closed_trades_today", [])
+            closed_tickets = {t.get("ticket") for t in closed}
+
+            # MT5 filtra por segundos: se pide desde el segundo del cursor y se
+            # descartan los deals de ese segundo que ya se procesaron
+            deals = mt5.history_deals_get(datetime.fromtimestamp(cursor["time"], tz=timezone.utc), now_utc)
+            seen = set(cursor["deals"])
+            for d in sorted(deals or [], key=lambda d: (d.time, d.ticket)):
+                if d.ticket in seen:
+                    continue
+                if d.time > cursor["time"]:
+                    cursor["time"] = d.time
+                    cursor["deals"] = []
+                cursor["deals"].append(d.ticket)
+                if d.entry != 1 or not d.symbol or d.position_id in closed_tickets:  # 1 = cierre de posición
+                    continue
+                time_open = ""
+                price_open = d.price  # fallback
+                sl = 0.0
+                tp = 0.0
+
+                # Buscar el deal de APERTURA para obtener precio, SL, TP reales
+                open_deals = mt5.history_deals_get(position=d.position_id)
+                if open_deals:
+                    for od in open_deals:
+                        if od.entry == 0:  # 0 = apertura
+                            price_open = round(od.price, 5)
+                            time_open = str(datetime.fromtimestamp(od.time, tz=timezone.utc))
+                            # Orden de apertura por ticket (puede ser de un día anterior)
+                            open_orders = mt5.history_orders_get(ticket=od.order)
+                            if open_orders:
+                                sl = round(open_orders[0].sl, 2)
+                                tp = round(open_orders[0].tp, 2)
+                            break
+
+                trade_record = {
+                    "ticket": d.position_id,
+                    "time_close": str(datetime.fromtimestamp(d.time, tz=timezone.utc)),
+                    "time_open": time_open,
+                    "symbol": d.symbol,
+                    "direction": "LONG" if d.type == 0 else "SHORT",
+                    "volume": round(d.volume, 2),
+                    "price_open": price_open,
+                    "price_close": round(d.price, 5),
+                    "sl": sl,
+                    "tp": tp,
+                    "pnl": round(d.profit, 2),
+                    "balance_after": round(acct.balance if acct else 0, 2),
+                    "source": BOT_INSTANCE
+                }
+                closed.append(trade_record)
+                closed_tickets.add(d.position_id)
+                reload_history = True
+                # Guardar en CSV solo si es un ticket NUEVO (evita duplicados tras reinicios)
+                ticket_key = str(d.position_id)
+                saved_tickets = state.setdefault("_saved_tickets", [])
+                if ticket_key not in saved_tickets:
+                    if save_trade_history(trade_record):
+                        saved_tickets.append(ticket_key)
+                        logger.info(f"💾 Historial guardado: {d.symbol} #{ticket_key} PnL={trade_record['pnl']}")
+                        # Actualizar consecutive_losses para que PropFirmGuard funcione
+                        if float(trade_record.get('pnl', 0)) >= 0:
+                            state["consecutive_losses"] = 0
+                        else:
+                            state["consecutive_losses"] = state.get("consecutive_losses", 0) + 1
+                        logger.info(f"📊 Pérdidas consecutivas: {state['consecutive_losses']}")
+                # Limpiar tickets de días anteriores del tracker en memoria
+                if len(saved_tickets) > 500:
+                    state["_saved_tickets"] = saved_tickets[-200:]
+
+            state["deal_cursor"] = cursor
+            # Incluir últimos 30 días en el estado para el dashboard (solo si cambió)
+            if reload_history:
+                state["trade_history"] = load_trade_history(30)
         except Exception as e:
             logger.error(f"Error cargando historial: {e}")
-            state["closed_trades_today"] = []
-            state["trade_history"] = []
+            state.setdefault("closed_trades_today", [])
+            state.setdefault("trade_history", [])
 
-        with open(STATE_FILE, "w") as f:
-            json.dump(state, f, indent=2, default=str)
+        _state_store.write(state, force=True)
     except Exception as e:
         logger.error(f"Error guardando estado: {e}")
 
 def calculate_radar() -> list:
     """Calcula la proximidad de señales para todos los símbolos activos."""
     radar_data = []
+    ict_spec = strategy_registry.get("ICT_SILVER_BULLET")
+    now = datetime.now(timezone.utc)
     
     for sym_key, config in SYMBOL_CONFIGS.items():
         if not config.get("live"): continue
@@ -412,7 +484,10 @@ def calculate_radar() -> list:
             adx_min = config.get("adx_min", 20.0)
             
             # ICT Signal (Principalmente para Oro y Mayores)
-            ict = get_signal_ict_silver_bullet(symbol, sym_key)
+            ict = None
+            if ict_spec.in_session(now):
+                bars = strategy_registry.prefetch(symbol, ict_spec.name, config, get_candles, now)
+                ict = get_signal_ict_silver_bullet(symbol, sym_key, bars, config)
             ict_label = f" | ICT: {ict.signal}" if ict else ""
             
             # Trend Scores
@@ -441,21 +516,19 @@ def calculate_radar() -> list:
     return radar_data
 
 def load_state() -> dict:
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, "r") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {
-        "last_ranges": {},
-        "trades_today": 0,
-        "pnl_today": 0.0,
-        "virtual_trades_today": 0,
-        "virtual_pnl_today": 0.0,
-        "last_trade_date": "",
-        "daily_summary_sent": "",
-    }
+    state = _state_store.load()
+    if state is None:
+        state = {
+            "last_ranges": {},
+            "trades_today": 0,
+            "pnl_today": 0.0,
+            "virtual_trades_today": 0,
+            "virtual_pnl_today": 0.0,
+            "last_trade_date": "",
+            "daily_summary_sent": "",
+        }
+    state.setdefault("shadow", {})
+    return state
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CONEXIÓN Y MERCADO
@@ -569,7 +642,45 @@ def ensure_connected() -> bool:
         if connect_mt5(): return True
     return False
 
+_TF_SECONDS = {
+    mt5.TIMEFRAME_M1: 60, mt5.TIMEFRAME_M5: 300, mt5.TIMEFRAME_M15: 900,
+    mt5.TIMEFRAME_H1: 3600, mt5.TIMEFRAME_H4: 14400, mt5.TIMEFRAME_D1: 86400,
+}
+_TF_NAMES = {
+    "M1": mt5.TIMEFRAME_M1, "M5": mt5.TIMEFRAME_M5, "M15": mt5.TIMEFRAME_M15,
+    "H1": mt5.TIMEFRAME_H1, "H4": mt5.TIMEFRAME_H4, "D1": mt5.TIMEFRAME_D1,
+}
+
+def _server_time(symbol: str) -> float | None:
+    """Hora del servidor del broker (último tick), en la misma escala que las velas."""
+    tick = mt5.symbol_info_tick(symbol)
+    return float(tick.time) if tick is not None and tick.time else None
+
+# Caché de velas por ciclo: radar, estrategias, ICT y trailing comparten descargas.
+# Buffers persistentes: cada ciclo solo descarga las velas nuevas
+_candle_cache = CandleCache(_TF_SECONDS, _server_time)
+_d1_regime = DailyRegimeCache()
+_virtual_engine = VirtualEngine()
+
+def _build_warm_payload() -> dict:
+    return {"candles": _candle_cache.snapshot(), "symbols": _symbols.snapshot(), "regime": _d1_regime.snapshot()}
+
+def _apply_warm_payload(payload: dict):
+    _candle_cache.restore(payload["candles"])
+    _symbols.restore(payload["symbols"])
+    _d1_regime.restore(payload["regime"])
+
+def _account_key() -> tuple:
+    info = mt5.account_info()
+    return (info.login, info.server) if info else ()
+
+# ♨️ Snapshot periódico de buffers/alias/régimen para reinicios en caliente
+_warm = WarmStart(_build_warm_payload, _apply_warm_payload)
+
 def get_candles(symbol: str, timeframe, count: int = 200) -> pd.DataFrame:
+    return _candle_cache.get(symbol, timeframe, count, _fetch_candles)
+
+def _fetch_candles(symbol: str, timeframe, count: int) -> pd.DataFrame:
     rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
     if rates is None or len(rates) == 0: return pd.DataFrame()
     df = pd.DataFrame(rates)
@@ -588,14 +699,19 @@ class TradeSetup:
     sl: float
     tp: float
     range_size: float = 0.0
-
-def get_signal_asian_breakout(symbol: str, base_name: str) -> TradeSetup | None:
-    now = datetime.now(timezone.utc)
-    config = SYMBOL_CONFIGS[base_name]
+    bar_time: float | None = None   # Apertura de la vela de la señal (epoch, hora del servidor)
+    bar_tf: int | None = None       # Timeframe MT5 de esa vela (latencia cierre → orden)
+
+@register("ASIAN_BREAKOUT", requires={mt5.TIMEFRAME_M15: 200, mt5.TIMEFRAME_H1: 100},
+          session=(LONDON_START_H, LONDON_END_H), skip_monday=SKIP_MONDAY,
+          params=("min_range", "max_range", "sl_buffer", "tp_mult"))
+def get_signal_asian_breakout(symbol: str, base_name: str, bars: BarView, cfg: dict | None = None) -> TradeSetup | None:
+    now = bars.now
+    config = cfg or SYMBOL_CONFIGS[base_name]
     if SKIP_MONDAY and now.weekday() == 0: return None
     if not (LONDON_START_H <= now.hour < LONDON_END_H): return None
 
-    df_15m = get_candles(symbol, mt5.TIMEFRAME_M15, 200)
+    df_15m = bars.get(mt5.TIMEFRAME_M15, 200)
     if df_15m.empty: return None
 
     today = now.date()
@@ -606,9 +722,8 @@ def get_signal_asian_breakout(symbol: str, base_name: str) -> TradeSetup | None:
     rng = hi - lo
     if rng < config["min_range"] or rng > config["max_range"]: return None
 
-    rates_1h = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_H1, 0, 100)
-    if rates_1h is None: return None
-    df_1h = pd.DataFrame(rates_1h)
+    df_1h = bars.get(mt5.TIMEFRAME_H1, 100)
+    if df_1h.empty: return None
     ema50 = df_1h['close'].ewm(span=50, adjust=False).mean().iloc[-1]
     
     # Nuevo Filtro Francotirador: ADX > 30
@@ -619,36 +734,40 @@ def get_signal_asian_breakout(symbol: str, base_name: str) -> TradeSetup | None:
     london = df_15m[(df_15m.index.date == today) & (df_15m.index.hour >= LONDON_START_H) & (df_15m.index.hour < LONDON_END_H)]
     if len(london) > MAX_ENTRY_CANDLES: return None
 
-    for _, candle in london.iterrows():
+    for ts, candle in london.iterrows():
         close = float(candle["close"])
+        bar = dict(bar_time=ts.timestamp(), bar_tf=mt5.TIMEFRAME_M15)
         if close > hi and close > ema50:
-            return TradeSetup("LONG", close, lo - lo*config["sl_buffer"], close + rng*config["tp_mult"], rng)
+            return TradeSetup("LONG", close, lo - lo*config["sl_buffer"], close + rng*config["tp_mult"], rng, **bar)
         elif close < lo and close < ema50:
-            return TradeSetup("SHORT", close, hi + hi*config["sl_buffer"], close - rng*config["tp_mult"], rng)
+            return TradeSetup("SHORT", close, hi + hi*config["sl_buffer"], close - rng*config["tp_mult"], rng, **bar)
     return None
 
-def get_signal_mean_reversion(symbol: str, base_name: str) -> TradeSetup | None:
-    config = SYMBOL_CONFIGS[base_name]
-    df = get_candles(symbol, config["timeframe"], 100)
+@register("MEAN_REVERSION", requires={CONFIG_TF: 100})
+def get_signal_mean_reversion(symbol: str, base_name: str, bars: BarView, cfg: dict | None = None) -> TradeSetup | None:
+    config = cfg or SYMBOL_CONFIGS[base_name]
+    df = bars.get(config["timeframe"], 100)
     if df.empty: return None
+    import strategy_eurusd as strat_eur   # Diferido: solo se carga si EURUSD está activo
     
     df = strat_eur.calculate_indicators(df)
     res = strat_eur.check_signals(df)
     if res:
         sig, entry, sl, tp = res
-        return TradeSetup(sig, entry, sl, tp)
+        return TradeSetup(sig, entry, sl, tp, bar_time=df.index[-1].timestamp(), bar_tf=config["timeframe"])
     return None
 
-def get_signal_indicator_trend(symbol: str, base_name: str) -> TradeSetup | None:
+@register("INDICATOR_TREND", requires={CONFIG_TF: 100}, session=(0, EOD_CLOSE_H))
+def get_signal_indicator_trend(symbol: str, base_name: str, bars: BarView, cfg: dict | None = None) -> TradeSetup | None:
     """Estrategia Potente basada en EMA 50 + RSI 14 (Trend Following)."""
-    now = datetime.now(timezone.utc)
+    now = bars.now
     
     # 🕒 FILTRO DE HORA: Evitar entrar después de las 15:00 UTC para no cerrar inmediatamente a las 16:00
     if now.hour >= EOD_CLOSE_H:
         return None
 
-    config = SYMBOL_CONFIGS[base_name]
-    df = get_candles(symbol, config["timeframe"], 100)
+    config = cfg or SYMBOL_CONFIGS[base_name]
+    df = bars.get(config["timeframe"], 100)
     if df.empty: return None
     
     # Calcular Indicadores (EMA, RSI, ADX, ATR)
@@ -659,33 +778,35 @@ def get_signal_indicator_trend(symbol: str, base_name: str) -> TradeSetup | None
     
     last = df.iloc[-1]
     if last['adx'] < config.get("adx_min", 20.0): return None
+    bar = dict(bar_time=df.index[-1].timestamp(), bar_tf=config["timeframe"])
     
     # Señal LONG: Precio > EMA50 y RSI > 55
     if last['close'] > last['ema'] and last['rsi'] > 55:
         entry = float(last['close'])
         sl = entry - float(last['atr']) * 2.5
         tp = entry + float(last['atr']) * 5.0
-        return TradeSetup("LONG", entry, sl, tp)
+        return TradeSetup("LONG", entry, sl, tp, **bar)
         
     # Señal SHORT: Precio < EMA50 y RSI < 45
     elif last['close'] < last['ema'] and last['rsi'] < 45:
         entry = float(last['close'])
         sl = entry + float(last['atr']) * 2.5
         tp = entry - float(last['atr']) * 5.0
-        return TradeSetup("SHORT", entry, sl, tp)
+        return TradeSetup("SHORT", entry, sl, tp, **bar)
         
     return None
 
-def get_signal_ict_silver_bullet(symbol: str, base_name: str) -> TradeSetup | None:
+@register("ICT_SILVER_BULLET", requires={mt5.TIMEFRAME_M5: 100}, session=(15, 16))
+def get_signal_ict_silver_bullet(symbol: str, base_name: str, bars: BarView, cfg: dict | None = None) -> TradeSetup | None:
     """Estrategia ICT Silver Bullet (10-11 AM NY). Especialidad: Oro."""
-    now = datetime.now(timezone.utc)
+    now = bars.now
     
     # Ventana Silver Bullet (15:00 - 16:00 UTC)
     if not (15 <= now.hour < 16):
         return None
 
     # Necesitamos 5m para el detalle del FVG
-    df_5m = get_candles(symbol, mt5.TIMEFRAME_M5, 100)
+    df_5m = bars.get(mt5.TIMEFRAME_M5, 100)
     if df_5m.empty: return None
 
     # 1. Definir liquidez previa (8:30 - 10:00 AM NY / 13:30 - 15:00 UTC)
@@ -707,33 +828,37 @@ def get_signal_ict_silver_bullet(symbol: str, base_name: str) -> TradeSetup | No
     
     swept_high = c3['high'] > daily_high
     swept_low = c3['low'] < daily_low
+    bar = dict(bar_time=df_5m.index[-1].timestamp(), bar_tf=mt5.TIMEFRAME_M5)
 
     if swept_low and fvg_bull:
         entry = float(c3['close'])
         sl = float(c2['low'])
         tp = entry + abs(entry - sl) * 2.0
-        return TradeSetup("LONG", entry, sl, tp)
+        return TradeSetup("LONG", entry, sl, tp, **bar)
     
     elif swept_high and fvg_bear:
         entry = float(c3['close'])
         sl = float(c2['high'])
         tp = entry - abs(sl - entry) * 2.0
-        return TradeSetup("SHORT", entry, sl, tp)
+        return TradeSetup("SHORT", entry, sl, tp, **bar)
 
     return None
 
-def get_signal_ensemble(symbol: str, base_name: str) -> TradeSetup | None:
+@register("ENSEMBLE", session=(0, EOD_CLOSE_H), composes=("ICT_SILVER_BULLET", "INDICATOR_TREND"))
+def get_signal_ensemble(symbol: str, base_name: str, bars: BarView, cfg: dict | None = None) -> TradeSetup | None:
     """Combina ICT Silver Bullet y Indicator Trend (Prioriza ICT)."""
     # 1. Intentar ICT (Precisión Quirúrgica)
-    setup = get_signal_ict_silver_bullet(symbol, base_name)
+    setup = get_signal_ict_silver_bullet(symbol, base_name, bars, cfg)
     if setup:
         return setup
     
     # 2. Si no hay ICT, usar la Tendencia Potente (Frecuencia)
-    return get_signal_indicator_trend(symbol, base_name)
+    return get_signal_indicator_trend(symbol, base_name, bars, cfg)
 
 
-def get_signal_trend_momentum_d1(symbol: str, base_name: str) -> TradeSetup | None:
+@register("TREND_MOMENTUM_D1", requires={mt5.TIMEFRAME_D1: 250, mt5.TIMEFRAME_H1: 60},
+          session=(7, 17), skip_monday=SKIP_MONDAY)
+def get_signal_trend_momentum_d1(symbol: str, base_name: str, bars: BarView, cfg: dict | None = None) -> TradeSetup | None:
     """
     v6 — Trend-Momentum con filtro macro D1 + entrada precisa H1.
 
@@ -750,7 +875,7 @@ def get_signal_trend_momentum_d1(symbol: str, base_name: str) -> TradeSetup | No
       - SL basado en estructura real del mercado (no ratio fijo)
       - Filtro macro D1 elimina entradas contra-tendencia
     """
-    now = datetime.now(timezone.utc)
+    now = bars.now
 
     # No operar lunes
     if SKIP_MONDAY and now.weekday() == 0:
@@ -761,21 +886,19 @@ def get_signal_trend_momentum_d1(symbol: str, base_name: str) -> TradeSetup | No
         return None
 
     # ─── 1. FILTRO MACRO D1: SMA200 ───────────────────────────────────────
-    df_d1 = get_candles(symbol, mt5.TIMEFRAME_D1, 250)
+    df_d1 = bars.get(mt5.TIMEFRAME_D1, 250)
     if df_d1.empty or len(df_d1) < 210:
         return None
 
-    df_d1['sma200'] = df_d1['close'].rolling(200).mean()
-    df_d1['sma50']  = df_d1['close'].rolling(50).mean()
-    df_d1['sma10']  = df_d1['close'].rolling(10).mean()
-    df_d1['atr_d1'] = _atr(df_d1['high'], df_d1['low'], df_d1['close'], 14)
-
-    last_d1 = df_d1.iloc[-1]
-    close_d1 = float(last_d1['close'])
-    sma200   = float(last_d1['sma200'])
-    sma50    = float(last_d1['sma50'])
-    sma10    = float(last_d1['sma10'])
-    atr_d1   = float(last_d1['atr_d1'])
+    # SMAs/ATR D1 desde la caché de régimen (sumas de velas cerradas + vela en curso)
+    regime = _d1_regime.get(symbol, df_d1)
+    if regime is None:
+        return None
+    close_d1 = regime['close']
+    sma200   = regime['sma200']
+    sma50    = regime['sma50']
+    sma10    = regime['sma10']
+    atr_d1   = regime['atr_d1']
 
     if any(pd.isna(v) for v in [sma200, sma50, sma10, atr_d1]):
         return None
@@ -791,7 +914,7 @@ def get_signal_trend_momentum_d1(symbol: str, base_name: str) -> TradeSetup | No
         return None  # Momentum D1 no confirmado
 
     # ─── 3. ENTRADA H1: Vela de momentum rompiendo el pullback ───────────
-    df_h1 = get_candles(symbol, mt5.TIMEFRAME_H1, 60)
+    df_h1 = bars.get(mt5.TIMEFRAME_H1, 60)
     if df_h1.empty or len(df_h1) < 20:
         return None
 
@@ -810,12 +933,13 @@ def get_signal_trend_momentum_d1(symbol: str, base_name: str) -> TradeSetup | No
     atr_h1   = float(last_h1['atr'])
 
     # ADX debe confirmar tendencia en H1 también (usa adx_min del config, no hardcoded)
-    adx_min_cfg = SYMBOL_CONFIGS[base_name].get("adx_min", 20.0)
+    adx_min_cfg = (cfg or SYMBOL_CONFIGS[base_name]).get("adx_min", 20.0)
     if adx_h1 < adx_min_cfg:
         return None
 
     # Referencia del pullback: max/min de las últimas 5 velas H1 (excluyendo la actual)
     recent = df_h1.iloc[-6:-1]
+    bar = dict(bar_time=df_h1.index[-1].timestamp(), bar_tf=mt5.TIMEFRAME_H1)
 
     if sma_long:
         pullback_high = float(recent['high'].max())
@@ -830,7 +954,7 @@ def get_signal_trend_momentum_d1(symbol: str, base_name: str) -> TradeSetup | No
             if sl_dist <= 0 or tp_dist / sl_dist < 2.0:
                 return None
             logger.info(f"📈 [D1-LONG] {symbol} | SMA200:{sma200:.0f} | RSI:{rsi_h1:.1f} | ADX:{adx_h1:.1f} | RRR:{tp_dist/sl_dist:.2f}x")
-            return TradeSetup("LONG", entry, sl, tp)
+            return TradeSetup("LONG", entry, sl, tp, **bar)
 
     elif sma_short:
         pullback_low = float(recent['low'].min())
@@ -844,12 +968,14 @@ def get_signal_trend_momentum_d1(symbol: str, base_name: str) -> TradeSetup | No
             if sl_dist <= 0 or tp_dist / sl_dist < 2.0:
                 return None
             logger.info(f"📉 [D1-SHORT] {symbol} | SMA200:{sma200:.0f} | RSI:{rsi_h1:.1f} | ADX:{adx_h1:.1f} | RRR:{tp_dist/sl_dist:.2f}x")
-            return TradeSetup("SHORT", entry, sl, tp)
+            return TradeSetup("SHORT", entry, sl, tp, **bar)
 
     return None
 
 
-def get_signal_hybrid_d1_ict(symbol: str, base_name: str) -> TradeSetup | None:
+@register("HYBRID_D1_ICT", session=(7, 17), skip_monday=SKIP_MONDAY,
+          composes=("ICT_SILVER_BULLET", "TREND_MOMENTUM_D1"))
+def get_signal_hybrid_d1_ict(symbol: str, base_name: str, bars: BarView, cfg: dict | None = None) -> TradeSetup | None:
     """
     HYBRID v7 — D1 macro filter + ICT Silver Bullet (15-16 UTC, prioridad)
     + TREND_MOMENTUM_D1 fallback para el resto de sesión (07-17 UTC).
@@ -865,7 +991,7 @@ def get_signal_hybrid_d1_ict(symbol: str, base_name: str) -> TradeSetup | None:
     Resultado esperado: +20-28 trades/mes vs 15-20 solo con TREND_MOMENTUM_D1
     (+5-8 trades extra en ventana ICT, todos filtrados por D1)
     """
-    now = datetime.now(timezone.utc)
+    now = bars.now
 
     # No operar lunes
     if SKIP_MONDAY and now.weekday() == 0:
@@ -874,23 +1000,20 @@ def get_signal_hybrid_d1_ict(symbol: str, base_name: str) -> TradeSetup | None:
     # ─── Ventana ICT Silver Bullet: 15-16 UTC ────────────────────────────
     if 15 <= now.hour < 16:
         # Leer D1 para validar macro tendencia antes de ejecutar ICT
-        df_d1 = get_candles(symbol, mt5.TIMEFRAME_D1, 250)
+        df_d1 = bars.get(mt5.TIMEFRAME_D1, 250)
         if not df_d1.empty and len(df_d1) >= 210:
-            df_d1['sma200'] = df_d1['close'].rolling(200).mean()
-            df_d1['sma50']  = df_d1['close'].rolling(50).mean()
-            df_d1['sma10']  = df_d1['close'].rolling(10).mean()
-            last_d1  = df_d1.iloc[-1]
-            close_d1 = float(last_d1['close'])
-            sma200   = last_d1['sma200']
-            sma50    = last_d1['sma50']
-            sma10    = last_d1['sma10']
+            regime   = _d1_regime.get(symbol, df_d1) or {}
+            close_d1 = regime.get('close', np.nan)
+            sma200   = regime.get('sma200', np.nan)
+            sma50    = regime.get('sma50', np.nan)
+            sma10    = regime.get('sma10', np.nan)
 
             if not any(pd.isna(v) for v in [sma200, sma50, sma10]):
                 d1_long  = close_d1 > float(sma200) and float(sma10) > float(sma50)
                 d1_short = close_d1 < float(sma200) and float(sma10) < float(sma50)
 
                 if d1_long or d1_short:
-                    ict = get_signal_ict_silver_bullet(symbol, base_name)
+                    ict = get_signal_ict_silver_bullet(symbol, base_name, bars, cfg)
                     if ict:
                         if (ict.signal == "LONG" and d1_long) or (ict.signal == "SHORT" and d1_short):
                             logger.info(f"🎯 ICT Silver Bullet {ict.signal} detectado en {symbol} | validado D1 macro")
@@ -899,44 +1022,73 @@ def get_signal_hybrid_d1_ict(symbol: str, base_name: str) -> TradeSetup | None:
                             logger.info(f"⛔ [HYBRID-ICT] {symbol} | ICT {ict.signal} bloqueado — contra D1 macro")
 
     # ─── Fallback: TREND_MOMENTUM_D1 (gestiona su ventana 07-17 UTC) ────
-    return get_signal_trend_momentum_d1(symbol, base_name)
+    return get_signal_trend_momentum_d1(symbol, base_name, bars, cfg)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # EJECUCIÓN (Live vs Virtual)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def calc_lot_size(symbol: str, sl_dist: float, risk_pct: float) -> float:
+# Cap de seguridad por símbolo (evita lotes enormes con ATR grande en oro)
+MAX_LOT_CAPS = {
+    "XAUUSD": 0.20, "GOLD": 0.20, "XAUUSDm": 0.20,
+    "XAGUSD": 0.50, "EURUSD": 2.0, "GBPUSD": 2.0,
+    "USDJPY": 2.0,  "AUDUSD": 2.0, "USDCAD": 2.0, "USDCHF": 2.0,
+}
+
+# Alias y especificaciones del broker en memoria (refresco programado o tras rechazo)
+_symbols = SymbolRegistry(SYMBOL_CONFIGS, MAX_LOT_CAPS)
+
+# ⚙️ Overlay bot_config_mt5.json sobre SYMBOL_CONFIGS / PROP_FIRM, recargado entre ciclos
+_config = ConfigReloader(SYMBOL_CONFIGS, PROP_FIRM, _TF_NAMES,
+                         lambda: strategy_registry.REGISTRY.keys(), _execution_lock,
+                         required=strategy_registry.required_params)
+
+def apply_config_changes(diff: dict, active_symbols: dict, notify: bool = True) -> dict:
+    """Reconstruye solo lo afectado por el diff de configuración. Retorna active_symbols."""
+    for base, changes in diff["symbols"].items():
+        if "*" in changes or "aliases" in changes:
+            _symbols.forget(base)
+    if diff["symbols"]:
+        active_symbols = _symbols.resolve_all()
+    if notify:
+        tg._send_message("⚙️ <b>CONFIG RECARGADA</b>\n" + "\n".join(_config.describe(diff)))
+    return active_symbols
+
+def calc_lot_size(symbol: str, sl_dist: float, risk_pct: float, balance: float | None = None) -> float:
     """Calcula el tamaño de lote basado en el riesgo y la distancia del SL."""
-    acct = mt5.account_info()
-    if not acct:
-        return 0.01
-    risk_amount = acct.balance * (risk_pct / 100)
-    sym_info = mt5.symbol_info(symbol)
-    if not sym_info or sl_dist <= 0:
-        return 0.01
-    # Valor por punto × volumen = profit por punto
-    tick_value = sym_info.trade_tick_value
-    tick_size = sym_info.trade_tick_size
-    if tick_value <= 0 or tick_size <= 0:
+    if balance is None:
+        acct = mt5.account_info()
+        if not acct:
+            return 0.01
+        balance = acct.balance
+    spec = _symbols.for_sizing(symbol)   # tick_value vigente (varía con el tipo de cambio)
+    if not spec:
         return 0.01
-    sl_ticks = sl_dist / tick_size
-    lot = risk_amount / (sl_ticks * tick_value)
-    # Redondear al step del lote y clamp
-    lot_step = sym_info.volume_step
-    lot = round(lot / lot_step) * lot_step
-    # Cap de seguridad por símbolo (evita lotes enormes con ATR grande en oro)
-    MAX_LOT_CAPS = {
-        "XAUUSD": 0.20, "GOLD": 0.20, "XAUUSDm": 0.20,
-        "XAGUSD": 0.50, "EURUSD": 2.0, "GBPUSD": 2.0,
-        "USDJPY": 2.0,  "AUDUSD": 2.0, "USDCAD": 2.0, "USDCHF": 2.0,
-    }
-    max_cap = MAX_LOT_CAPS.get(symbol, 1.0)
-    lot = max(sym_info.volume_min, min(min(sym_info.volume_max, max_cap), lot))
-    return round(lot, 2)
+    return spec.calc_lot(balance, sl_dist, risk_pct)
+
+
+def _bar_close_delay(setup: TradeSetup, server_time: float) -> float | None:
+    """
+    Segundos desde el cierre de la vela de la señal hasta ahora. Las velas van
+    en hora del servidor: se convierte con el desfase servidor − UTC (redondeado
+    a 30 min) estimado con el último tick. None si la vela aún no había cerrado
+    (señal intrabar) o no se conoce su timeframe.
+    """
+    tf_secs = _TF_SECONDS.get(setup.bar_tf)
+    if setup.bar_time is None or not tf_secs or not server_time:
+        return None
+    offset = round((server_time - time.time()) / 1800) * 1800
+    delay = time.time() + offset - (setup.bar_time + tf_secs)
+    return delay if delay >= 0 else None
 
+def execute_trade(symbol: str, base_name: str, setup: TradeSetup, risk_pct: float, state: dict,
+                  balance: float | None = None):
+    with latency.span("execute_trade"):
+        return _execute_trade(symbol, base_name, setup, risk_pct, state, balance)
 
-def execute_trade(symbol: str, base_name: str, setup: TradeSetup, risk_pct: float, state: dict):
+def _execute_trade(symbol: str, base_name: str, setup: TradeSetup, risk_pct: float, state: dict,
+                   balance: float | None = None):
     config = SYMBOL_CONFIGS[base_name]
     is_live = config.get("live", False)
     
@@ -946,16 +1098,11 @@ def execute_trade(symbol: str, base_name: str, setup: TradeSetup, risk_pct: floa
     if is_live:
         # Ejecución real en MT5
         sl_dist = abs(setup.entry - setup.sl)
-        lot = calc_lot_size(symbol, sl_dist, risk_pct)
+        lot = calc_lot_size(symbol, sl_dist, risk_pct, balance)
         
-        # Detectar el mejor modo de ejecución (filling mode) soportado por el broker
-        s_info = mt5.symbol_info(symbol)
-        filling = mt5.ORDER_FILLING_IOC # Default
-        if s_info:
-            if s_info.filling_mode & 1: # SYMBOL_FILLING_FOK
-                filling = mt5.ORDER_FILLING_FOK
-            elif s_info.filling_mode & 2: # SYMBOL_FILLING_IOC
-                filling = mt5.ORDER_FILLING_IOC
+        # Filling mode soportado por el broker (cacheado en el registro de símbolos)
+        spec = _symbols.get(symbol)
+        filling = spec.filling if spec else mt5.ORDER_FILLING_IOC
 
         _tick = mt5.symbol_info_tick(symbol)
         if not _tick:
@@ -973,14 +1120,21 @@ def execute_trade(symbol: str, base_name: str, setup: TradeSetup, risk_pct: floa
             "comment": "XAU-LIVE-v5",
             "type_filling": filling,
         }
-        res = mt5.order_send(request)
+        with latency.span("order_send"):
+            res = mt5.order_send(request)
         if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+            # Latencia desde el cierre de la vela que dio la señal (M5 en HYBRID/ICT, etc.)
+            delay = _bar_close_delay(setup, _tick.time)
+            if delay is not None:
+                latency.record("bar_close_to_order", delay)
             tg.notify_trade_opened(symbol, setup.signal, setup.entry, setup.sl, setup.tp, lot, risk_pct)
             state["trades_today"] += 1
             save_state(state)
             return True
         else:
             retcode = res.retcode if res else "None"
+            # Rechazo del broker → la especificación cacheada puede estar obsoleta
+            _symbols.invalidate(symbol)
             
             # Mapeo de errores comunes para ayudar al usuario
             error_details = ""
@@ -1017,6 +1171,44 @@ def execute_trade(symbol: str, base_name: str, setup: TradeSetup, risk_pct: floa
         return True
     return False
 
+def close_position(pos, comment: str, price: float | None = None) -> bool:
+    """Cierra una posición MT5 a mercado. Retorna True si el broker confirmó el cierre."""
+    is_long = pos.type == mt5.POSITION_TYPE_BUY
+    if price is None:
+        tick = mt5.symbol_info_tick(pos.symbol)
+        if not tick:
+            return False
+        price = tick.bid if is_long else tick.ask
+    close_request = {
+        "action": mt5.TRADE_ACTION_DEAL,
+        "symbol": pos.symbol,
+        "volume": pos.volume,
+        "type": mt5.ORDER_TYPE_SELL if is_long else mt5.ORDER_TYPE_BUY,
+        "position": pos.ticket,
+        "price": price,
+        "magic": 123456,
+        "comment": comment,
+        "type_filling": mt5.ORDER_FILLING_IOC,
+    }
+    with latency.span("order_send"):
+        res = mt5.order_send(close_request)
+    return bool(res and res.retcode == mt5.TRADE_RETCODE_DONE)
+
+def on_equity_emergency(reason: str, action: str):
+    """Callback del EquityMonitor al cruzar el umbral de emergencia (hilo del monitor)."""
+    closed = []
+    if action == "flatten":
+        with _execution_lock:
+            for pos in mt5.positions_get() or []:
+                if pos.magic != 123456:
+                    continue
+                if close_position(pos, "EMERGENCY-FLATTEN"):
+                    closed.append(f"{pos.symbol} ${pos.profit:+.2f}")
+                else:
+                    logger.error(f"❌ EMERGENCY-FLATTEN: no se pudo cerrar {pos.symbol} #{pos.ticket}")
+    detail = ("\nCerradas: " + ", ".join(closed)) if closed else ""
+    tg.notify_error(f"{reason}\nAcción: {action.upper()}{detail}")
+
 def manage_positions(state: dict):
     now = datetime.now(timezone.utc)
     
@@ -1045,19 +1237,7 @@ def manage_positions(state: dict):
             
             # ── Cierre EOD (18:00 UTC) ─────────────────────────────
             if now.hour >= EOD_CLOSE_H:
-                close_request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
-                    "symbol": symbol,
-                    "volume": pos.volume,
-                    "type": mt5.ORDER_TYPE_SELL if is_long else mt5.ORDER_TYPE_BUY,
-                    "position": pos.ticket,
-                    "price": curr_price,
-                    "magic": 123456,
-                    "comment": "EOD-CLOSE",
-                    "type_filling": mt5.ORDER_FILLING_IOC,
-                }
-                res = mt5.order_send(close_request)
-                if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+                if close_position(pos, "EOD-CLOSE", curr_price):
                     pnl = pos.profit
                     tg.notify_eod_close(symbol, pnl)
                     logger.info(f"⏰ EOD cierre {symbol} | PnL: ${pnl:.2f}")
@@ -1123,31 +1303,24 @@ def manage_positions(state: dict):
                             tg.notify_trailing_stop(symbol, new_trail_sl)
                             logger.info(f"📈 Trailing {symbol} | SL → {new_trail_sl:.2f} (ATR trail: {trail_dist:.2f})")
 
-    # 2. Gestionar posiciones virtuales (Paper Trading)
+    # 2. Gestionar posiciones virtuales (Paper Trading) — feed de ticks completo
     if "virtual_positions" not in state: state["virtual_positions"] = []
-    active_virtual = []
-    
-    for pos in state["virtual_positions"]:
+    with latency.span("virtual_engine"):
+        active_virtual, closed_virtual = _virtual_engine.update(state["virtual_positions"])
+
+    for pos in closed_virtual:
         symbol = pos["symbol"]
-        tick = mt5.symbol_info_tick(symbol)
-        if not tick: 
-            active_virtual.append(pos)
-            continue
-            
-        curr = tick.bid if pos["signal"] == "LONG" else tick.ask
-        hit_tp = (pos["signal"] == "LONG" and curr >= pos["tp"]) or (pos["signal"] == "SHORT" and curr <= pos["tp"])
-        hit_sl = (pos["signal"] == "LONG" and curr <= pos["sl"]) or (pos["signal"] == "SHORT" and curr >= pos["sl"])
-        
-        if hit_tp or hit_sl:
-            res = "WIN ✅" if hit_tp else "LOSS ❌"
-            pnl = 1.0 if hit_tp else -1.0
-            tg._send_message(f"🧪 <b>TEST CERRADO</b>\n{symbol}\nResultado: {res}\nPrecio: {curr:.5f}")
-            logger.info(f"🧪 [VIRTUAL] {symbol} cerrado: {res}")
-            state["virtual_pnl_today"] += pnl
-        else:
-            active_virtual.append(pos)
-            
+        res = "WIN ✅" if pos["exit_reason"] == "TP" else "LOSS ❌"
+        tg._send_message(f"🧪 <b>TEST CERRADO</b>\n{symbol}\nResultado: {res} ({pos['r']:+.2f}R)\n"
+                         f"Precio: {pos['exit_price']:.5f}\nMFE: {pos['mfe_r']:+.2f}R | MAE: {pos['mae_r']:+.2f}R")
+        logger.info(f"🧪 [VIRTUAL] {symbol} cerrado: {res} {pos['r']:+.2f}R (MFE {pos['mfe_r']:+.2f}R / MAE {pos['mae_r']:+.2f}R)")
+        state["virtual_pnl_today"] += pos["r"]
+
     state["virtual_positions"] = active_virtual
+
+    # 3. Carteras sombra: todas las variantes en una sola pasada del motor
+    with latency.span("shadow_update"):
+        _shadow.update(state, _virtual_engine)
     save_state(state)
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1217,76 +1390,238 @@ def would_conflict_usd(base_name: str, signal: str) -> bool:
         return True
     return False
 
+# ─────────────────────────────────────────────────────────────────────────────
+# EVALUACIÓN CONCURRENTE DE SEÑALES
+# ─────────────────────────────────────────────────────────────────────────────
+
+_signal_pool = ThreadPoolExecutor(max_workers=SIGNAL_WORKERS, thread_name_prefix="signal")
+_inflight_signals: dict = {}  # base_name -> Future del último ciclo
+
+def get_strategy_signal(symbol: str, base_name: str, cfg: dict | None = None,
+                        bars: BarView | None = None) -> TradeSetup | None:
+    """Despacha a la estrategia registrada: ventana horaria → prefetch único → señal."""
+    cfg = cfg or SYMBOL_CONFIGS[base_name]
+    spec = strategy_registry.get(cfg["strategy"])
+    if spec is None:
+        logger.warning(f"⚠️ [{base_name}] Estrategia desconocida: {cfg['strategy']}")
+        return None
+    now = bars.now if bars is not None else datetime.now(timezone.utc)
+    if not spec.in_session(now):
+        return None   # Fuera de ventana: ni siquiera se descargan velas
+    if bars is None:
+        with latency.span("prefetch"):
+            bars = strategy_registry.prefetch(symbol, spec.name, cfg, get_candles, now)
+    with latency.span(f"strategy:{spec.name}"):
+        return spec.func(symbol, base_name, bars, cfg)
+
+def has_open_position(symbol: str, base_name: str, state: dict) -> bool:
+    if SYMBOL_CONFIGS[base_name].get("live"):
+        # MT5 no filtra por magic en positions_get → filtrar en Python
+        return any(p.magic == 123456 for p in (mt5.positions_get(symbol=symbol) or []))
+    return any(p["symbol"] == symbol for p in state.get("virtual_positions", []))
+
+_equity_monitor: EquityMonitor | None = None
+
+def evaluate_and_execute(base_name: str, symbol: str, risk_pct: float, state: dict,
+                         deadline: float | None = None) -> TradeSetup | None:
+    """
+    Worker: evalúa la señal fuera del lock (estrategias en paralelo; las
+    llamadas a MT5 van en serie, ver mt5_io.py) y solo serializa la parte con
+    efectos: re-chequeo de posición y de PropFirmGuard, filtro USD y orden.
+
+    `deadline` (time.monotonic) es el fin de la espera del ciclo que lanzó el
+    worker: si se supera, el riesgo es de un ciclo viejo y no se opera.
+    """
+    cfg = SYMBOL_CONFIGS[base_name]
+    now = datetime.now(timezone.utc)
+    spec = strategy_registry.get(cfg["strategy"])
+    if spec is None or not spec.in_session(now) or has_open_position(symbol, base_name, state):
+        return None
+
+    # Las variantes sombra reutilizan las velas de la principal: ninguna descarga extra
+    with latency.span("prefetch"):
+        bars = strategy_registry.prefetch(symbol, spec.name, cfg, get_candles, now)
+    shadow_active = _shadow.active_variants(base_name, cfg, now,
+                                            strategy_registry.requirements(spec.name, cfg, now))
+    if shadow_active:
+        with latency.span("shadow"):
+            _shadow.evaluate(state, symbol, base_name, bars, shadow_active)
+
+    setup = get_strategy_signal(symbol, base_name, cfg, bars)
+    if not setup:
+        return None
+
+    with _execution_lock:
+        if deadline is not None and time.monotonic() > deadline:
+            logger.warning(f"⏱️ [{base_name}] Señal {setup.signal} descartada: evaluación fuera de plazo "
+                           f"(> {SIGNAL_TIMEOUT_SECS:.0f}s)")
+            return None
+        # Re-verificar dentro del lock: otro worker pudo abrir posición mientras evaluábamos
+        if has_open_position(symbol, base_name, state):
+            return None
+        # DD con la equity de AHORA (no la del inicio del ciclo)
+        guard = PropFirmGuard(state)
+        can_trade, reason = guard.can_trade()
+        if not can_trade:
+            logger.warning(f"⛔ [{base_name}] Entrada bloqueada por PropFirmGuard: {reason}")
+            return None
+        # El EquityMonitor puede haber bloqueado o recortado el riesgo a mitad de ciclo
+        if _equity_monitor is not None:
+            if _equity_monitor.blocked:
+                logger.warning(f"⛔ [{base_name}] Entrada bloqueada por EquityMonitor: {_equity_monitor.block_reason}")
+                return None
+            if _equity_monitor.risk_cut:
+                risk_pct = min(risk_pct, PROP_FIRM["reduced_risk"])
+        # 🔒 FILTRO DE CORRELACIÓN USD: Bloquear si el trade conflicta con posiciones abiertas
+        if SYMBOL_CONFIGS[base_name].get("live") and would_conflict_usd(base_name, setup.signal):
+            net_dir = "LONG" if get_net_usd_direction() > 0 else "SHORT"
+            logger.warning(f"⛔ [{base_name}] Bloqueado: conflicto USD ({setup.signal} vs posición neta {net_dir} USD)")
+            return None
+        execute_trade(symbol, base_name, setup, risk_pct, state, guard.balance)
+    return setup
+
+def run_signal_evaluation(active_symbols: dict, risk_pct: float, state: dict):
+    """Lanza la evaluación de todos los símbolos en el pool y espera con timeout."""
+    futures = {}
+    deadline = time.monotonic() + SIGNAL_TIMEOUT_SECS
+    for base_name, symbol in active_symbols.items():
+        prev = _inflight_signals.get(base_name)
+        if prev is not None and not prev.done():
+            # Un worker rezagado del ciclo anterior sigue vivo: no duplicar evaluación
+            logger.warning(f"⏳ [{base_name}] Evaluación anterior aún en curso — se salta este ciclo")
+            continue
+        fut = _signal_pool.submit(evaluate_and_execute, base_name, symbol, risk_pct, state, deadline)
+        _inflight_signals[base_name] = fut
+        futures[fut] = base_name
+
+    if not futures:
+        return
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+    for fut in done:
+        exc = fut.exception()
+        if exc is not None:
+            logger.error(f"❌ [{futures[fut]}] Error evaluando señal: {exc}")
+    for fut in not_done:
+        logger.warning(f"⏱️ [{futures[fut]}] Evaluación de señal supera {SIGNAL_TIMEOUT_SECS:.0f}s — "
+                       f"sigue en segundo plano, pero ya no abrirá órdenes")
+
 # ─────────────────────────────────────────────────────────────────────────────
 # LOOP
 # ─────────────────────────────────────────────────────────────────────────────
 
-def run_bot():
+# 🔒 Solo una instancia opera a la vez (relevo sin downtime en auto_update)
+_trading_lock = TradingLock()
+
+def warm_up(active_symbols: dict):
+    """Precarga las velas de la estrategia (ignorando la ventana horaria)."""
+    for base_name, symbol in active_symbols.items():
+        cfg = SYMBOL_CONFIGS[base_name]
+        try:
+            strategy_registry.prefetch(symbol, cfg["strategy"], cfg, get_candles)
+        except Exception as e:
+            logger.warning(f"⚠️ Warm-up {base_name}: {e}")
+
+def _wait_next_cycle(secs: float) -> int | None:
+    """Espera al próximo ciclo; devuelve el pid del sucesor si pide el relevo."""
+    deadline = time.time() + secs
+    while time.time() < deadline:
+        successor = _trading_lock.handoff_requested()
+        if successor:
+            return successor
+        time.sleep(min(1.0, max(0.0, deadline - time.time())))
+    return None
+
+def _drain(state: dict, account: tuple, successor: int | None):
+    """Cierre ordenado: señales en curso, estado, snapshot y lock (transferido al sucesor)."""
+    if successor:
+        logger.info(f"🔁 Handoff: drenando para el pid {successor}...")
+    pending = [f for f in _inflight_signals.values() if not f.done()]
+    if pending:
+        wait(pending, timeout=SIGNAL_TIMEOUT_SECS)
+    _signal_pool.shutdown(wait=False, cancel_futures=True)
+    if _equity_monitor is not None:
+        _equity_monitor.stop()
+    flush_state(state)
+    _warm.save(account)
+    _trading_lock.release(successor)
+
+def run_bot(handoff: bool = False):
+    global _equity_monitor
     if not connect_mt5(): return
+
+    # ♨️ Warm start: buffers de velas, alias y régimen D1 del proceso anterior
+    account = _account_key()
+    _warm.restore(account)
+
+    # Overlay de configuración antes de resolver símbolos
+    _config.check()
+
+    # Resolución de alias una sola vez al arrancar (cacheada en el registro)
+    active_symbols = _symbols.resolve_all()
+
+    # 🔒 Lock de trading: relevo (--handoff) o standby si otra instancia opera
+    if not _trading_lock.try_acquire():
+        holder = (_trading_lock.holder() or {}).get("pid", "?")
+        if handoff:
+            warm_up(active_symbols)
+            _trading_lock.signal_ready()
+        else:
+            logger.warning(f"💤 Standby: la instancia pid {holder} tiene el lock de trading")
+        _trading_lock.wait_acquire()
+    atexit.register(_trading_lock.release)
+    atexit.register(_warm.save, account)
+
+    # Estado leído CON el lock: en un relevo, el proceso anterior acaba de escribirlo
     state = load_state()
-    # find_symbol una sola vez por símbolo (evita doble llamada a MT5 API)
-    active_symbols = {bn: sym for bn in SYMBOL_CONFIGS if (sym := find_symbol(bn))}
+
+    # 👁️ Vigilancia de equity en tiempo real (cadencia propia, independiente del loop)
+    _equity_monitor = EquityMonitor(state, PROP_FIRM, on_equity_emergency)
+    _equity_monitor.start()
     
     # Throttle: solo enviar notificacion de inicio una vez por dia (evita spam en reinicios)
     today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     if state.get("last_started_notify") != today_str:
         tg.notify_bot_started(list(active_symbols.keys()), PROP_FIRM["base_risk"])
         state["last_started_notify"] = today_str
-        save_state(state)
+        flush_state(state)
 
+    successor = None
     while True:
-        if not ensure_connected(): break
+        if not _trading_lock.owned():
+            logger.error("🔒 Lock de trading perdido — esta instancia deja de operar")
+            return
+        _candle_cache.new_cycle()
+        config_diff = _config.check()
+        if config_diff:
+            active_symbols = apply_config_changes(config_diff, active_symbols)
+        with latency.span("ensure_connected"):
+            if not ensure_connected(): break
         
-        manage_positions(state)
+        with latency.span("manage_positions"), _execution_lock:
+            manage_positions(state)
         
         # 🛡️ Prop Firm Guard
-        guard = PropFirmGuard(state)
-        state["prop_firm"] = guard.get_status_dict()
+        with latency.span("prop_firm_guard"):
+            guard = PropFirmGuard(state)
+            state["prop_firm"] = guard.get_status_dict()
         
         can_trade, reason = guard.can_trade()
+        if can_trade and _equity_monitor.blocked:
+            can_trade, reason = False, _equity_monitor.block_reason
         if not can_trade:
             logger.warning(f"🛑 TRADING BLOQUEADO: {reason}")
             if not state.get("dd_alert_sent_today"):
                 tg.notify_error(f"🛑 TRADING BLOQUEADO\n{reason}\nDaily DD: {guard.daily_dd:.2%}\nTotal DD: {guard.total_dd:.2%}")
                 state["dd_alert_sent_today"] = True
-            save_state(state)
-            time.sleep(60)
+            flush_state(state)
+            successor = _wait_next_cycle(60)
+            if successor: break
             continue
         
         risk_pct = guard.get_risk_pct()
         
-        for base_name, symbol in active_symbols.items():
-            config = SYMBOL_CONFIGS[base_name]
-            
-            has_pos = False
-            if config.get("live"):
-                # MT5 no filtra por magic en positions_get → filtrar en Python
-                has_pos = any(p.magic == 123456 for p in (mt5.positions_get(symbol=symbol) or []))
-            else:
-                has_pos = any(p["symbol"] == symbol for p in state.get("virtual_positions", []))
-                
-            if not has_pos:
-                setup = None
-                if config["strategy"] == "ASIAN_BREAKOUT":
-                    setup = get_signal_asian_breakout(symbol, base_name)
-                elif config["strategy"] == "MEAN_REVERSION":
-                    setup = get_signal_mean_reversion(symbol, base_name)
-                elif config["strategy"] == "INDICATOR_TREND":
-                    setup = get_signal_indicator_trend(symbol, base_name)
-                elif config["strategy"] == "ENSEMBLE":
-                    setup = get_signal_ensemble(symbol, base_name)
-                elif config["strategy"] == "TREND_MOMENTUM_D1":
-                    setup = get_signal_trend_momentum_d1(symbol, base_name)
-                elif config["strategy"] == "HYBRID_D1_ICT":
-                    setup = get_signal_hybrid_d1_ict(symbol, base_name)
-
-                if setup:
-                    # 🔒 FILTRO DE CORRELACIÓN USD: Bloquear si el trade conflicta con posiciones abiertas
-                    if config.get("live") and would_conflict_usd(base_name, setup.signal):
-                        net_dir = "LONG" if get_net_usd_direction() > 0 else "SHORT"
-                        logger.warning(f"⛔ [{base_name}] Bloqueado: conflicto USD ({setup.signal} vs posición neta {net_dir} USD)")
-                    else:
-                        execute_trade(symbol, base_name, setup, risk_pct, state)
+        with latency.span("signals"):
+            run_signal_evaluation(active_symbols, risk_pct, state)
         
         # Reset diario y Reporte Semanal
         now_dt = datetime.now(timezone.utc)
@@ -1297,6 +1632,7 @@ def run_bot():
                 current_week = now_dt.strftime("%Y-%W")
                 if state.get("last_weekly_report") != current_week:
                     logger.info("📅 Generando reporte semanal automático...")
+                    from analyze_losses import generate_weekly_report   # Diferido: solo los domingos
                     report = generate_weekly_report()
                     tg.notify_weekly_report(report)
                     state["last_weekly_report"] = current_week
@@ -1308,13 +1644,19 @@ def run_bot():
             state["virtual_pnl_today"] = 0.0
             state["dd_alert_sent_today"] = False
         
-        save_state(state)
-        time.sleep(60)
+        flush_state(state)
+        _warm.maybe_save(account)
+        successor = _wait_next_cycle(60)
+        if successor: break
+
+    _drain(state, account, successor)
 
 def find_symbol(base_name: str) -> str | None:
-    for name in SYMBOL_CONFIGS[base_name].get("aliases", [base_name]):
-        if mt5.symbol_info(name): return name
-    return None
+    return _symbols.resolve(base_name)
 
 if __name__ == "__main__":
-    run_bot()
+    parser = argparse.ArgumentParser(description="Bot MT5 XAUUSD")
+    parser.add_argument("--handoff", action="store_true",
+                        help="Arrancar en caliente y tomar el relevo de la instancia en marcha")
+    args, _ = parser.parse_known_args()   # watchdog.bat pasa --risk/--interval (legacy)
+    run_bot(handoff=args.handoff)
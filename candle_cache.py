@@ -0,0 +1,140 @@
+"""
+candle_cache.py — Caché de velas por ciclo (deduplicación de peticiones a MT5)
+===============================================================================
+En un mismo ciclo, calculate_radar, la estrategia, ICT Silver Bullet (llamada
+desde el radar y desde HYBRID) y el trailing de manage_positions piden las
+mismas velas (símbolo, timeframe) varias veces.
+
+CandleCache se coloca delante de get_candles:
+  - La primera petición de (símbolo, timeframe) del ciclo refresca el buffer.
+  - Peticiones posteriores con count <= al descargado se sirven cortando
+    la cola del DataFrame cacheado (mismo resultado que copy_rates_from_pos).
+  - Una petición con count mayor vuelve a descargar y reemplaza la entrada.
+  - new_cycle() marca los buffers como pendientes de refresco.
+
+Buffers persistentes (warm start): si se conoce la duración del timeframe, el
+refresco solo descarga las velas nuevas desde la última guardada (+ la vela en
+curso) y las fusiona con el buffer. snapshot()/restore() permiten que un
+reinicio arranque con los buffers del proceso anterior.
+
+Las velas de MT5 vienen en hora del SERVIDOR del broker (GMT+2/+3 en la
+mayoría de prop firms), etiquetada como UTC. El hueco desde la última vela se
+mide con server_now(símbolo) (hora del último tick) en esa misma escala; con
+time.time() el desfase dejaba n_new <= 0 y siempre se descargaba todo.
+
+Siempre devuelve COPIAS: las estrategias añaden columnas (ema, rsi...) al df.
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+OVERLAP_BARS = 2   # Velas re-descargadas al refrescar (la última puede estar en curso)
+
+
+class CandleCache:
+    """Caché (símbolo, timeframe) → DataFrame con refresco incremental por ciclo."""
+
+    def __init__(self, tf_seconds: dict | None = None, server_now=None):
+        self.tf_seconds = tf_seconds or {}
+        self.server_now = server_now   # símbolo → epoch en la escala de las velas (None = desconocido)
+        self._data: dict[tuple, pd.DataFrame] = {}
+        self._fresh: set = set()    # Claves ya refrescadas en el ciclo actual
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.total_hits = 0
+        self.total_misses = 0
+        self.incremental = 0
+
+    def new_cycle(self):
+        """Marca los buffers como pendientes de refresco y reinicia los contadores del ciclo."""
+        with self._lock:
+            self._fresh.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def _enough(df: pd.DataFrame, count: int) -> bool:
+        return len(df) >= count or df.attrs.get("requested", 0) >= count
+
+    def get(self, symbol: str, timeframe, count: int, fetch) -> pd.DataFrame:
+        """
+        Devuelve las últimas `count` velas de (symbol, timeframe).
+        `fetch(symbol, timeframe, count)` se usa solo cuando no hay datos suficientes.
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            cached = self._data.get(key)
+            if cached is not None and key in self._fresh and self._enough(cached, count):
+                self.hits += 1
+                self.total_hits += 1
+                return cached.iloc[-count:].copy()
+
+        df = None
+        if cached is not None and self._enough(cached, count):
+            df = self._refresh(symbol, timeframe, cached, fetch)
+        if df is None:
+            df = fetch(symbol, timeframe, count)
+            if not df.empty:
+                # Si MT5 devolvió menos velas de las pedidas, recordar el count pedido
+                # para no volver a descargar en cada llamada del mismo ciclo
+                df.attrs["requested"] = count
+        with self._lock:
+            self.misses += 1
+            self.total_misses += 1
+            if not df.empty:
+                self._data[key] = df
+                self._fresh.add(key)
+        return df.iloc[-count:].copy()
+
+    def _refresh(self, symbol: str, timeframe, cached: pd.DataFrame, fetch) -> pd.DataFrame | None:
+        """Descarga solo las velas nuevas y las fusiona. None → hace falta descarga completa."""
+        tf_secs = self.tf_seconds.get(timeframe)
+        if not tf_secs or cached.empty:
+            return None
+        last_ts = cached.index[-1].timestamp()
+        now = self.server_now(symbol) if self.server_now else None
+        if now is None:
+            now = time.time()
+        # Nunca menos que el solape: si el reloj se queda corto, el chequeo de
+        # solape de abajo detecta el hueco y se descarga todo
+        n_new = max(int((now - last_ts) // tf_secs), 0) + OVERLAP_BARS
+        requested = cached.attrs.get("requested", len(cached))
+        if n_new >= requested:
+            return None
+        new = fetch(symbol, timeframe, n_new)
+        if new.empty or new.index[0] > cached.index[-1]:
+            return None   # Sin solape con el buffer: hueco en los datos → descarga completa
+        merged = pd.concat([cached[cached.index < new.index[0]], new])
+        merged = merged.iloc[-requested:]
+        merged.attrs["requested"] = requested
+        self.incremental += 1
+        return merged
+
+    def snapshot(self) -> dict:
+        """Buffers para el warm start: {(símbolo, tf): (DataFrame, requested)}."""
+        with self._lock:
+            return {k: (df, df.attrs.get("requested", len(df))) for k, df in self._data.items()}
+
+    def restore(self, buffers: dict):
+        with self._lock:
+            for key, (df, requested) in buffers.items():
+                df.attrs["requested"] = requested
+                self._data[key] = df
+            self._fresh.clear()
+
+    def stats(self) -> dict:
+        """Hit rate del ciclo actual y acumulado (para logs y el dashboard)."""
+        cycle_total = self.hits + self.misses
+        total = self.total_hits + self.total_misses
+        return {
+            "cycle_hits": self.hits,
+            "cycle_misses": self.misses,
+            "cycle_hit_rate": round(self.hits / cycle_total * 100, 1) if cycle_total else 0.0,
+            "total_hits": self.total_hits,
+            "total_misses": self.total_misses,
+            "total_hit_rate": round(self.total_hits / total * 100, 1) if total else 0.0,
+            "incremental_refreshes": self.incremental,
+        }
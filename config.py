@@ -15,6 +15,11 @@ API_KEY    = os.getenv("BINANCE_TESTNET_API_KEY", "")
 SECRET_KEY = os.getenv("BINANCE_TESTNET_SECRET_KEY", "")
 USE_TESTNET = os.getenv("USE_TESTNET", "True").lower() == "true"
 
+# Servidor alternativo (p. ej. mock_binance.py para pruebas de carga sin red).
+# Vacío = endpoints reales de Binance / Testnet.
+BINANCE_BASE_URL = os.getenv("BINANCE_BASE_URL", "").rstrip("/")   # ej: http://127.0.0.1:8090
+BINANCE_WS_URL   = os.getenv("BINANCE_WS_URL", "").rstrip("/")     # ej: ws://127.0.0.1:8091
+
 # ─────────────────────────────────────────────
 # PARES Y TIMEFRAME
 # ─────────────────────────────────────────────
@@ -97,3 +102,17 @@ LOG_CONSOLE = True
 def get_symbol_config(symbol: str) -> dict:
     """Retorna la configuración específica para un par."""
     return SYMBOL_CONFIG.get(symbol, DEFAULT_CONFIG)
+
+
+def use_binance_endpoint():
+    """
+    Si BINANCE_BASE_URL está definido, redirige todos los Client de
+    python-binance a ese servidor (Spot, Futures y Testnet). Hay que llamarlo
+    antes de crear cualquier Client: el constructor ya hace un ping.
+    """
+    if not BINANCE_BASE_URL:
+        return
+    from binance.client import Client
+    Client.API_URL = Client.API_TESTNET_URL = BINANCE_BASE_URL + "/api"
+    Client.FUTURES_URL = Client.FUTURES_TESTNET_URL = BINANCE_BASE_URL + "/fapi"
+    Client.FUTURES_DATA_URL = Client.FUTURES_DATA_TESTNET_URL = BINANCE_BASE_URL + "/futures/data"
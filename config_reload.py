@@ -0,0 +1,206 @@
+"""
+config_reload.py — Recarga en caliente de SYMBOL_CONFIGS y PROP_FIRM
+=====================================================================
+Cambiar un parámetro de riesgo o activar un símbolo obligaba a editar
+bot_mt5.py / .env y reiniciar (perdiendo el estado en memoria).
+
+Ahora los valores por defecto siguen en bot_mt5.py y bot_config_mt5.json
+(opcional, ver bot_config_mt5.example.json) es un overlay que el bot relee
+entre ciclos cuando cambia su mtime/tamaño:
+
+    {
+      "symbols":   {"XAUUSD": {"adx_min": 22.0}, "EURUSD": {"live": true}},
+      "prop_firm": {"base_risk": 0.40}
+    }
+
+  1. Lee y parsea el archivo completo (un guardado a medias no se aplica).
+  2. Valida claves, tipos, rangos y las claves que exige la estrategia
+     (strategy_registry params) → si algo falla se mantiene la config actual.
+  3. Calcula el diff contra la config efectiva actual.
+  4. Aplica IN PLACE (los dicts son los mismos objetos que usan el registro de
+     símbolos, el EquityMonitor, etc.) y devuelve el diff para que el bot
+     reconstruya solo lo afectado.
+
+Borrar el archivo vuelve a los valores por defecto del código.
+"""
+
+import copy
+import json
+import os
+import threading
+
+import logger
+
+CONFIG_FILE = os.getenv("BOT_CONFIG_FILE", "bot_config_mt5.json")
+
+# clave → (tipos aceptados, validador)
+_SYMBOL_KEYS = {
+    "aliases":   (list,         lambda v: bool(v) and all(isinstance(a, str) for a in v)),
+    "strategy":  (str,          None),   # se valida contra el registro de estrategias
+    "live":      (bool,         None),
+    "timeframe": (str,          None),   # nombre: "M5", "H1"... → constante MT5
+    "adx_min":   ((int, float), lambda v: 0 <= v <= 100),
+    "min_range": ((int, float), lambda v: v >= 0),
+    "max_range": ((int, float), lambda v: v > 0),
+    "sl_buffer": ((int, float), lambda v: 0 <= v < 1),
+    "tp_mult":   ((int, float), lambda v: v > 0),
+}
+_PROP_KEYS = {
+    "starting_balance":       ((int, float), lambda v: v > 0),
+    "daily_dd_limit":         ((int, float), lambda v: 0 < v < 1),
+    "max_dd_limit":           ((int, float), lambda v: 0 < v < 1),
+    "base_risk":              ((int, float), lambda v: 0 < v <= 5),
+    "reduced_risk":           ((int, float), lambda v: 0 < v <= 5),
+    "max_consecutive_losses": (int,          lambda v: v >= 1),
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class ConfigReloader:
+    """Overlay JSON vigilado sobre los dicts de configuración del bot."""
+
+    def __init__(self, symbol_configs: dict, prop_firm: dict, timeframes: dict,
+                 strategies, lock=None, path: str = CONFIG_FILE, required=None):
+        self.symbol_configs = symbol_configs
+        self.prop_firm = prop_firm
+        self.timeframes = timeframes            # "H1" → mt5.TIMEFRAME_H1
+        self._tf_names = {v: k for k, v in timeframes.items()}
+        self.strategies = strategies            # callable() → nombres registrados
+        self.required = required or (lambda name: set())   # estrategia → claves obligatorias
+        self.lock = lock or threading.RLock()
+        self.path = path
+        self._defaults = (copy.deepcopy(symbol_configs), copy.deepcopy(prop_firm))
+        self._signature = None
+
+    # ── Lectura + validación ─────────────────────────────────────────────
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _check_value(self, where: str, key: str, value, spec: dict):
+        if key not in spec:
+            raise ConfigError(f"{where}: clave desconocida '{key}'")
+        types, check = spec[key]
+        if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+            raise ConfigError(f"{where}.{key}: tipo inválido ({value!r})")
+        if check and not check(value):
+            raise ConfigError(f"{where}.{key}: valor fuera de rango ({value!r})")
+
+    def build(self, overlay: dict) -> tuple[dict, dict]:
+        """Config efectiva = defaults del código + overlay validado."""
+        if not isinstance(overlay, dict):
+            raise ConfigError("la raíz debe ser un objeto JSON")
+        unknown = set(overlay) - {"symbols", "prop_firm"}
+        if unknown:
+            raise ConfigError(f"secciones desconocidas: {sorted(unknown)}")
+
+        symbols, prop = copy.deepcopy(self._defaults[0]), copy.deepcopy(self._defaults[1])
+        known_strategies = set(self.strategies())
+
+        for base, values in (overlay.get("symbols") or {}).items():
+            if not isinstance(values, dict):
+                raise ConfigError(f"symbols.{base}: debe ser un objeto")
+            values = dict(values)
+            for key, value in values.items():
+                self._check_value(f"symbols.{base}", key, value, _SYMBOL_KEYS)
+            if "timeframe" in values:
+                if values["timeframe"] not in self.timeframes:
+                    raise ConfigError(f"symbols.{base}.timeframe: '{values['timeframe']}' no soportado")
+                values["timeframe"] = self.timeframes[values["timeframe"]]
+            if base not in symbols:
+                missing = {"aliases", "strategy", "timeframe"} - set(values)
+                if missing:
+                    raise ConfigError(f"symbols.{base}: símbolo nuevo sin {sorted(missing)}")
+                symbols[base] = {"live": False, "adx_min": 20.0}
+            symbols[base].update(values)
+            if symbols[base]["strategy"] not in known_strategies:
+                raise ConfigError(f"symbols.{base}.strategy: '{symbols[base]['strategy']}' no registrada")
+            # Símbolo nuevo o cambio de estrategia: la config final debe tener lo que la estrategia lee
+            missing = self.required(symbols[base]["strategy"]) - set(symbols[base])
+            if missing:
+                raise ConfigError(f"symbols.{base}: {symbols[base]['strategy']} requiere {sorted(missing)}")
+
+        for key, value in (overlay.get("prop_firm") or {}).items():
+            self._check_value("prop_firm", key, value, _PROP_KEYS)
+            prop[key] = value
+        if prop["reduced_risk"] > prop["base_risk"]:
+            raise ConfigError("prop_firm: reduced_risk no puede superar base_risk")
+        if prop["daily_dd_limit"] > prop["max_dd_limit"]:
+            raise ConfigError("prop_firm: daily_dd_limit no puede superar max_dd_limit")
+        return symbols, prop
+
+    # ── Diff + aplicación ────────────────────────────────────────────────
+    def diff(self, symbols: dict, prop: dict) -> dict:
+        out = {"symbols": {}, "prop_firm": {}}
+        for base in set(self.symbol_configs) | set(symbols):
+            old, new = self.symbol_configs.get(base), symbols.get(base)
+            if old is None or new is None:
+                out["symbols"][base] = {"*": (old is not None, new is not None)}
+                continue
+            changes = {k: (old.get(k), new.get(k)) for k in set(old) | set(new) if old.get(k) != new.get(k)}
+            if changes:
+                out["symbols"][base] = changes
+        for key in set(self.prop_firm) | set(prop):
+            if self.prop_firm.get(key) != prop.get(key):
+                out["prop_firm"][key] = (self.prop_firm.get(key), prop.get(key))
+        return out
+
+    def _apply(self, symbols: dict, prop: dict):
+        for base in list(self.symbol_configs):
+            if base not in symbols:
+                del self.symbol_configs[base]
+        for base, cfg in symbols.items():
+            if base in self.symbol_configs:
+                # Sin clear(): un worker que lea el dict nunca lo ve vacío
+                current = self.symbol_configs[base]
+                current.update(cfg)
+                for key in set(current) - set(cfg):
+                    del current[key]
+            else:
+                self.symbol_configs[base] = cfg
+        self.prop_firm.update(prop)
+
+    def describe(self, diff: dict) -> list[str]:
+        fmt = lambda k, v: self._tf_names.get(v, v) if k == "timeframe" else v
+        lines = []
+        for base, changes in sorted(diff["symbols"].items()):
+            if "*" in changes:
+                lines.append(f"{base}: {'añadido' if changes['*'][1] else 'eliminado'}")
+                continue
+            for k, (old, new) in sorted(changes.items()):
+                lines.append(f"{base}.{k}: {fmt(k, old)} → {fmt(k, new)}")
+        for k, (old, new) in sorted(diff["prop_firm"].items()):
+            lines.append(f"prop_firm.{k}: {old} → {new}")
+        return lines
+
+    def check(self) -> dict | None:
+        """Recarga si el archivo cambió. Retorna el diff aplicado, o None si no hubo cambios."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return None
+        self._signature = signature
+        try:
+            if signature is None:
+                overlay = {}   # Archivo eliminado → defaults del código
+            else:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    overlay = json.load(f)
+            symbols, prop = self.build(overlay)
+        except (OSError, ValueError) as e:
+            logger.error(f"⚙️ Config {self.path} inválida — se mantiene la actual: {e}")
+            return None
+
+        diff = self.diff(symbols, prop)
+        if not diff["symbols"] and not diff["prop_firm"]:
+            return None
+        with self.lock:
+            self._apply(symbols, prop)
+        for line in self.describe(diff):
+            logger.info(f"⚙️ Config: {line}")
+        return diff
@@ -11,13 +11,31 @@ import threading
 from datetime import datetime, timezone
 from flask import Flask, jsonify, render_template, Response
 
-from binance.client import Client
 import config
+import rest_scheduler
+from funding import FundingSnapshot
 
 app = Flask(__name__)
 
-# Cliente público Binance (sin auth)
-public_client = Client("", "")
+# Cliente público Binance (sin auth). Se crea en la primera petición: importar
+# python-binance y el ping de Client() no bloquean el arranque del servidor.
+# Sus lecturas tienen la prioridad más baja del planificador de peso REST: se
+# descartan antes de acercarse al límite que comparten bot y paper trading.
+_public_client = None
+_public_client_lock = threading.Lock()
+
+def get_public_client():
+    global _public_client
+    if _public_client is None:
+        with _public_client_lock:
+            if _public_client is None:
+                from binance.client import Client
+                config.use_binance_endpoint()
+                _public_client = rest_scheduler.install(Client("", ""), rest_scheduler.DASHBOARD)
+    return _public_client
+
+# premiumIndex de todos los pares en una petición, compartido por todas las vistas
+funding = FundingSnapshot(lambda: get_public_client().futures_mark_price())
 
 # ─────────────────────────────────────────────────────────────────────────────
 # ESTADO COMPARTIDO (actualizado por paper_trade.py via archivo JSON)
@@ -52,7 +70,7 @@ def get_market_prices() -> dict:
     prices = {}
     for symbol in config.SYMBOLS:
         try:
-            ticker = public_client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_public_client().futures_symbol_ticker(symbol=symbol)
             prices[symbol] = float(ticker["price"])
         except Exception:
             prices[symbol] = 0.0
@@ -60,37 +78,22 @@ def get_market_prices() -> dict:
 
 def get_funding_rates() -> dict:
     """Obtiene el funding rate de todos los pares (API pública)."""
-    rates = {}
-    for symbol in config.SYMBOLS:
-        try:
-            data = public_client.futures_funding_rate(symbol=symbol, limit=1)
-            rates[symbol] = float(data[-1]["fundingRate"]) * 100 if data else 0.0
-        except Exception:
-            rates[symbol] = 0.0
-    return rates
+    return {symbol: funding.funding_rate(symbol) * 100 for symbol in config.SYMBOLS}
 
 def get_signal_proximity() -> list[dict]:
     """
     Para cada par, calcula los indicadores actuales y devuelve
     qué tan cerca está cada uno de generar una señal (0-100%).
     """
-    import pandas as pd
+    from kline_parser import klines_to_frame
     from indicators import add_indicators, get_last_signal_data
     from config import get_symbol_config
 
     result = []
     for symbol in config.SYMBOLS:
         try:
-            raw = public_client.futures_klines(symbol=symbol, interval=config.TIMEFRAME, limit=200)
-            df = pd.DataFrame(raw, columns=[
-                "timestamp","open","high","low","close","volume",
-                "close_time","quote_volume","trades","taker_buy_base","taker_buy_quote","ignore"
-            ])
-            df = df[["timestamp","open","high","low","close","volume"]].copy()
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            for col in ["open","high","low","close","volume"]:
-                df[col] = df[col].astype(float)
-            df.set_index("timestamp", inplace=True)
+            raw = get_public_client().futures_klines(symbol=symbol, interval=config.TIMEFRAME, limit=200)
+            df = klines_to_frame(raw)
 
             df = add_indicators(df)
             data = get_last_signal_data(df)
@@ -103,11 +106,7 @@ def get_signal_proximity() -> list[dict]:
             ema_cross = data["ema_cross"]  # +1 bull, -1 bear, 0 none
 
             # ── Funding Rate ────────────────────────────────────────────
-            try:
-                fr_data = public_client.futures_funding_rate(symbol=symbol, limit=1)
-                funding_rate = float(fr_data[-1]["fundingRate"]) * 100 if fr_data else 0.0
-            except Exception:
-                funding_rate = 0.0
+            funding_rate = funding.funding_rate(symbol) * 100
 
             # ── Proximidad LONG (0-100 cada indicador) ──────────────────
             # RSI: qué tan cerca está de rsi_long (umbral)
@@ -226,6 +225,11 @@ def api_signals():
     """Proximidad de cada par a generar una señal de trading."""
     return jsonify(get_signal_proximity())
 
+@app.route("/api/rest-weight")
+def api_rest_weight():
+    """Peso REST de Binance usado en el minuto actual (compartido entre procesos)."""
+    return jsonify(rest_scheduler.SCHEDULER.stats())
+
 @app.route("/api/config")
 def api_config():
     """Devuelve la configuración activa del bot (timeframe, pares, etc.)."""
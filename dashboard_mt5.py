@@ -32,6 +32,8 @@ if sys.stdout.encoding.lower() != 'utf-8':
         sys.stderr.reconfigure(encoding='utf-8')
     except: pass
 
+from state_store import atomic_write_json, load_split_state
+
 app = Flask(__name__)
 CORS(app)
 
@@ -59,6 +61,7 @@ BOT_INSTANCE = _detect_instance()
 
 # Configuración
 STATE_FILE = "bot_state_mt5_v5.json"
+STATE_HISTORY_FILE = "bot_state_mt5_v5_history.json"  # Campos cold escritos aparte por el bot
 BOT_SCRIPT = "bot_mt5.py"
 BOT_PROCESS = None
 
@@ -83,17 +86,12 @@ def get_bot_status():
 
 def read_state():
     """Lee el archivo de estado generado por el bot."""
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, "r") as f:
-                data = json.load(f)
-                # Verificar si el estado es reciente (máx 2 minutos)
-                last_upd = data.get("last_update", "")
-                is_running_proc, _ = get_bot_status()
-                data["is_running"] = is_running_proc
-                return data
-        except Exception:
-            pass
+    # El bot escribe de forma atómica (tmp + rename): nunca leemos un archivo a medias
+    data = load_split_state(STATE_FILE, STATE_HISTORY_FILE)
+    if data is not None:
+        is_running_proc, _ = get_bot_status()
+        data["is_running"] = is_running_proc
+        return data
     return {"running": False, "is_running": False, "error": "No hay archivo de estado"}
 
 def is_trading_hours() -> dict:
@@ -375,8 +373,7 @@ def api_reset_prop_state():
             "status_msg":         "OK — reset manual"
         }
 
-        with open(state_file, "w", encoding="utf-8") as f:
-            _json.dump(s, f, indent=2)
+        atomic_write_json(state_file, s)
 
         return jsonify({"ok": True, "new_balance": real_balance, "starting_balance": starting_balance, "peak_balance": new_peak, "reset_date": today})
     except Exception as e:
@@ -446,8 +443,7 @@ def api_full_restart():
             "can_trade":          True,
             "status_msg":         "OK — full-restart manual"
         }
-        with open(state_file, "w", encoding="utf-8") as f:
-            _json.dump(s, f, indent=2)
+        atomic_write_json(state_file, s)
 
         # 3. Arrancar bot_mt5.py
         bot_dir = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,116 @@
+"""
+equity_monitor.py — Vigilancia de equity en tiempo real para PropFirmGuard
+===========================================================================
+PropFirmGuard solo se evalúa una vez por ciclo (60s). Un movimiento rápido del
+oro puede llevar la equity más allá del límite diario (4%) o total (8%) antes
+de que el loop principal reaccione.
+
+EquityMonitor corre en su propio hilo con una cadencia corta (EQUITY_POLL_SECS):
+  1. Lee account_info().equity (incluye el P&L flotante de las posiciones).
+  2. Actualiza incrementalmente daily DD / total DD contra el balance de inicio
+     del día y el pico, que mantiene PropFirmGuard en el estado.
+  3. Al cruzar un umbral actúa sin esperar al loop:
+       - RISK_CUT_AT × límite   → riesgo reducido para nuevas entradas
+       - EMERGENCY_AT × límite  → acción de emergencia configurable:
+             "flatten" = cerrar todas las posiciones del bot + bloquear entradas
+             "block"   = solo bloquear nuevas entradas
+             "none"    = solo avisar
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from mt5_io import mt5
+
+import logger
+
+EQUITY_POLL_SECS = float(os.getenv("EQUITY_POLL_SECS", 2))
+EMERGENCY_ACTION = os.getenv("PROP_EMERGENCY_ACTION", "flatten").lower()
+RISK_CUT_AT      = float(os.getenv("PROP_RISK_CUT_AT", 0.5))    # fracción del límite
+EMERGENCY_AT     = float(os.getenv("PROP_EMERGENCY_AT", 0.9))   # fracción del límite
+
+
+class EquityMonitor(threading.Thread):
+    """Hilo que recalcula el drawdown con cada lectura de equity."""
+
+    def __init__(self, state: dict, prop_firm: dict, on_emergency, poll_secs: float = EQUITY_POLL_SECS):
+        super().__init__(name="equity-monitor", daemon=True)
+        self.state = state
+        self.prop_firm = prop_firm
+        self.on_emergency = on_emergency   # callable(reason: str, action: str)
+        self.poll_secs = poll_secs
+        self._stop_event = threading.Event()
+
+        self.daily_dd = 0.0
+        self.total_dd = 0.0
+        self.risk_cut = False
+        self.blocked = False
+        self.block_reason = ""
+        self._blocked_day = None      # Bloqueo por DD diario: se levanta al cambiar de día
+        self._blocked_total = False   # Bloqueo por DD total: persiste hasta reinicio/reset
+        # Clave creada de antemano: luego solo se reasigna (no cambia el tamaño del dict
+        # mientras flush_state lo serializa desde otro hilo)
+        state.setdefault("equity_guard", {})
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        logger.info(f"👁️ EquityMonitor activo (cada {self.poll_secs:.0f}s, acción: {EMERGENCY_ACTION})")
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"EquityMonitor: {e}")
+            self._stop_event.wait(self.poll_secs)
+
+    def poll(self):
+        acct = mt5.account_info()
+        if not acct:
+            return
+        equity, balance = acct.equity, acct.balance
+
+        # Pico incremental: el del estado (PropFirmGuard, respeta resets manuales)
+        # actualizado con el balance visto entre ciclos
+        peak = max(float(self.state.get("prop_peak_balance", balance)), balance)
+        day_start = float(self.state.get("prop_day_start_balance", balance))
+
+        self.daily_dd = (day_start - equity) / day_start if day_start > 0 else 0.0
+        self.total_dd = (peak - equity) / peak if peak > 0 else 0.0
+
+        daily_limit = self.prop_firm["daily_dd_limit"]
+        total_limit = self.prop_firm["max_dd_limit"]
+
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if self._blocked_day and self._blocked_day != today:
+            self._blocked_day = None
+
+        self.risk_cut = (self.daily_dd >= daily_limit * RISK_CUT_AT or
+                         self.total_dd >= total_limit * RISK_CUT_AT)
+
+        reason = None
+        if not self._blocked_total and self.total_dd >= total_limit * EMERGENCY_AT:
+            self._blocked_total = True
+            reason = f"🚨 EQUITY MONITOR: Total DD {self.total_dd:.2%} ≥ {EMERGENCY_AT:.0%} del límite {total_limit:.0%}"
+        elif not self._blocked_day and self.daily_dd >= daily_limit * EMERGENCY_AT:
+            self._blocked_day = today
+            reason = f"🚨 EQUITY MONITOR: Daily DD {self.daily_dd:.2%} ≥ {EMERGENCY_AT:.0%} del límite {daily_limit:.0%}"
+
+        self.blocked = EMERGENCY_ACTION != "none" and (bool(self._blocked_day) or self._blocked_total)
+        if reason:
+            self.block_reason = reason
+            logger.error(reason)
+            self.on_emergency(reason, EMERGENCY_ACTION)
+
+        self.state["equity_guard"] = {
+            "equity": round(equity, 2),
+            "daily_dd": round(self.daily_dd * 100, 2),
+            "total_dd": round(self.total_dd * 100, 2),
+            "risk_cut": self.risk_cut,
+            "blocked": self.blocked,
+            "reason": self.block_reason if self.blocked else "",
+            "action": EMERGENCY_ACTION,
+            "checked_at": time.time(),
+        }
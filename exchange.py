@@ -3,12 +3,23 @@ exchange.py — Wrapper para Binance Futures Testnet API
 Gestiona conexión, datos de mercado y órdenes
 """
 
+import time
+
 import pandas as pd
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 
 import config
+import latency
 import logger
+import rest_scheduler
+from funding import FundingSnapshot
+from kline_parser import klines_to_frame
+from user_stream import BinanceUserSocket, UserDataStream
+
+# Errores "esperables" de una petición: respuesta de Binance o petición descartada /
+# bloqueada por el planificador de peso (presupuesto agotado, timeout o baneo)
+API_ERRORS = (BinanceAPIException, rest_scheduler.RateLimitError)
 
 
 class BinanceFuturesExchange:
@@ -17,17 +28,25 @@ class BinanceFuturesExchange:
     TESTNET_URL = "https://testnet.binancefuture.com"
 
     def __init__(self):
+        config.use_binance_endpoint()
         self.client = Client(
             api_key=config.API_KEY,
             api_secret=config.SECRET_KEY,
             testnet=config.USE_TESTNET,
         )
-        if config.USE_TESTNET:
+        if config.BINANCE_BASE_URL:
+            logger.warning(f"🧪 Conectado a {config.BINANCE_BASE_URL} (servidor alternativo)")
+        elif config.USE_TESTNET:
             # Apuntar al endpoint del Testnet de Futuros
             self.client.FUTURES_URL = self.TESTNET_URL + "/fapi"
             logger.info("🧪 Conectado a Binance Futures TESTNET")
         else:
             logger.warning("⚠️ Conectado a Binance Futures REAL — ¡Cuidado con el dinero!")
+        # Peso REST compartido con paper_trade / dashboard; las órdenes tienen prioridad máxima
+        rest_scheduler.install(self.client, rest_scheduler.TRADING)
+        # premiumIndex de todos los pares en una sola petición (ver funding.py)
+        self.funding = FundingSnapshot(self.client.futures_mark_price)
+        self.user_stream = None
 
     # ─────────────────────────────────────────────────────────────────────
     # DATOS DE MERCADO
@@ -43,20 +62,19 @@ class BinanceFuturesExchange:
           - Funding Rate < 0  → Los Shorts pagan a los Longs → Sesgo LONG
           - |Rate| > 0.01%   → La tasa es significativa (1 USD por cada 10,000)
 
+        Se sirve del snapshot compartido de premiumIndex: una petición por
+        periodo de funding / TTL para todos los pares, no una por par.
+
         Returns:
             float: tasa en decimal (ej: 0.0001 = 0.01%)
         """
-        try:
-            data = self.client.futures_funding_rate(symbol=symbol, limit=1)
-            if data:
-                rate = float(data[-1]["fundingRate"])
-                direction = "→ Short bias" if rate > 0 else "→ Long bias"
-                logger.info(f"{symbol}: Funding Rate: {rate*100:.4f}% {direction}")
-                return rate
-            return 0.0
-        except BinanceAPIException as e:
-            logger.error(f"Error obteniendo funding rate de {symbol}: {e}")
+        info = self.funding.get(symbol)
+        if not info:
             return 0.0
+        rate = info["funding_rate"]
+        direction = "→ Short bias" if rate > 0 else "→ Long bias"
+        logger.info(f"{symbol}: Funding Rate: {rate*100:.4f}% {direction}")
+        return rate
 
     def get_klines(self, symbol: str, interval: str, limit: int = 200) -> pd.DataFrame:
         """
@@ -71,43 +89,55 @@ class BinanceFuturesExchange:
                 interval=interval,
                 limit=limit,
             )
-            df = pd.DataFrame(raw, columns=[
-                "timestamp", "open", "high", "low", "close", "volume",
-                "close_time", "quote_volume", "trades",
-                "taker_buy_base", "taker_buy_quote", "ignore"
-            ])
-            df = df[["timestamp", "open", "high", "low", "close", "volume"]].copy()
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            for col in ["open", "high", "low", "close", "volume"]:
-                df[col] = df[col].astype(float)
-            df.set_index("timestamp", inplace=True)
-            return df
-        except BinanceAPIException as e:
+            return klines_to_frame(raw)
+        except API_ERRORS as e:
             logger.error(f"Error obteniendo klines de {symbol}: {e}")
             return pd.DataFrame()
 
+    # ─────────────────────────────────────────────────────────────────────
+    # USER DATA STREAM (posiciones y balance por push, ver user_stream.py)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def start_user_stream(self) -> UserDataStream:
+        """Arranca el user data stream. Mientras esté sincronizado, balance y
+        posiciones se sirven de memoria en vez de consultar la API."""
+        source = BinanceUserSocket(self.client, testnet=config.USE_TESTNET)
+        self.user_stream = UserDataStream(source, self._fetch_positions, self._fetch_balance)
+        self.user_stream.start()
+        return self.user_stream
+
+    def _stream_live(self) -> bool:
+        return self.user_stream is not None and self.user_stream.book.live()
+
+    def _fetch_balance(self) -> dict | None:
+        for b in self.client.futures_account_balance():
+            if b["asset"] == "USDT":
+                return {"wallet": float(b["balance"]), "available": float(b["availableBalance"])}
+        return None
+
+    def _fetch_positions(self) -> list[dict]:
+        return [p for p in self.client.futures_position_information() if float(p["positionAmt"]) != 0]
+
     def get_balance(self) -> float:
         """Retorna el balance disponible en USDT."""
+        if self._stream_live():
+            available = self.user_stream.book.available_balance()
+            if available is not None:
+                return available
         try:
-            balances = self.client.futures_account_balance()
-            for b in balances:
-                if b["asset"] == "USDT":
-                    return float(b["availableBalance"])
-            return 0.0
-        except BinanceAPIException as e:
+            balance = self._fetch_balance()
+            return balance["available"] if balance else 0.0
+        except API_ERRORS as e:
             logger.error(f"Error obteniendo balance: {e}")
             return 0.0
 
     def get_open_positions(self) -> list[dict]:
         """Retorna lista de posiciones abiertas con cantidad != 0."""
+        if self._stream_live():
+            return self.user_stream.book.positions()
         try:
-            positions = self.client.futures_position_information()
-            open_pos = [
-                p for p in positions
-                if float(p["positionAmt"]) != 0
-            ]
-            return open_pos
-        except BinanceAPIException as e:
+            return self._fetch_positions()
+        except API_ERRORS as e:
             logger.error(f"Error obteniendo posiciones: {e}")
             return []
 
@@ -125,7 +155,7 @@ class BinanceFuturesExchange:
         try:
             self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
             logger.info(f"{symbol}: Leverage configurado a {leverage}x")
-        except BinanceAPIException as e:
+        except API_ERRORS as e:
             logger.error(f"Error configurando leverage para {symbol}: {e}")
 
     def set_isolated_margin(self, symbol: str):
@@ -147,7 +177,7 @@ class BinanceFuturesExchange:
                 marginType="ISOLATED",
             )
             logger.info(f"{symbol}: ✅ Modo ISOLATED MARGIN activado")
-        except BinanceAPIException as e:
+        except API_ERRORS as e:
             # Código -4046: ya está en ISOLATED → no es un error real
             if "-4046" in str(e) or "No need to change" in str(e):
                 logger.info(f"{symbol}: Ya estaba en ISOLATED MARGIN")
@@ -164,6 +194,11 @@ class BinanceFuturesExchange:
         """
         Coloca una orden de mercado con SL y TP.
 
+        El SL y el TP se envían JUNTOS en una sola petición batchOrders en
+        cuanto se confirma la entrada (antes eran dos llamadas secuenciales:
+        la posición quedaba sin protección durante dos round trips). El tiempo
+        entrada → protección se registra en latency ("binance_protection").
+
         🚨 KILL SWITCH: Si el Stop Loss falla al enviarse al servidor,
         la orden de entrada se cancela automáticamente para evitar
         quedarse en una posición sin protección.
@@ -176,7 +211,8 @@ class BinanceFuturesExchange:
             take_profit: Precio de Take Profit
 
         Returns:
-            Respuesta de la API o None si hay error
+            Respuesta de la API (con "protection": resultado de cada pata)
+            o None si hay error
         """
         # Redondear qty según las reglas del par
         qty = self._round_qty(symbol, qty)
@@ -186,7 +222,6 @@ class BinanceFuturesExchange:
 
         price_precision = self._get_price_precision(symbol)
         sl_side = "SELL" if side == "BUY" else "BUY"
-        order = None
 
         try:
             # ── Paso 1: Orden principal de mercado ────────────────────────
@@ -196,57 +231,90 @@ class BinanceFuturesExchange:
                 type="MARKET",
                 quantity=qty,
             )
+            t_fill = time.perf_counter()
             logger.success(
                 f"{symbol}: Orden {side} colocada | Qty: {qty} | ID: {order['orderId']}"
             )
-
-            # ── Paso 2: Stop Loss (KILL SWITCH) ───────────────────────────
-            # Si esta orden falla, CANCELAMOS la posición inmediatamente.
-            try:
-                self.client.futures_create_order(
-                    symbol=symbol,
-                    side=sl_side,
-                    type="STOP_MARKET",
-                    stopPrice=round(stop_loss, price_precision),
-                    closePosition=True,
-                )
-                logger.info(f"{symbol}: 🛡️ Stop Loss colocado en {stop_loss:.4f}")
-            except BinanceAPIException as sl_error:
-                # 🚨 KILL SWITCH ACTIVADO: cerrar posición inmediatamente
-                logger.error(
-                    f"{symbol}: ❌ KILL SWITCH — Fallo al colocar SL ({sl_error}). "
-                    f"Cerrando posición para evitar exposición sin protección!"
-                )
-                self.close_position(symbol)
-                return None
-
-            # ── Paso 3: Take Profit ───────────────────────────────────────
-            try:
-                self.client.futures_create_order(
-                    symbol=symbol,
-                    side=sl_side,
-                    type="TAKE_PROFIT_MARKET",
-                    stopPrice=round(take_profit, price_precision),
-                    closePosition=True,
-                )
-                logger.info(f"{symbol}: 🎯 Take Profit colocado en {take_profit:.4f}")
-            except BinanceAPIException as tp_error:
-                # TP falla → continuar, el SL ya protege la posición
-                logger.warning(
-                    f"{symbol}: ⚠️ Fallo al colocar TP ({tp_error}). "
-                    f"La posición sigue activa con SL en {stop_loss:.4f}."
-                )
-
-            return order
-
-        except BinanceAPIException as e:
+        except API_ERRORS as e:
             logger.error(f"Error colocando orden en {symbol}: {e}")
             return None
 
+        # ── Paso 2: SL + TP en una sola petición ──────────────────────────
+        legs = self.place_protective_orders(symbol, sl_side, stop_loss, take_profit, price_precision)
+        protection_ms = (time.perf_counter() - t_fill) * 1000
+        latency.record("binance_protection", protection_ms / 1000)
+        order["protection"] = legs
+        order["protection_ms"] = round(protection_ms, 1)
+
+        sl, tp = legs["sl"], legs["tp"]
+        if not sl["ok"]:
+            # 🚨 KILL SWITCH ACTIVADO: cerrar posición inmediatamente
+            logger.error(
+                f"{symbol}: ❌ KILL SWITCH — Fallo al colocar SL ({sl['error']}). "
+                f"Cerrando posición para evitar exposición sin protección!"
+            )
+            self.close_position(symbol)
+            if tp["ok"]:
+                self._cancel_order(symbol, tp["order_id"])
+            return None
+        logger.info(f"{symbol}: 🛡️ Stop Loss colocado en {stop_loss:.4f} ({protection_ms:.0f} ms tras la entrada)")
+
+        if tp["ok"]:
+            logger.info(f"{symbol}: 🎯 Take Profit colocado en {take_profit:.4f}")
+        else:
+            # TP falla → continuar, el SL ya protege la posición
+            logger.warning(
+                f"{symbol}: ⚠️ Fallo al colocar TP ({tp['error']}). "
+                f"La posición sigue activa con SL en {stop_loss:.4f}."
+            )
+        return order
+
+    def place_protective_orders(self, symbol: str, sl_side: str, stop_loss: float,
+                                take_profit: float, price_precision: int) -> dict:
+        """
+        Envía STOP_MARKET + TAKE_PROFIT_MARKET (closePosition) en un único
+        POST /fapi/v1/batchOrders. Binance procesa cada pata por separado:
+        la respuesta trae, en el mismo orden, la orden creada o {code, msg}.
+
+        Returns:
+            {"sl": {"ok", "order_id" | "error"}, "tp": {...}}
+        """
+        # batchOrders viaja como JSON: todos los valores como string
+        batch = [
+            {"symbol": symbol, "side": sl_side, "type": "STOP_MARKET",
+             "stopPrice": str(round(stop_loss, price_precision)), "closePosition": "true"},
+            {"symbol": symbol, "side": sl_side, "type": "TAKE_PROFIT_MARKET",
+             "stopPrice": str(round(take_profit, price_precision)), "closePosition": "true"},
+        ]
+        try:
+            results = self.client.futures_place_batch_order(batchOrders=batch)
+        except Exception as e:
+            # Petición entera rechazada (o error de red): ninguna pata confirmada
+            return {"sl": {"ok": False, "error": str(e)}, "tp": {"ok": False, "error": str(e)}}
+
+        legs = {}
+        for name, i in (("sl", 0), ("tp", 1)):
+            res = results[i] if isinstance(results, list) and i < len(results) else None
+            if isinstance(res, dict) and "orderId" in res:
+                legs[name] = {"ok": True, "order_id": res["orderId"]}
+            elif isinstance(res, dict):
+                legs[name] = {"ok": False, "error": f"{res.get('code')} {res.get('msg')}"}
+            else:
+                legs[name] = {"ok": False, "error": "sin respuesta para esta pata"}
+        return legs
+
+    def _cancel_order(self, symbol: str, order_id: int):
+        try:
+            self.client.futures_cancel_order(symbol=symbol, orderId=order_id)
+        except API_ERRORS as e:
+            logger.error(f"Error cancelando orden {order_id} en {symbol}: {e}")
+
     def close_position(self, symbol: str):
         """Cierra la posición abierta para el par dado."""
         try:
-            positions = self.get_open_positions()
+            # Siempre por REST: tras un fill (kill switch) el ACCOUNT_UPDATE del
+            # user stream puede no haber llegado y el book aún no tendría la posición
+            positions = self._fetch_positions()
             for p in positions:
                 if p["symbol"] == symbol:
                     amt = float(p["positionAmt"])
@@ -259,7 +327,7 @@ class BinanceFuturesExchange:
                         reduceOnly=True,
                     )
                     logger.info(f"{symbol}: Posición cerrada.")
-        except BinanceAPIException as e:
+        except API_ERRORS as e:
             logger.error(f"Error cerrando posición en {symbol}: {e}")
 
     # ─────────────────────────────────────────────────────────────────────
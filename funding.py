@@ -0,0 +1,101 @@
+"""
+funding.py — Snapshot de funding / premium index para todos los pares
+=====================================================================
+strategy.check_signal pedía el funding de cada par con una llamada REST
+(futures_funding_rate), y el dashboard repetía otra llamada por par en
+get_funding_rates y en get_signal_proximity.
+
+FundingSnapshot descarga GET /fapi/v1/premiumIndex SIN símbolo: una sola
+petición devuelve, para todos los perpetuos, mark price, index price,
+lastFundingRate (tasa del periodo en curso) y nextFundingTime.
+
+El snapshot se reutiliza hasta lo que ocurra antes:
+  ⏱️ FUNDING_TTL_SECS desde la descarga (mark/index se mueven)
+  💰 el próximo cambio de periodo de funding (+ unos segundos de margen)
+
+Si la descarga falla se sigue sirviendo el último snapshot (o 0.0 si nunca
+hubo uno), igual que hacía get_funding_rate ante un error de la API.
+"""
+
+import os
+import threading
+import time
+
+import logger
+
+FUNDING_TTL_SECS = float(os.getenv("FUNDING_TTL_SECS", 60))
+BOUNDARY_GRACE_SECS = 5      # Binance tarda unos segundos en publicar el nuevo periodo
+RETRY_AFTER_ERROR_SECS = 15  # No martillear la API si está caída
+
+
+class FundingSnapshot:
+    """Caché de premiumIndex (todos los pares) compartida por estrategia, paper y dashboard."""
+
+    def __init__(self, fetch, ttl: float = FUNDING_TTL_SECS):
+        self.fetch = fetch          # callable() → lista de dicts de premiumIndex
+        self.ttl = ttl
+        self._data: dict[str, dict] = {}
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _parse(self, raw: list[dict]) -> dict[str, dict]:
+        out = {}
+        for item in raw:
+            try:
+                out[item["symbol"]] = {
+                    "mark_price":        float(item["markPrice"]),
+                    "index_price":       float(item["indexPrice"]),
+                    "funding_rate":      float(item.get("lastFundingRate") or 0.0),
+                    "next_funding_time": int(item.get("nextFundingTime") or 0),
+                    "time":              int(item.get("time") or 0),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+        return out
+
+    def _refresh(self, now: float):
+        try:
+            raw = self.fetch()
+            self.requests += 1
+        except Exception as e:
+            logger.error(f"Error obteniendo premiumIndex: {e}")
+            self._expires = now + RETRY_AFTER_ERROR_SECS
+            return
+        data = self._parse(raw if isinstance(raw, list) else [raw])
+        if not data:
+            self._expires = now + RETRY_AFTER_ERROR_SECS
+            return
+        expires = now + self.ttl
+        boundaries = [d["next_funding_time"] / 1000 for d in data.values() if d["next_funding_time"]]
+        if boundaries:
+            next_boundary = min(boundaries) + BOUNDARY_GRACE_SECS
+            if next_boundary > now:
+                expires = min(expires, next_boundary)
+        self._data = data
+        self._expires = expires
+
+    def snapshot(self) -> dict[str, dict]:
+        """{símbolo: {mark_price, index_price, funding_rate, next_funding_time, time}}"""
+        now = time.time()
+        if now >= self._expires:
+            with self._lock:
+                # Un solo hilo descarga; el resto reutiliza su resultado
+                if time.time() >= self._expires:
+                    self._refresh(time.time())
+        return self._data
+
+    def get(self, symbol: str) -> dict | None:
+        return self.snapshot().get(symbol)
+
+    def funding_rate(self, symbol: str) -> float:
+        """Tasa de funding en decimal (ej: 0.0001 = 0.01%). 0.0 si no hay dato."""
+        info = self.get(symbol)
+        return info["funding_rate"] if info else 0.0
+
+    def premium(self, symbol: str) -> float:
+        """(mark - index) / index: prima del perpetuo sobre el spot."""
+        info = self.get(symbol)
+        if not info or not info["index_price"]:
+            return 0.0
+        return (info["mark_price"] - info["index_price"]) / info["index_price"]
@@ -0,0 +1,228 @@
+"""
+funding_history.py — Historia de funding rates (Futures) para el backtest
+=========================================================================
+strategy.check_signal bloquea LONGs con funding positivo y SHORTs con funding
+negativo (FUNDING_RATE_THRESHOLD), pero backtest.run_backtest ignoraba el
+funding por completo: ni el filtro ni el coste de mantener la posición.
+
+get_funding_history(símbolo, start, end):
+  1. Carga la caché HISTORY_DIR/<SÍMBOLO>_funding.pkl (junto a las velas).
+  2. Solo descarga lo que falta (/fapi/v1/fundingRate, páginas de 1000
+     liquidaciones ≈ 333 días en 8h) con el Client público de prioridad DATA.
+  3. Guarda la caché con escritura atómica.
+
+Sobre esa serie:
+  funding_asof()  → join as-of: para cada vela, el último funding LIQUIDADO
+                    en el momento de la decisión (cierre de la vela).
+  FundingLedger   → pagos de funding de posiciones abiertas, por suma
+                    acumulada: coste de cualquier tramo (entrada, salida] en
+                    O(log n), vectorizado para muchas operaciones a la vez.
+
+En vivo, premiumIndex da la tasa estimada del periodo en curso; en el
+backtest se usa la última liquidada, que es lo que se sabía con certeza.
+
+Uso:
+    python funding_history.py BTCUSDT --days 1095
+"""
+
+import argparse
+import os
+import pickle
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+import logger
+from kline_downloader import HISTORY_DIR, public_client, to_ms
+
+PAGE_LIMIT = 1000            # Máximo de /fapi/v1/fundingRate
+COLUMNS = ["funding_rate", "mark_price"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CACHÉ LOCAL
+# ─────────────────────────────────────────────────────────────────────────────
+
+def cache_path(symbol: str) -> str:
+    return os.path.join(HISTORY_DIR, f"{symbol}_funding.pkl")
+
+
+def load_cache(symbol: str) -> pd.DataFrame | None:
+    path = cache_path(symbol)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"📦 Caché de funding ilegible ({path}): {e} — se descarga de nuevo")
+        return None
+
+
+def save_cache(symbol: str, df: pd.DataFrame):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    path = cache_path(symbol)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# DESCARGA
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _to_frame(rows: list[dict]) -> pd.DataFrame:
+    """Filas de /fundingRate → DataFrame float64 indexado por funding_time (UTC naive)."""
+    if not rows:
+        return pd.DataFrame(columns=COLUMNS, dtype=np.float64)
+    times = np.array([int(r["fundingTime"]) for r in rows], dtype=np.int64)
+    # fundingTime llega con unos ms de desfase (…:00:00.003): se alinea al segundo
+    index = pd.to_datetime(times, unit="ms").floor("s")
+    index.name = "funding_time"
+    return pd.DataFrame({
+        "funding_rate": np.array([r["fundingRate"] for r in rows], dtype=np.float64),
+        # Las liquidaciones antiguas traen markPrice vacío
+        "mark_price":   pd.to_numeric(pd.Series([r.get("markPrice") for r in rows]), errors="coerce").to_numpy(),
+    }, index=index)
+
+
+def download_range(symbol: str, start_ms: int, end_ms: int) -> pd.DataFrame:
+    """Liquidaciones de [start_ms, end_ms] sin caché. Paginación en serie: las
+    fechas de liquidación no son regulares (algunos pares liquidan cada 4h / 1h)."""
+    client = public_client()
+    rows = []
+    t = start_ms
+    while t <= end_ms:
+        page = client.futures_funding_rate(symbol=symbol, startTime=t, endTime=end_ms, limit=PAGE_LIMIT)
+        if not page:
+            break
+        rows.extend(page)
+        if len(page) < PAGE_LIMIT:
+            break
+        t = int(page[-1]["fundingTime"]) + 1
+    return _to_frame(rows)
+
+
+def get_funding_history(symbol: str, start=None, end=None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Liquidaciones de funding de [start, end] (datetime o ms; por defecto el
+    último año). Índice funding_time y columnas funding_rate / mark_price.
+    """
+    now_ms = int(time.time() * 1000)
+    end_ms = min(to_ms(end), now_ms) if end is not None else now_ms
+    start_ms = to_ms(start) if start is not None else end_ms - 365 * 86_400_000
+
+    cached = load_cache(symbol) if use_cache else None
+    missing = []
+    if cached is None:
+        missing.append((start_ms, now_ms))
+    else:
+        covered_from = cached.attrs.get("covered_from", start_ms)
+        synced_to = cached.attrs.get("synced_to", covered_from)
+        if start_ms < covered_from:
+            missing.append((start_ms, covered_from - 1))
+        if end_ms > synced_to:
+            missing.append((synced_to + 1, now_ms))   # Siempre hasta ahora: sin huecos en la caché
+
+    if missing:
+        t0 = time.perf_counter()
+        frames = [download_range(symbol, a, b) for a, b in missing]
+        new = sum(len(f) for f in frames)
+        logger.info(f"📥 {symbol}: {new} liquidaciones de funding nuevas en {time.perf_counter() - t0:.1f}s")
+        if cached is not None and not cached.empty:
+            frames.insert(0, cached)
+        frames = [f for f in frames if not f.empty]
+        merged = pd.concat(frames) if frames else _to_frame([])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        prev = cached.attrs if cached is not None else {}
+        merged.attrs["covered_from"] = min(start_ms, prev.get("covered_from", start_ms))
+        merged.attrs["synced_to"] = max([prev.get("synced_to", 0)] + [b for _, b in missing])
+        if use_cache:
+            save_cache(symbol, merged)
+        cached = merged
+
+    df = cached[(cached.index >= pd.to_datetime(start_ms, unit="ms")) &
+                (cached.index <= pd.to_datetime(end_ms, unit="ms"))].copy()
+    df.attrs = {}
+    return df
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# JOIN CON LAS VELAS
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _ns(times) -> pd.Series:
+    """merge_asof exige la misma resolución en ambas claves (ms / us / ns según el origen)."""
+    return pd.Series(pd.DatetimeIndex(times).as_unit("ns"))
+
+
+def funding_asof(index: pd.DatetimeIndex, funding: pd.DataFrame,
+                 delay: pd.Timedelta = pd.Timedelta(0)) -> pd.Series:
+    """
+    Último funding liquidado en `index + delay` (p. ej. delay = duración de la
+    vela → conocido al cierre). NaN antes de la primera liquidación.
+    """
+    if funding.empty:
+        return pd.Series(np.nan, index=index, name="funding_rate")
+    bars = pd.DataFrame({"t": _ns(index + delay)})
+    rates = pd.DataFrame({"t": _ns(funding.index), "funding_rate": funding["funding_rate"].to_numpy()})
+    joined = pd.merge_asof(bars, rates, on="t", direction="backward")
+    return pd.Series(joined["funding_rate"].to_numpy(), index=index, name="funding_rate")
+
+
+class FundingLedger:
+    """
+    Pagos de funding de una posición abierta entre dos instantes.
+
+    Binance liquida rate × nocional (a mark price) a quien tenga posición en el
+    instante de liquidación: LONG paga si rate > 0, SHORT cobra. Con la suma
+    acumulada de rate × mark, el pago de cualquier tramo es una resta.
+    """
+
+    def __init__(self, funding: pd.DataFrame, prices: pd.Series | None = None):
+        self.times = funding.index.to_numpy(dtype="datetime64[ns]")
+        mark = funding["mark_price"].to_numpy(dtype=np.float64, copy=True)
+        if prices is not None and np.isnan(mark).any():
+            # Sin mark price: el último cierre conocido en el momento de la liquidación
+            fallback = pd.merge_asof(pd.DataFrame({"t": _ns(funding.index)}),
+                                     pd.DataFrame({"t": _ns(prices.index), "p": prices.to_numpy()}),
+                                     on="t", direction="backward")["p"].to_numpy()
+            mark = np.where(np.isnan(mark), fallback, mark)
+        per_unit = np.nan_to_num(funding["funding_rate"].to_numpy(dtype=np.float64) * mark)
+        self._cum = np.concatenate(([0.0], np.cumsum(per_unit)))
+
+    def pnl(self, side, qty, entry_time, exit_time) -> np.ndarray | float:
+        """
+        PnL de funding (negativo = pagado) de las liquidaciones en (entrada, salida].
+        Acepta escalares o arrays (vectorizado sobre todas las operaciones).
+        """
+        entries = np.atleast_1d(np.asarray(entry_time, dtype="datetime64[ns]"))
+        exits = np.atleast_1d(np.asarray(exit_time, dtype="datetime64[ns]"))
+        a = np.searchsorted(self.times, entries, side="right")
+        b = np.searchsorted(self.times, exits, side="right")
+        sign = np.where(np.atleast_1d(np.asarray(side)) == "LONG", 1.0, -1.0)
+        out = -sign * np.asarray(qty, dtype=np.float64) * (self._cum[b] - self._cum[a])
+        return float(out[0]) if np.ndim(entry_time) == 0 else out
+
+    def settlements(self, entry_time, exit_time) -> int:
+        """Número de liquidaciones en (entrada, salida]."""
+        a, b = np.searchsorted(self.times, np.array([entry_time, exit_time], dtype="datetime64[ns]"), side="right")
+        return int(b - a)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descarga/actualiza la historia de funding en caché")
+    parser.add_argument("symbol")
+    parser.add_argument("--days", type=float, default=365)
+    args = parser.parse_args()
+
+    start = datetime.now(timezone.utc) - timedelta(days=args.days)
+    data = get_funding_history(args.symbol, start=start)
+    if data.empty:
+        print("❌ Sin datos")
+    else:
+        print(f"✅ {len(data)} liquidaciones ({data.index[0]} → {data.index[-1]}) | "
+              f"media {data['funding_rate'].mean() * 100:+.4f}% → {cache_path(args.symbol)}")
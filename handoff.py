@@ -0,0 +1,180 @@
+"""
+handoff.py — Lock de trading exclusivo y relevo sin downtime entre procesos
+============================================================================
+auto_update.restart_bot mataba el bot y arrancaba otro: durante el arranque
+nadie gestionaba BE / trailing / EOD de las posiciones abiertas.
+
+Protocolo:
+  🔒 bot_mt5.lock — solo UNA instancia opera. Se crea con O_CREAT|O_EXCL y
+     guarda {pid, heartbeat}. Un hilo refresca el heartbeat cada
+     HEARTBEAT_SECS; sin heartbeat durante STALE_SECS el lock se considera
+     huérfano (proceso muerto) y otra instancia puede tomarlo.
+  🔁 Relevo (bot_mt5.py --handoff):
+       1. El proceso nuevo conecta, restaura el warm start y precarga velas.
+       2. Escribe bot_mt5.ready con su pid → "listo".
+       3. El proceso viejo lo detecta entre ciclos, drena (señales en curso,
+          estado, snapshot) y TRANSFIERE el lock al pid nuevo reescribiéndolo
+          (sin soltarlo: ninguna instancia en standby puede colarse).
+       4. El nuevo ve su pid en el lock y empieza a operar; el viejo sale.
+  💤 Standby: una instancia arrancada sin --handoff con el lock ocupado espera
+     a que quede libre o huérfano (watchdog.bat relanza el bot en bucle).
+"""
+
+import json
+import os
+import threading
+import time
+
+import logger
+
+LOCK_FILE = "bot_mt5.lock"
+READY_FILE = "bot_mt5.ready"
+HEARTBEAT_SECS = float(os.getenv("LOCK_HEARTBEAT_SECS", 10))
+STALE_SECS = float(os.getenv("LOCK_STALE_SECS", 45))
+READY_MAX_AGE = 3 * HEARTBEAT_SECS   # El sucesor en espera renueva su ready file
+
+
+def _read(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path: str, data: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class TradingLock:
+    """Lock de trading con heartbeat, detección de huérfanos y relevo entre procesos."""
+
+    def __init__(self, lock_file: str = LOCK_FILE, ready_file: str = READY_FILE):
+        self.lock_file = lock_file
+        self.ready_file = ready_file
+        self.pid = os.getpid()
+        self._stop = threading.Event()
+        self._file_lock = threading.Lock()   # Heartbeat vs release: leer-comprobar-escribir atómico
+        self._beat_thread = None
+        self._ready_at = 0.0
+
+    # ── Estado del lock ──────────────────────────────────────────────────
+    def holder(self) -> dict | None:
+        return _read(self.lock_file)
+
+    def owned(self) -> bool:
+        info = self.holder()
+        return bool(info) and info.get("pid") == self.pid
+
+    def _stale(self, info: dict | None) -> bool:
+        if info is None:
+            # Archivo a medio escribir o ilegible: comprobar por antigüedad
+            try:
+                return time.time() - os.path.getmtime(self.lock_file) > STALE_SECS
+            except OSError:
+                return False
+        return time.time() - float(info.get("heartbeat", 0)) > STALE_SECS
+
+    # ── Adquisición ──────────────────────────────────────────────────────
+    def try_acquire(self) -> bool:
+        if self.owned():   # Lock transferido por el proceso anterior
+            self._start_heartbeat()
+            return True
+        try:
+            fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            info = self.holder()
+            if not self._stale(info):
+                return False
+            # Huérfano: renombrar es atómico → solo un candidato lo retira
+            graveyard = f"{self.lock_file}.stale.{self.pid}"
+            try:
+                os.rename(self.lock_file, graveyard)
+            except OSError:
+                return False
+            if not self._stale(_read(graveyard)):
+                # Otro candidato lo renovó entre la lectura y el rename: devolverlo sin pisar
+                try:
+                    os.link(graveyard, self.lock_file) if os.name != "nt" else os.rename(graveyard, self.lock_file)
+                except OSError:
+                    pass
+                if os.path.exists(graveyard):
+                    os.remove(graveyard)
+                return False
+            os.remove(graveyard)
+            logger.warning(f"🔓 Lock huérfano retirado (pid {info.get('pid') if info else '?'})")
+            return self.try_acquire()
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"pid": self.pid, "heartbeat": time.time(), "started": time.time()}, f)
+        self._start_heartbeat()
+        return True
+
+    def wait_acquire(self, poll_secs: float = 1.0):
+        """Bloquea hasta tener el lock (relevo, lock libre o huérfano)."""
+        while not self.try_acquire():
+            if self._ready_at and time.time() - self._ready_at >= HEARTBEAT_SECS:
+                self.signal_ready(quiet=True)
+            time.sleep(poll_secs)
+        try:
+            if (_read(self.ready_file) or {}).get("pid") == self.pid:
+                os.remove(self.ready_file)
+        except OSError:
+            pass
+        logger.success(f"🔒 Lock de trading adquirido (pid {self.pid})")
+
+    def _start_heartbeat(self):
+        if self._beat_thread is None:
+            self._beat_thread = threading.Thread(target=self._beat_loop, name="lock-heartbeat", daemon=True)
+            self._beat_thread.start()
+
+    def _beat_loop(self):
+        while not self._stop.wait(HEARTBEAT_SECS):
+            with self._file_lock:
+                # Sin el lock, un release(to_pid) entre la lectura y la escritura
+                # quedaría pisado por este heartbeat con el pid antiguo
+                if self._stop.is_set():
+                    return
+                info = self.holder()
+                if not info or info.get("pid") != self.pid:
+                    return   # Transferido o perdido: el loop principal lo detecta con owned()
+                info["heartbeat"] = time.time()
+                try:
+                    _write(self.lock_file, info)
+                except OSError as e:
+                    logger.error(f"Heartbeat del lock: {e}")
+
+    # ── Relevo ───────────────────────────────────────────────────────────
+    def signal_ready(self, quiet: bool = False):
+        """Proceso nuevo (--handoff): listo para tomar el relevo."""
+        self._ready_at = time.time()
+        _write(self.ready_file, {"pid": self.pid, "ready_at": self._ready_at})
+        if not quiet:
+            logger.info(f"🔁 Handoff: listo (pid {self.pid}) — esperando al proceso anterior")
+
+    def handoff_requested(self) -> int | None:
+        """Pid del sucesor listo, si lo hay (solo lo consulta el dueño del lock)."""
+        info = _read(self.ready_file)
+        if not info or info.get("pid") in (None, self.pid):
+            return None
+        if time.time() - float(info.get("ready_at", 0)) > READY_MAX_AGE:
+            return None   # Sucesor que murió esperando
+        return int(info["pid"])
+
+    def release(self, to_pid: int | None = None):
+        """Suelta el lock, o lo transfiere directamente al sucesor."""
+        self._stop.set()
+        with self._file_lock:
+            if not self.owned():
+                return
+            try:
+                if to_pid:
+                    _write(self.lock_file, {"pid": to_pid, "heartbeat": time.time(),
+                                            "started": time.time(), "handed_from": self.pid})
+                    logger.info(f"🔁 Lock transferido a pid {to_pid}")
+                else:
+                    os.remove(self.lock_file)
+            except OSError as e:
+                logger.error(f"Error liberando lock: {e}")
@@ -1,10 +1,12 @@
 """
 indicators.py — Cálculo de indicadores técnicos
 EMA, RSI, ADX, ATR usando pandas-ta
+
+pandas_ta tarda cientos de ms en importarse: se carga en la primera llamada a
+add_indicators() y no al importar este módulo (dashboard, arranque del bot).
 """
 
 import pandas as pd
-import pandas_ta as ta
 from config import EMA_FAST, EMA_SLOW, RSI_PERIOD, ADX_PERIOD, ATR_PERIOD, VOL_MA_PERIOD
 
 
@@ -15,6 +17,8 @@ def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     Columnas requeridas en df: open, high, low, close, volume
     Columnas añadidas: ema_fast, ema_slow, rsi, adx, atr, vol_ma, ema_cross
     """
+    import pandas_ta as ta
+
     df = df.copy()
 
     # ── EMAs ──────────────────────────────────────────────────────────────
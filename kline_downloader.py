@@ -0,0 +1,230 @@
+"""
+kline_downloader.py — Descarga paginada y paralela de velas históricas (Futures)
+================================================================================
+backtest.download_historical_data hacía un único futures_klines(limit=1000):
+un --limit mayor se recortaba en silencio (~41 días en 1h). backtest_xau.py
+usaba futures_historical_klines, que pagina en serie página a página.
+
+get_history(símbolo, intervalo, start/end o limit):
+  1. Carga la historia cacheada en HISTORY_DIR/<SÍMBOLO>_<intervalo>.pkl.
+  2. Solo descarga lo que falta (antes del primer bar / después del último),
+     partido en páginas de PAGE_BARS (1500, el máximo de /fapi/v1/klines).
+  3. Pide las páginas en paralelo (KLINE_WORKERS hilos) a través del
+     planificador de peso REST con prioridad DATA: nunca se come el
+     presupuesto del bot (ver rest_scheduler.py).
+  4. Fusiona, elimina duplicados, comprueba huecos y guarda la caché
+     (escritura atómica). La vela en curso no se cachea.
+
+Uso:
+    python kline_downloader.py BTCUSDT 15m --days 1095
+"""
+
+import argparse
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import config
+import logger
+import rest_scheduler
+from kline_parser import klines_to_frame
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+PAGE_BARS = 1500
+DEFAULT_WORKERS = int(os.getenv("KLINE_WORKERS", 6))
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+# Las velas semanales abren el lunes 00:00 UTC; el epoch (1970-01-01) fue jueves
+INTERVAL_OFFSET_MS = {"1w": 4 * 86_400_000}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def public_client():
+    """Client público (sin API key) con prioridad DATA, compartido por las descargas."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from binance.client import Client
+                config.use_binance_endpoint()
+                _client = rest_scheduler.install(Client("", ""), rest_scheduler.DATA)
+    return _client
+
+
+def to_ms(value) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CACHÉ LOCAL
+# ─────────────────────────────────────────────────────────────────────────────
+
+def cache_path(symbol: str, interval: str) -> str:
+    return os.path.join(HISTORY_DIR, f"{symbol}_{interval}.pkl")
+
+
+def load_cache(symbol: str, interval: str) -> pd.DataFrame | None:
+    path = cache_path(symbol, interval)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"📦 Caché de velas ilegible ({path}): {e} — se descarga de nuevo")
+        return None
+
+
+def save_cache(symbol: str, interval: str, df: pd.DataFrame):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    path = cache_path(symbol, interval)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# DESCARGA
+# ─────────────────────────────────────────────────────────────────────────────
+
+def split_pages(start_ms: int, end_ms: int, step_ms: int, page_bars: int = PAGE_BARS) -> list[tuple[int, int]]:
+    """[(start, end)] inclusivos, cada uno con como mucho `page_bars` velas."""
+    pages = []
+    span = step_ms * page_bars
+    t = start_ms
+    while t <= end_ms:
+        pages.append((t, min(t + span - step_ms, end_ms)))
+        t += span
+    return pages
+
+
+def find_gaps(index: pd.DatetimeIndex, step_ms: int) -> list[tuple[pd.Timestamp, pd.Timestamp, int]]:
+    """Huecos en la serie: [(última vela antes, primera vela después, velas que faltan)]."""
+    if len(index) < 2:
+        return []
+    diffs = (index[1:] - index[:-1]) // pd.Timedelta(milliseconds=step_ms)
+    return [(index[i], index[i + 1], int(d) - 1) for i, d in enumerate(diffs) if d > 1]
+
+
+def download_range(symbol: str, interval: str, start_ms: int, end_ms: int,
+                   workers: int = DEFAULT_WORKERS) -> pd.DataFrame:
+    """Descarga [start_ms, end_ms] sin caché, en páginas paralelas."""
+    step = INTERVAL_MS[interval]
+    pages = split_pages(start_ms, end_ms, step)
+    if not pages:
+        return pd.DataFrame()
+    client = public_client()
+
+    def fetch(page):
+        return client.futures_klines(symbol=symbol, interval=interval, startTime=page[0],
+                                     endTime=page[1], limit=PAGE_BARS)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pages)))) as pool:
+        results = list(pool.map(fetch, pages))
+    raw = [row for page in results for row in page]
+    if not raw:
+        return pd.DataFrame()
+    return klines_to_frame(raw)
+
+
+def bar_open(ms: int, interval: str) -> int:
+    """Apertura de la vela de `interval` que contiene `ms` (semanas alineadas al lunes)."""
+    step, offset = INTERVAL_MS[interval], INTERVAL_OFFSET_MS.get(interval, 0)
+    return (ms - offset) // step * step + offset
+
+
+def get_history(symbol: str, interval: str, start=None, end=None, limit: int | None = None,
+                workers: int = DEFAULT_WORKERS, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Velas CERRADAS de [start, end] (datetime o ms). Con `limit` y sin `start`,
+    las últimas `limit` velas. Índice timestamp (UTC naive) y columnas OHLCV.
+    """
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Intervalo no soportado: {interval}")
+    step = INTERVAL_MS[interval]
+    last_closed = bar_open(int(time.time() * 1000), interval) - step
+    end_ms = bar_open(min(to_ms(end), last_closed), interval) if end is not None else last_closed
+    if start is not None:
+        start_ms = bar_open(to_ms(start) + step - 1, interval)   # Primera vela que abre en o tras start
+    else:
+        start_ms = end_ms - ((limit or 1000) - 1) * step
+
+    cached = load_cache(symbol, interval) if use_cache else None
+    missing = []
+    if cached is None or cached.empty:
+        missing.append((start_ms, end_ms))
+    else:
+        covered_from = cached.attrs.get("covered_from", to_ms(cached.index[0].to_pydatetime()))
+        last_ms = to_ms(cached.index[-1].to_pydatetime())
+        if start_ms < covered_from:
+            missing.append((start_ms, covered_from - step))
+        if end_ms > last_ms:
+            missing.append((last_ms + step, end_ms))   # Sin dejar huecos en la caché
+
+    if missing:
+        t0 = time.perf_counter()
+        n_pages = sum(len(split_pages(a, b, step)) for a, b in missing)
+        frames = [download_range(symbol, interval, a, b, workers) for a, b in missing]
+        frames = [f for f in frames if not f.empty]
+        logger.info(f"📥 {symbol} {interval}: {sum(len(f) for f in frames)} velas nuevas "
+                    f"({n_pages} páginas) en {time.perf_counter() - t0:.1f}s")
+        if cached is not None and not cached.empty:
+            frames.insert(0, cached)
+        if frames:
+            merged = pd.concat(frames)
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            merged = merged[merged.index <= pd.to_datetime(last_closed, unit="ms")]
+        else:
+            merged = pd.DataFrame(columns=["open", "high", "low", "close", "volume"])
+        prev_cover = cached.attrs.get("covered_from") if cached is not None else None
+        merged.attrs["covered_from"] = min(start_ms, prev_cover) if prev_cover is not None else start_ms
+        if use_cache:
+            save_cache(symbol, interval, merged)
+        cached = merged
+
+    if cached is None or cached.empty:
+        return pd.DataFrame()
+    df = cached[(cached.index >= pd.to_datetime(start_ms, unit="ms")) &
+                (cached.index <= pd.to_datetime(end_ms, unit="ms"))].copy()
+    df.attrs = {}
+    gaps = find_gaps(df.index, step)
+    if gaps:
+        total = sum(g[2] for g in gaps)
+        logger.warning(f"⚠️ {symbol} {interval}: {len(gaps)} huecos ({total} velas) — "
+                       f"el mayor tras {max(gaps, key=lambda g: g[2])[0]}")
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descarga/actualiza la historia de velas en caché")
+    parser.add_argument("symbol")
+    parser.add_argument("interval")
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    start = datetime.now(timezone.utc) - timedelta(days=args.days)
+    data = get_history(args.symbol, args.interval, start=start, workers=args.workers)
+    if data.empty:
+        print("❌ Sin datos")
+    else:
+        print(f"✅ {len(data)} velas ({data.index[0]} → {data.index[-1]}) "
+              f"en {time.perf_counter() - t0:.1f}s → {cache_path(args.symbol, args.interval)}")
@@ -0,0 +1,78 @@
+"""
+kline_parser.py — Parser rápido de velas de Binance a NumPy / DataFrame
+=======================================================================
+exchange.get_klines, paper_trade.get_klines_public, backtest y el dashboard
+construían un DataFrame de 12 columnas object con strings, seleccionaban 6 y
+convertían columna a columna con astype(float) + to_datetime.
+
+Aquí el payload crudo (lista de listas de /klines, o el cuerpo JSON en bytes)
+se convierte en UNA pasada: vista object → bloque float64 con solo las
+columnas pedidas. Sobre ese bloque:
+  parse_klines()     → array estructurado (timestamp int64 + campos float64)
+  klines_to_frame()  → DataFrame float listo (índice timestamp), un solo bloque
+
+extended=True conserva también quote_volume, trades, taker_buy_base y
+taker_buy_quote. Si orjson está instalado se usa para decodificar cuerpos
+JSON en bytes; si no, json de la librería estándar.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:   # Opcional
+    orjson = None
+
+BASE_FIELDS = ("open", "high", "low", "close", "volume")
+EXTRA_FIELDS = ("quote_volume", "trades", "taker_buy_base", "taker_buy_quote")
+# Posiciones en cada fila de /klines: [open_time, o, h, l, c, v, close_time, qv, n, tbb, tbq, ignore]
+_BASE_COLS = [0, 1, 2, 3, 4, 5]
+_EXTRA_COLS = [7, 8, 9, 10]
+
+
+def loads(payload):
+    """Cuerpo JSON (bytes / str) → listas. Las listas ya decodificadas se devuelven tal cual."""
+    if isinstance(payload, (bytes, bytearray, memoryview, str)):
+        return orjson.loads(payload) if orjson is not None else json.loads(payload)
+    return payload
+
+
+def _fields(extended: bool) -> tuple:
+    return BASE_FIELDS + (EXTRA_FIELDS if extended else ())
+
+
+def _values(rows, extended: bool) -> np.ndarray:
+    """Bloque (n, 1 + campos) float64: timestamp en ms + campos pedidos."""
+    cols = _BASE_COLS + (_EXTRA_COLS if extended else [])
+    if not len(rows):
+        return np.empty((0, len(cols)), dtype=np.float64)
+    # Una sola conversión str → float64 para todas las columnas (ms caben exactos en float64)
+    return np.array(rows, dtype=object)[:, cols].astype(np.float64)
+
+
+def parse_klines(payload, extended: bool = False) -> np.ndarray:
+    """Array estructurado: timestamp (int64, ms) + open/high/low/close/volume (float64) [+ extra]."""
+    rows = loads(payload)
+    fields = _fields(extended)
+    dtype = [("timestamp", np.int64)] + [(f, np.float64) for f in fields]
+    values = _values(rows, extended)
+    out = np.empty(len(values), dtype=dtype)
+    out["timestamp"] = values[:, 0].astype(np.int64)
+    for i, name in enumerate(fields, start=1):
+        out[name] = values[:, i]
+    return out
+
+
+def klines_to_frame(payload, extended: bool = False) -> pd.DataFrame:
+    """
+    DataFrame float64 indexado por timestamp (datetime64, UTC naive), con las
+    mismas columnas que construía el código anterior (open..volume [+ extra]).
+    """
+    rows = loads(payload)
+    values = _values(rows, extended)
+    index = pd.to_datetime(values[:, 0].astype(np.int64), unit="ms")
+    index.name = "timestamp"
+    return pd.DataFrame(values[:, 1:], index=index, columns=list(_fields(extended)))
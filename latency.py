@@ -0,0 +1,76 @@
+"""
+latency.py — Instrumentación de latencia por etapa del loop de trading
+=======================================================================
+Spans ligeros con reloj monotónico (time.perf_counter) alrededor de cada etapa:
+
+    with latency.span("manage_positions"):
+        manage_positions(state)
+
+Cada etapa guarda las últimas N muestras en un deque; summary() devuelve
+p50/p95/p99/max en milisegundos para el estado del bot y el dashboard.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+WINDOW = 500   # Muestras por etapa (ventana rodante)
+
+
+class LatencyTracker:
+    """Histograma rodante de latencias por etapa (thread-safe)."""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            buf = self._samples.get(stage)
+            if buf is None:
+                buf = self._samples[stage] = deque(maxlen=self.window)
+            buf.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    @contextmanager
+    def span(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t0)
+
+    @staticmethod
+    def _pct(sorted_vals: list, q: float) -> float:
+        idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+        return sorted_vals[idx]
+
+    def summary(self) -> dict:
+        """{etapa: {count, last_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._samples.items()}
+            counts = dict(self._counts)
+        out = {}
+        for stage, vals in sorted(snapshot.items()):
+            if not vals:
+                continue
+            s = sorted(vals)
+            out[stage] = {
+                "count":  counts.get(stage, len(vals)),
+                "last_ms": round(vals[-1] * 1000, 2),
+                "p50_ms": round(self._pct(s, 0.50) * 1000, 2),
+                "p95_ms": round(self._pct(s, 0.95) * 1000, 2),
+                "p99_ms": round(self._pct(s, 0.99) * 1000, 2),
+                "max_ms": round(s[-1] * 1000, 2),
+            }
+        return out
+
+
+# Instancia global compartida por bot_mt5 y telegram_notify
+TRACKER = LatencyTracker()
+span = TRACKER.span
+record = TRACKER.record
+summary = TRACKER.summary
@@ -3,97 +3,220 @@ logger.py — Sistema de logging con colores + archivo
 =====================================================
 Escribe logs tanto a consola (con colores) como a archivo (bot.log).
 Ideal para VPS donde necesitas revisar logs después.
+
+Pipeline asíncrono (QueueHandler → QueueListener):
+  - El hilo que llama a info()/warning()... solo crea el LogRecord y lo encola.
+  - El formateo del mensaje, los colores y toda la E/S (consola, bot.log
+    rotativo, bot.jsonl estructurado y trades_log.csv) ocurren en el hilo
+    del listener.
+  - El nivel (LOG_LEVEL en .env) se filtra ANTES de construir el record, y
+    los argumentos se formatean de forma perezosa:
+        logger.info("%s | RSI: %.1f", symbol, rsi)
 """
 
+import atexit
 import csv
-import os
+import json
 import logging
+import os
+import queue
+import sys
 from datetime import datetime, timezone
 from colorama import Fore, Style, init
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 init(autoreset=True)
 
 LOG_FILE = "trades_log.csv"
 BOT_LOG_FILE = "bot.log"
-_headers_written = False
+JSON_LOG_FILE = "bot.jsonl"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+SUCCESS = 25
+logging.addLevelName(SUCCESS, "SUCCESS")
+
+TRADE_CSV_HEADERS = [
+    "timestamp", "symbol", "signal", "entry_price",
+    "stop_loss", "take_profit", "qty", "pnl", "note"
+]
+
+
+def _ts(record: logging.LogRecord) -> str:
+    return datetime.fromtimestamp(record.created, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
 
 # ─────────────────────────────────────────────────────────────────────────────
-# FILE LOGGER (para VPS)
+# FORMATTERS Y HANDLERS (se ejecutan en el hilo del listener)
 # ─────────────────────────────────────────────────────────────────────────────
 
-_file_logger = logging.getLogger("bot_mt5")
-_file_logger.setLevel(logging.DEBUG)
+class _ConsoleFormatter(logging.Formatter):
+    """Formato de consola con colores: [ts] (i) mensaje."""
+
+    _STYLES = {
+        logging.DEBUG:   (Fore.WHITE,  "(d)"),
+        logging.INFO:    (Fore.CYAN,   "(i)"),
+        SUCCESS:         (Fore.GREEN,  "[OK]"),
+        logging.WARNING: (Fore.YELLOW, "(!)"),
+        logging.ERROR:   (Fore.RED,    "[X]"),
+        logging.CRITICAL: (Fore.RED,   "[X]"),
+    }
+
+    def format(self, record: logging.LogRecord) -> str:
+        color, tag = getattr(record, "console_style", None) or self._STYLES.get(
+            record.levelno, (Fore.CYAN, "(i)"))
+        return f"{color}[{_ts(record)}] {tag} {record.getMessage()}{Style.RESET_ALL}"
+
+
+class _JsonFormatter(logging.Formatter):
+    """Una línea JSON por evento (para análisis posterior / ingesta)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts":     datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level":  record.levelname,
+            "thread": record.threadName,
+            "msg":    record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TradeCsvHandler(logging.Handler):
+    """Escribe en trades_log.csv solo los records emitidos por log_trade()."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def emit(self, record: logging.LogRecord):
+        row = getattr(record, "trade_row", None)
+        if row is None:
+            return
+        try:
+            if self._file is None:
+                new_file = not os.path.exists(self.path)
+                self._file = open(self.path, "a", newline="")
+                self._writer = csv.writer(self._file)
+                if new_file:
+                    self._writer.writerow(TRADE_CSV_HEADERS)
+            self._writer.writerow(row)
+            self._file.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler in-process: NO formatea en el hilo llamante (QueueHandler.prepare
+    lo haría para poder serializar el record). El listener formatea después.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _not_console(record: logging.LogRecord) -> bool:
+    return not getattr(record, "no_console", False)
+
+
+def _build_pipeline() -> tuple[logging.Logger, QueueListener]:
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(_ConsoleFormatter())
+    console.addFilter(_not_console)
+
+    # Rotación: max 5MB por archivo, mantener 3 archivos
+    file_handler = RotatingFileHandler(
+        BOT_LOG_FILE, maxBytes=5*1024*1024, backupCount=3, encoding="utf-8"
+    )
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s | %(levelname)-7s | %(message)s",
+                          datefmt="%Y-%m-%d %H:%M:%S")
+    )
+
+    json_handler = RotatingFileHandler(
+        JSON_LOG_FILE, maxBytes=5*1024*1024, backupCount=3, encoding="utf-8"
+    )
+    json_handler.setFormatter(_JsonFormatter())
 
-# Rotación: max 5MB por archivo, mantener 3 archivos
-_handler = RotatingFileHandler(
-    BOT_LOG_FILE, maxBytes=5*1024*1024, backupCount=3, encoding="utf-8"
-)
-_handler.setFormatter(
-    logging.Formatter("%(asctime)s | %(levelname)-7s | %(message)s",
-                      datefmt="%Y-%m-%d %H:%M:%S")
-)
-_file_logger.addHandler(_handler)
+    csv_handler = _TradeCsvHandler(LOG_FILE)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console, file_handler, json_handler, csv_handler,
+                             respect_handler_level=True)
+
+    log = logging.getLogger("bot_mt5")
+    log.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    log.propagate = False
+    log.handlers.clear()
+    log.addHandler(_LazyQueueHandler(log_queue))
+
+    listener.start()
+    atexit.register(listener.stop)   # Vaciar la cola al salir
+    return log, listener
+
+
+_log, _listener = _build_pipeline()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # FUNCIONES DE LOG
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _ensure_headers():
-    global _headers_written
-    if not _headers_written and not os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "timestamp", "symbol", "signal", "entry_price",
-                "stop_loss", "take_profit", "qty", "pnl", "note"
-            ])
-    _headers_written = True
+def debug(msg: str, *args):
+    _log.debug(msg, *args)
 
 
-def info(msg: str):
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Fore.CYAN}[{ts}] (i) {msg}{Style.RESET_ALL}")
-    _file_logger.info(msg)
+def info(msg: str, *args):
+    _log.info(msg, *args)
 
 
-def success(msg: str):
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Fore.GREEN}[{ts}] [OK] {msg}{Style.RESET_ALL}")
-    _file_logger.info(msg)
+def success(msg: str, *args):
+    _log.log(SUCCESS, msg, *args)
 
 
-def warning(msg: str):
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Fore.YELLOW}[{ts}] (!) {msg}{Style.RESET_ALL}")
-    _file_logger.warning(msg)
+def warning(msg: str, *args):
+    _log.warning(msg, *args)
 
 
-def error(msg: str):
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Fore.RED}[{ts}] [X] {msg}{Style.RESET_ALL}")
-    _file_logger.error(msg)
+def error(msg: str, *args):
+    _log.error(msg, *args)
 
 
 def signal(symbol: str, direction: str, entry: float, sl: float, tp: float):
+    if not _log.isEnabledFor(logging.INFO):
+        return
     color = Fore.GREEN if direction == "LONG" else Fore.RED
     arrow = ">>" if direction == "LONG" else "<<"
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    msg = (f"SENAL {direction} | {symbol} | "
-           f"Entry: {entry:.4f} | SL: {sl:.4f} | TP: {tp:.4f}")
-    print(f"{color}[{ts}] {arrow} {msg}{Style.RESET_ALL}")
-    _file_logger.info(msg)
+    _log.info("SENAL %s | %s | Entry: %.4f | SL: %.4f | TP: %.4f",
+              direction, symbol, entry, sl, tp,
+              extra={"console_style": (color, arrow),
+                     "fields": {"event": "signal", "symbol": symbol, "direction": direction,
+                                "entry": entry, "sl": sl, "tp": tp}})
 
 
 def log_trade(symbol: str, sig: str, entry: float, sl: float,
               tp: float, qty: float, pnl: float = 0.0, note: str = ""):
-    _ensure_headers()
     ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([ts, symbol, sig, entry, sl, tp, qty, pnl, note])
-    _file_logger.info(
-        f"TRADE | {symbol} {sig} | E:{entry:.2f} SL:{sl:.2f} "
-        f"TP:{tp:.2f} | Qty:{qty} PnL:{pnl}"
-    )
+    # El CSV se escribe siempre (es el registro de trades), independiente de LOG_LEVEL
+    _log.handle(_log.makeRecord(
+        _log.name, logging.INFO, __file__, 0,
+        "TRADE | %s %s | E:%.2f SL:%.2f TP:%.2f | Qty:%s PnL:%s",
+        (symbol, sig, entry, sl, tp, qty, pnl), None,
+        extra={"trade_row": [ts, symbol, sig, entry, sl, tp, qty, pnl, note],
+               "no_console": True,
+               "fields": {"event": "trade", "symbol": symbol, "signal": sig,
+                          "entry": entry, "sl": sl, "tp": tp, "qty": qty,
+                          "pnl": pnl, "note": note}},
+    ))
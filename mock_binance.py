@@ -0,0 +1,1096 @@
+"""
+mock_binance.py — Servidor local que imita Binance Futures (REST + WebSocket)
+=============================================================================
+exchange.py, paper_trade.py, dashboard.py, scanner.py y kline_downloader.py
+hablan siempre con los endpoints reales: el trabajo de rendimiento no se
+podía probar sin red ni de forma repetible.
+
+MockBinance sirve:
+  🕯️ Velas sintéticas (paseo aleatorio con semilla por par → deterministas)
+     o grabadas (HISTORY_DIR/<PAR>_1m.pkl de kline_downloader, re-selladas
+     en el reloj simulado), agregadas a cualquier intervalo desde 1 minuto.
+  ⏩ Reloj simulado: --speed 10 → el mercado avanza 10 veces más rápido.
+  📦 Órdenes MARKET / STOP_MARKET / TAKE_PROFIT_MARKET (closePosition,
+     reduceOnly, batchOrders) con latencia de ejecución y slippage
+     configurables; posiciones, balance, comisiones y PnL realizado.
+  ⚖️ Límite de peso por IP con los mismos costes que rest_scheduler.py:
+     X-MBX-USED-WEIGHT-1M, 429 con Retry-After y 418 (baneo) si se insiste.
+  📡 WebSocket: user data stream (/ws/<listenKey>) y velas
+     (/ws/<par>@kline_<intervalo> y /stream?streams=...).
+  📊 Contadores en GET /mock/stats (POST /mock/reset los pone a cero).
+
+Para apuntar bot / paper trading / dashboard al mock (config.use_binance_endpoint):
+    BINANCE_BASE_URL=http://127.0.0.1:8090 BINANCE_WS_URL=ws://127.0.0.1:8091 python paper_trade.py
+
+Uso:
+    python mock_binance.py --symbols 200 --speed 10 --latency-ms 20 --slippage-bps 2
+    python mock_binance.py --bench paper --symbols 200 --speed 10 --cycles 5
+    python mock_binance.py --bench dashboard --concurrency 20
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import secrets
+import statistics
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+
+import logger
+import rest_scheduler
+from kline_downloader import HISTORY_DIR, INTERVAL_MS, bar_open
+
+MINUTE_MS = 60_000
+CHUNK_MINUTES = 1440
+HISTORY_MINUTES = int(os.getenv("MOCK_HISTORY_MINUTES", 9 * 1440))   # 9 días: 200 velas de 1h
+BASE_PRICES = {"BTCUSDT": 60_000.0, "ETHUSDT": 3_000.0, "XAUUSDT": 2_400.0, "SOLUSDT": 150.0}
+TAKER_FEE = 0.0004
+BAN_AFTER_429 = 3          # Peticiones con el límite superado antes del 418
+BAN_SECS = 120
+MATCH_SECS = 0.05          # Frecuencia del motor de órdenes condicionales (tiempo real)
+KLINE_PUSH_SECS = 1.0
+ORDER_LIMIT = 1200         # Órdenes por minuto (X-MBX-ORDER-COUNT-1M)
+
+
+class MockError(Exception):
+    """Error con el formato de Binance: {"code", "msg"} + status HTTP."""
+
+    def __init__(self, code: int, msg: str, status: int = 400):
+        super().__init__(msg)
+        self.code, self.msg, self.status = code, msg, status
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MERCADO
+# ─────────────────────────────────────────────────────────────────────────────
+
+class SimClock:
+    """Reloj simulado: arranca en `start_ms` y avanza `speed` veces más rápido."""
+
+    def __init__(self, speed: float = 1.0, start_ms: int | None = None):
+        self.speed = speed
+        self.start_ms = start_ms if start_ms is not None else int(time.time() * 1000)
+        self._t0 = time.monotonic()
+
+    def now_ms(self) -> int:
+        return self.start_ms + int((time.monotonic() - self._t0) * 1000 * self.speed)
+
+
+class MinutePath:
+    """Serie de 1 minuto (float32) que crece bajo demanda; subclases: sintética / grabada."""
+
+    def __init__(self):
+        self.close = np.empty(0, np.float32)
+        self.high = np.empty(0, np.float32)
+        self.low = np.empty(0, np.float32)
+        self.volume = np.empty(0, np.float32)
+        self.first_open = 0.0
+        self._lock = threading.Lock()
+
+    def _chunk(self, n: int) -> tuple[np.ndarray, ...]:
+        raise NotImplementedError
+
+    def _ensure(self, n: int):
+        if n <= len(self.close):
+            return
+        with self._lock:
+            while len(self.close) < n:
+                c, h, l, v = self._chunk(max(CHUNK_MINUTES, n - len(self.close)))
+                self.close = np.concatenate((self.close, c))
+                self.high = np.concatenate((self.high, h))
+                self.low = np.concatenate((self.low, l))
+                self.volume = np.concatenate((self.volume, v))
+
+    def minutes(self, i0: int, i1: int) -> tuple[np.ndarray, ...]:
+        """(open, high, low, close, volume) de los minutos [i0, i1)."""
+        self._ensure(i1)
+        close = self.close[i0:i1]
+        prev = self.close[i0 - 1] if i0 > 0 else self.first_open
+        opens = np.concatenate(([prev], close[:-1])).astype(np.float32)
+        return opens, self.high[i0:i1], self.low[i0:i1], close, self.volume[i0:i1]
+
+    def price(self, i: int) -> float:
+        self._ensure(i + 1)
+        return float(self.close[i])
+
+
+class SyntheticPath(MinutePath):
+    """Paseo aleatorio log-normal, determinista por (semilla, par)."""
+
+    def __init__(self, symbol: str, seed: int = 0):
+        super().__init__()
+        digest = hashlib.blake2b(f"{seed}:{symbol}".encode(), digest_size=8).digest()
+        self._rng = np.random.default_rng(int.from_bytes(digest, "little"))
+        self._last = BASE_PRICES.get(symbol) or float(np.exp(self._rng.uniform(np.log(0.05), np.log(500))))
+        self.first_open = self._last
+        self.sigma = 0.0008 * self._rng.uniform(0.6, 2.0)       # Volatilidad por minuto
+        self.base_volume = 2e6 / self._last * self._rng.uniform(0.2, 5.0)
+
+    def _chunk(self, n):
+        closes = self._last * np.exp(np.cumsum(self._rng.normal(0.0, self.sigma, n)))
+        opens = np.concatenate(([self._last], closes[:-1]))
+        wicks = np.abs(self._rng.normal(0.0, self.sigma / 2, (2, n)))
+        self._last = float(closes[-1])
+        return (closes.astype(np.float32),
+                (np.maximum(opens, closes) * (1 + wicks[0])).astype(np.float32),
+                (np.minimum(opens, closes) * (1 - wicks[1])).astype(np.float32),
+                (self.base_volume * self._rng.lognormal(0.0, 0.5, n)).astype(np.float32))
+
+
+class RecordedPath(MinutePath):
+    """Velas de 1m grabadas; al agotarse, el precio queda plano (volumen 0)."""
+
+    def __init__(self, df):
+        super().__init__()
+        self._df = df
+        self._used = False
+        self.first_open = float(df["open"].iloc[0])
+
+    def _chunk(self, n):
+        if not self._used:
+            self._used = True
+            return tuple(self._df[c].to_numpy(np.float32) for c in ("close", "high", "low", "volume"))
+        last = self.close[-1] if len(self.close) else np.float32(self.first_open)
+        flat = np.full(n, last, np.float32)
+        return flat, flat, flat, np.zeros(n, np.float32)
+
+
+def _load_recorded(symbol: str, replay_dir: str):
+    import pickle
+    path = os.path.join(replay_dir, f"{symbol}_1m.pkl")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        df = pickle.load(f)
+    return RecordedPath(df) if len(df) else None
+
+
+class MockMarket:
+    """Precios y velas de todos los pares sobre el reloj simulado."""
+
+    def __init__(self, symbols: list[str], clock: SimClock, seed: int = 0,
+                 history_minutes: int = HISTORY_MINUTES, replay_dir: str | None = None):
+        self.symbols = list(symbols)
+        self.clock = clock
+        self.origin_ms = (clock.start_ms // MINUTE_MS - history_minutes) * MINUTE_MS
+        self.paths: dict[str, MinutePath] = {}
+        for s in self.symbols:
+            recorded = _load_recorded(s, replay_dir) if replay_dir else None
+            self.paths[s] = recorded or SyntheticPath(s, seed)
+        self.replayed = sum(isinstance(p, RecordedPath) for p in self.paths.values())
+        self.precision = {s: self._precisions(self.paths[s].price(0)) for s in self.symbols}
+
+    @staticmethod
+    def _precisions(price: float) -> tuple[int, int]:
+        """(decimales de precio, decimales de cantidad) según la magnitud del precio."""
+        magnitude = int(np.floor(np.log10(max(price, 1e-8))))
+        return min(8, max(1, 4 - magnitude)), min(3, max(0, magnitude - 1))
+
+    def _path(self, symbol: str) -> MinutePath:
+        path = self.paths.get(symbol)
+        if path is None:
+            raise MockError(-1121, "Invalid symbol.")
+        return path
+
+    def minute_index(self, ms: int) -> int:
+        return max(0, (ms - self.origin_ms) // MINUTE_MS)
+
+    def price(self, symbol: str, at_ms: int | None = None) -> float:
+        at_ms = self.clock.now_ms() if at_ms is None else at_ms
+        return self._path(symbol).price(self.minute_index(at_ms))
+
+    def range_hl(self, symbol: str, from_ms: int, to_ms: int) -> tuple[float, float]:
+        """Máximo y mínimo de los minutos entre dos instantes (ambos incluidos)."""
+        i0, i1 = self.minute_index(from_ms), self.minute_index(to_ms) + 1
+        _, high, low, _, _ = self._path(symbol).minutes(i0, i1)
+        return float(high.max()), float(low.min())
+
+    def klines(self, symbol: str, interval: str, limit: int = 500,
+               start: int | None = None, end: int | None = None) -> list[list]:
+        step = INTERVAL_MS.get(interval)
+        if step is None:
+            raise MockError(-1120, "Invalid interval.")
+        path = self._path(symbol)
+        limit = max(1, min(int(limit), 1500))
+        now = self.clock.now_ms()
+        current = bar_open(now, interval)
+        if start is not None:
+            first = bar_open(int(start) + step - 1, interval)
+            last = min(current, first + (limit - 1) * step,
+                       bar_open(int(end), interval) if end is not None else current)
+        else:
+            last = min(current, bar_open(int(end), interval)) if end is not None else current
+            first = last - (limit - 1) * step
+        first = max(first, bar_open(self.origin_ms + step - 1, interval))
+        if first > last:
+            return []
+
+        opens = np.arange(first, last + 1, step, dtype=np.int64)
+        now_idx = self.minute_index(now)
+        m0 = (opens - self.origin_ms) // MINUTE_MS
+        m1 = np.minimum(m0 + step // MINUTE_MS, now_idx + 1)
+        o, h, l, c, v = path.minutes(int(m0[0]), int(m1[-1]))
+        offsets = (m0 - m0[0]).astype(np.int64)
+        bar_o = o[offsets]
+        bar_h = np.maximum.reduceat(h, offsets)
+        bar_l = np.minimum.reduceat(l, offsets)
+        bar_c = c[m1 - 1 - m0[0]]
+        bar_v = np.add.reduceat(v, offsets)
+        pp, qp = self.precision[symbol]
+        return [
+            [int(t), f"{bo:.{pp}f}", f"{bh:.{pp}f}", f"{bl:.{pp}f}", f"{bc:.{pp}f}", f"{bv:.{qp}f}",
+             int(t + step - 1), f"{bv * bc:.2f}", int(bv // 10) + 1, f"{bv / 2:.{qp}f}",
+             f"{bv * bc / 2:.2f}", "0"]
+            for t, bo, bh, bl, bc, bv in zip(opens, bar_o, bar_h, bar_l, bar_c, bar_v)
+        ]
+
+    def funding_rate(self, symbol: str, at_ms: int) -> float:
+        """Funding determinista por par y periodo de 8h (±0.03%)."""
+        period = at_ms // (8 * 3_600_000)
+        digest = hashlib.blake2b(f"{symbol}:{period}".encode(), digest_size=4).digest()
+        return (int.from_bytes(digest, "little") / 2**32 - 0.4) * 0.0005
+
+    def quote_volume_24h(self, symbol: str) -> float:
+        now_idx = self.minute_index(self.clock.now_ms())
+        _, _, _, c, v = self._path(symbol).minutes(max(0, now_idx - 1439), now_idx + 1)
+        return float(np.dot(c.astype(np.float64), v))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CUENTA Y MOTOR DE ÓRDENES
+# ─────────────────────────────────────────────────────────────────────────────
+
+class MockAccount:
+    """Balance, posiciones (one-way) y órdenes condicionales de una cuenta USDT-M."""
+
+    def __init__(self, market: MockMarket, balance: float = 10_000.0, fill_latency_ms: float = 0.0,
+                 slippage_bps: float = 0.0, fee_rate: float = TAKER_FEE):
+        self.market = market
+        self.clock = market.clock
+        self.wallet = balance
+        self.fill_latency_ms = fill_latency_ms
+        self.slippage = slippage_bps / 10_000
+        self.fee_rate = fee_rate
+        self.positions: dict[str, dict] = {}
+        self.settings: dict[str, dict] = {}       # leverage / marginType por par
+        self.orders: dict[int, dict] = {}         # Condicionales abiertas
+        self.listen_keys: set[str] = set()
+        self._ids = itertools.count(1_000_000)
+        self._subscribers: list = []
+        self._lock = threading.RLock()
+        self._checked_ms = self.clock.now_ms()
+        self.counters = {"orders": 0, "fills": 0, "triggers": 0, "rejected": 0, "canceled": 0}
+
+    # ── Eventos del user data stream ─────────────────────────────────────
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _emit(self, event: dict):
+        for callback in list(self._subscribers):
+            callback(event)
+
+    def _order_event(self, order: dict, status: str, exec_type: str, price: float = 0.0,
+                     qty: float = 0.0, realized: float = 0.0):
+        now = self.clock.now_ms()
+        self._emit({"e": "ORDER_TRADE_UPDATE", "E": now, "T": now, "o": {
+            "s": order["symbol"], "i": order["orderId"], "S": order["side"], "o": order["type"],
+            "q": order.get("origQty", "0"), "sp": order.get("stopPrice", "0"), "X": status, "x": exec_type,
+            "L": str(price), "l": str(qty), "ap": str(price), "rp": str(realized),
+            "R": order.get("reduceOnly", False), "cp": order.get("closePosition", False),
+        }})
+
+    def _account_event(self, symbol: str):
+        pos = self.positions.get(symbol, {"amt": 0.0, "entry": 0.0})
+        now = self.clock.now_ms()
+        self._emit({"e": "ACCOUNT_UPDATE", "E": now, "T": now, "a": {
+            "m": "ORDER",
+            "B": [{"a": "USDT", "wb": f"{self.wallet:.8f}", "cw": f"{self.available():.8f}"}],
+            "P": [{"s": symbol, "pa": str(pos["amt"]), "ep": str(pos["entry"]),
+                   "up": f"{self._unrealized(symbol):.8f}", "mt": self._setting(symbol)["marginType"].lower(),
+                   "ps": "BOTH"}],
+        }})
+
+    # ── Estado ───────────────────────────────────────────────────────────
+    def _setting(self, symbol: str) -> dict:
+        return self.settings.setdefault(symbol, {"leverage": 20, "marginType": "CROSSED"})
+
+    def _unrealized(self, symbol: str) -> float:
+        pos = self.positions.get(symbol)
+        if not pos or not pos["amt"]:
+            return 0.0
+        return (self.market.price(symbol) - pos["entry"]) * pos["amt"]
+
+    def _margin(self) -> float:
+        return sum(abs(p["amt"]) * p["entry"] / self._setting(s)["leverage"] for s, p in self.positions.items())
+
+    def available(self) -> float:
+        with self._lock:
+            return self.wallet - self._margin()
+
+    def balance(self) -> list[dict]:
+        with self._lock:
+            upnl = sum(self._unrealized(s) for s in self.positions)
+            return [{"accountAlias": "mock", "asset": "USDT", "balance": f"{self.wallet:.8f}",
+                     "crossWalletBalance": f"{self.available():.8f}", "crossUnPnl": f"{upnl:.8f}",
+                     "availableBalance": f"{self.available():.8f}", "maxWithdrawAmount": f"{self.available():.8f}",
+                     "marginAvailable": True, "updateTime": self.clock.now_ms()}]
+
+    def position_risk(self, symbol: str | None = None) -> list[dict]:
+        with self._lock:
+            symbols = [symbol] if symbol else sorted(set(self.positions) | set(self.settings))
+            out = []
+            for s in symbols:
+                self.market._path(s)
+                pos = self.positions.get(s, {"amt": 0.0, "entry": 0.0})
+                setting = self._setting(s)
+                out.append({"symbol": s, "positionAmt": str(pos["amt"]), "entryPrice": str(pos["entry"]),
+                            "markPrice": str(self.market.price(s)), "unRealizedProfit": f"{self._unrealized(s):.8f}",
+                            "liquidationPrice": "0", "leverage": str(setting["leverage"]),
+                            "marginType": setting["marginType"].lower(), "isolatedMargin": "0",
+                            "positionSide": "BOTH", "updateTime": self.clock.now_ms()})
+            return out
+
+    def account(self) -> dict:
+        with self._lock:
+            upnl = sum(self._unrealized(s) for s in self.positions)
+            return {"totalWalletBalance": f"{self.wallet:.8f}", "totalUnrealizedProfit": f"{upnl:.8f}",
+                    "totalMarginBalance": f"{self.wallet + upnl:.8f}", "availableBalance": f"{self.available():.8f}",
+                    "assets": self.balance(), "positions": self.position_risk()}
+
+    def set_leverage(self, symbol: str, leverage: int) -> dict:
+        self.market._path(symbol)
+        if not 1 <= leverage <= 125:
+            raise MockError(-4028, "Leverage is not valid.")
+        with self._lock:
+            self._setting(symbol)["leverage"] = leverage
+        return {"symbol": symbol, "leverage": leverage, "maxNotionalValue": "1000000"}
+
+    def set_margin_type(self, symbol: str, margin_type: str) -> dict:
+        self.market._path(symbol)
+        margin_type = margin_type.upper()
+        with self._lock:
+            setting = self._setting(symbol)
+            if setting["marginType"] == margin_type:
+                raise MockError(-4046, "No need to change margin type.")
+            setting["marginType"] = margin_type
+        return {"code": 200, "msg": "success"}
+
+    # ── Órdenes ──────────────────────────────────────────────────────────
+    def _fill_price(self, symbol: str, side: str, reference: float | None = None) -> float:
+        """Precio tras la latencia de ejecución (en tiempo simulado) con slippage en contra."""
+        if reference is None:
+            delay = int(self.fill_latency_ms * self.clock.speed)
+            reference = self.market.price(symbol, self.clock.now_ms() + delay)
+        price = reference * (1 + self.slippage) if side == "BUY" else reference * (1 - self.slippage)
+        return round(price, self.market.precision[symbol][0])
+
+    def _apply_fill(self, order: dict, qty: float, price: float) -> float:
+        """Actualiza posición y wallet; retorna el PnL realizado."""
+        symbol, signed = order["symbol"], qty if order["side"] == "BUY" else -qty
+        pos = self.positions.setdefault(symbol, {"amt": 0.0, "entry": 0.0})
+        amt, entry = pos["amt"], pos["entry"]
+        realized = 0.0
+        if amt == 0 or (amt > 0) == (signed > 0):
+            new_amt = amt + signed
+            pos["entry"] = (abs(amt) * entry + qty * price) / abs(new_amt)
+        else:
+            closing = min(qty, abs(amt))
+            realized = closing * (price - entry) * (1 if amt > 0 else -1)
+            new_amt = amt + signed
+            if abs(new_amt) < 1e-12:
+                new_amt, pos["entry"] = 0.0, 0.0
+            elif (new_amt > 0) != (amt > 0):
+                pos["entry"] = price
+        pos["amt"] = round(new_amt, 8)
+        if pos["amt"] == 0:
+            self.positions.pop(symbol, None)
+        self.wallet += realized - qty * price * self.fee_rate
+        self.counters["fills"] += 1
+        order.update(status="FILLED", executedQty=str(qty), avgPrice=str(price),
+                     cumQuote=f"{qty * price:.8f}", updateTime=self.clock.now_ms())
+        self._order_event(order, "FILLED", "TRADE", price, qty, realized)
+        self._account_event(symbol)
+        return realized
+
+    def _closing_qty(self, order: dict) -> float:
+        """Cantidad que reduce la posición (closePosition / reduceOnly)."""
+        amt = self.positions.get(order["symbol"], {}).get("amt", 0.0)
+        reducing = (amt > 0 and order["side"] == "SELL") or (amt < 0 and order["side"] == "BUY")
+        if not reducing:
+            return 0.0
+        if order["closePosition"]:
+            return abs(amt)
+        return min(float(order["origQty"]), abs(amt))
+
+    def place_order(self, params: dict) -> dict:
+        symbol = params.get("symbol", "")
+        self.market._path(symbol)
+        side, otype = params.get("side", "").upper(), params.get("type", "").upper()
+        if side not in ("BUY", "SELL"):
+            raise MockError(-1102, "Mandatory parameter 'side' was not sent, was empty/null, or malformed.")
+        if otype not in ("MARKET", "STOP_MARKET", "TAKE_PROFIT_MARKET"):
+            raise MockError(-1116, "Invalid orderType.")
+        close_position = str(params.get("closePosition", "false")).lower() == "true"
+        reduce_only = str(params.get("reduceOnly", "false")).lower() == "true"
+        qty = float(params.get("quantity") or 0)
+        if qty <= 0 and not close_position:
+            raise MockError(-4003, "Quantity less than or equal to zero.")
+
+        with self._lock:
+            self.counters["orders"] += 1
+            order = {"orderId": next(self._ids), "symbol": symbol, "side": side, "type": otype,
+                     "origQty": str(qty), "executedQty": "0", "avgPrice": "0", "status": "NEW",
+                     "stopPrice": str(params.get("stopPrice", "0")), "closePosition": close_position,
+                     "reduceOnly": reduce_only or close_position, "timeInForce": "GTC",
+                     "positionSide": "BOTH", "clientOrderId": params.get("newClientOrderId") or secrets.token_hex(8),
+                     "updateTime": self.clock.now_ms()}
+
+            if otype == "MARKET":
+                if order["reduceOnly"]:
+                    qty = self._closing_qty(order)
+                    if qty <= 0:
+                        self.counters["rejected"] += 1
+                        raise MockError(-2022, "ReduceOnly Order is rejected.")
+                self._apply_fill(order, qty, self._fill_price(symbol, side))
+                return dict(order)
+
+            stop = float(params.get("stopPrice") or 0)
+            if stop <= 0:
+                raise MockError(-1102, "Mandatory parameter 'stopPrice' was not sent, was empty/null, or malformed.")
+            if self._triggered(otype, side, stop, *(self.market.price(symbol),) * 2):
+                self.counters["rejected"] += 1
+                raise MockError(-2021, "Order would immediately trigger.")
+            self.orders[order["orderId"]] = order
+            self._order_event(order, "NEW", "NEW")
+            return dict(order)
+
+    @staticmethod
+    def _triggered(otype: str, side: str, stop: float, high: float, low: float) -> bool:
+        # STOP: BUY si el precio sube hasta el stop, SELL si baja. TAKE_PROFIT: al revés
+        rising = (otype == "STOP_MARKET") == (side == "BUY")
+        return high >= stop if rising else low <= stop
+
+    def cancel_order(self, symbol: str, order_id: int) -> dict:
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None or order["symbol"] != symbol:
+                raise MockError(-2011, "Unknown order sent.")
+            del self.orders[order_id]
+            order.update(status="CANCELED", updateTime=self.clock.now_ms())
+            self.counters["canceled"] += 1
+            self._order_event(order, "CANCELED", "CANCELED")
+            return dict(order)
+
+    def cancel_all(self, symbol: str) -> dict:
+        with self._lock:
+            for order_id in [i for i, o in self.orders.items() if o["symbol"] == symbol]:
+                self.cancel_order(symbol, order_id)
+        return {"code": 200, "msg": "The operation of cancel all open order is done."}
+
+    def open_orders(self, symbol: str | None = None) -> list[dict]:
+        with self._lock:
+            return [dict(o) for o in self.orders.values() if symbol is None or o["symbol"] == symbol]
+
+    def match(self):
+        """Dispara las órdenes condicionales cuyo stop se cruzó desde la última comprobación."""
+        with self._lock:
+            now = self.clock.now_ms()
+            since, self._checked_ms = self._checked_ms, now
+            for order_id, order in list(self.orders.items()):
+                high, low = self.market.range_hl(order["symbol"], since, now)
+                stop = float(order["stopPrice"])
+                if not self._triggered(order["type"], order["side"], stop, high, low):
+                    continue
+                del self.orders[order_id]
+                self.counters["triggers"] += 1
+                qty = self._closing_qty(order) if order["reduceOnly"] else float(order["origQty"])
+                if qty <= 0:
+                    order.update(status="EXPIRED", updateTime=now)
+                    self._order_event(order, "EXPIRED", "EXPIRED")
+                    continue
+                self._apply_fill(order, qty, self._fill_price(order["symbol"], order["side"], stop))
+
+    # ── listenKey ────────────────────────────────────────────────────────
+    def new_listen_key(self) -> str:
+        key = secrets.token_hex(32)
+        with self._lock:
+            self.listen_keys.add(key)
+        return key
+
+    def close_listen_key(self, key: str):
+        with self._lock:
+            self.listen_keys.discard(key)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LÍMITE DE PESO Y CONTADORES
+# ─────────────────────────────────────────────────────────────────────────────
+
+class WeightLimiter:
+    """Peso por IP y minuto (tiempo real, como Binance) con 429 / 418."""
+
+    def __init__(self, limit: int = rest_scheduler.WEIGHT_LIMIT, order_limit: int = ORDER_LIMIT):
+        self.limit = limit
+        self.order_limit = order_limit
+        self._ips: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def charge(self, ip: str, cost: int, is_order: bool) -> tuple[int | None, float, dict]:
+        """→ (status de rechazo o None, Retry-After, estado de la IP)."""
+        now = time.time()
+        minute = int(now // 60)
+        with self._lock:
+            st = self._ips.setdefault(ip, {"minute": minute, "used": 0, "orders": 0,
+                                           "violations": 0, "banned_until": 0.0})
+            if st["minute"] != minute:
+                st.update(minute=minute, used=0, orders=0, violations=0)
+            if now < st["banned_until"]:
+                return 418, st["banned_until"] - now, dict(st)
+            if st["used"] + cost > self.limit or (is_order and st["orders"] >= self.order_limit):
+                st["violations"] += 1
+                if st["violations"] > BAN_AFTER_429:
+                    st["banned_until"] = now + BAN_SECS
+                    return 418, BAN_SECS, dict(st)
+                return 429, (minute + 1) * 60 - now, dict(st)
+            st["used"] += cost
+            st["orders"] += is_order
+            return None, 0.0, dict(st)
+
+
+class MockStats:
+    """Contadores por endpoint (peticiones, peso, status, tiempo de servicio) y del WebSocket."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.endpoints: dict[str, dict] = {}
+            self.status: dict[int, int] = {}
+            self.ws = {"connections": 0, "messages": 0}
+
+    def record(self, endpoint: str, status: int, cost: int, secs: float):
+        with self._lock:
+            e = self.endpoints.setdefault(endpoint, {"requests": 0, "weight": 0, "secs": 0.0})
+            e["requests"] += 1
+            e["weight"] += cost if status < 400 else 0
+            e["secs"] += secs
+            self.status[status] = self.status.get(status, 0) + 1
+
+    def ws_event(self, key: str, n: int = 1):
+        with self._lock:
+            self.ws[key] += n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            requests = sum(e["requests"] for e in self.endpoints.values())
+            return {
+                "elapsed_secs": round(elapsed, 1),
+                "requests": requests,
+                "requests_per_sec": round(requests / elapsed, 1),
+                "weight": sum(e["weight"] for e in self.endpoints.values()),
+                "status": dict(self.status),
+                "endpoints": {k: dict(v, secs=round(v["secs"], 3), avg_ms=round(v["secs"] / v["requests"] * 1000, 2))
+                              for k, v in sorted(self.endpoints.items(), key=lambda kv: -kv[1]["weight"])},
+                "ws": dict(self.ws),
+            }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SERVIDOR
+# ─────────────────────────────────────────────────────────────────────────────
+
+class MockBinance:
+    """Mercado + cuenta + límites, servidos por HTTP (Flask) y WebSocket (websockets)."""
+
+    def __init__(self, symbols: list[str], speed: float = 1.0, seed: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, fill_latency_ms: float = 0.0, slippage_bps: float = 0.0,
+                 balance: float = 10_000.0, weight_limit: int = rest_scheduler.WEIGHT_LIMIT,
+                 replay_dir: str | None = None):
+        self.clock = SimClock(speed)
+        self.market = MockMarket(symbols, self.clock, seed=seed, replay_dir=replay_dir)
+        self.account = MockAccount(self.market, balance, fill_latency_ms, slippage_bps)
+        self.limiter = WeightLimiter(weight_limit)
+        self.stats = MockStats()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.app = self._create_app()
+        self._exchange_info = self._build_exchange_info()
+        self._stop = threading.Event()
+        self._http = None
+        self._ws_loop = None
+        self._ws_stop = None
+        self.base_url = self.ws_url = None
+
+    # ── Respuestas de mercado ────────────────────────────────────────────
+    def _build_exchange_info(self) -> dict:
+        symbols = []
+        for s in self.market.symbols:
+            pp, qp = self.market.precision[s]
+            symbols.append({
+                "symbol": s, "pair": s, "contractType": "PERPETUAL", "status": "TRADING",
+                "baseAsset": s[:-4], "quoteAsset": "USDT", "marginAsset": "USDT",
+                "pricePrecision": pp, "quantityPrecision": qp,
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": f"{10 ** -pp:.{pp}f}", "minPrice": "0", "maxPrice": "0"},
+                    {"filterType": "LOT_SIZE", "stepSize": f"{10 ** -qp:.{qp}f}", "minQty": f"{10 ** -qp:.{qp}f}",
+                     "maxQty": "1000000"},
+                    {"filterType": "MARKET_LOT_SIZE", "stepSize": f"{10 ** -qp:.{qp}f}",
+                     "minQty": f"{10 ** -qp:.{qp}f}", "maxQty": "1000000"},
+                    {"filterType": "MIN_NOTIONAL", "notional": "5"},
+                ],
+            })
+        return {"timezone": "UTC", "serverTime": 0, "rateLimits": [
+            {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": self.limiter.limit},
+            {"rateLimitType": "ORDERS", "interval": "MINUTE", "intervalNum": 1, "limit": self.limiter.order_limit},
+        ], "assets": [{"asset": "USDT"}], "symbols": symbols}
+
+    def _premium_index(self, symbol: str) -> dict:
+        now = self.clock.now_ms()
+        period = 8 * 3_600_000
+        price = self.market.price(symbol)
+        return {"symbol": symbol, "markPrice": str(price), "indexPrice": str(price),
+                "estimatedSettlePrice": str(price), "lastFundingRate": f"{self.market.funding_rate(symbol, now):.8f}",
+                "interestRate": "0.00010000", "nextFundingTime": (now // period + 1) * period, "time": now}
+
+    def _funding_history(self, symbol: str, start: int | None, end: int | None, limit: int) -> list[dict]:
+        self.market._path(symbol)
+        period = 8 * 3_600_000
+        now = self.clock.now_ms()
+        end = min(int(end), now) if end is not None else now
+        if start is None:
+            start = end - (limit - 1) * period
+        t = max(-(-int(start) // period) * period, -(-self.market.origin_ms // period) * period)
+        out = []
+        while t <= end and len(out) < limit:
+            out.append({"symbol": symbol, "fundingTime": t, "fundingRate": f"{self.market.funding_rate(symbol, t - 1):.8f}",
+                        "markPrice": str(self.market.price(symbol, t))})
+            t += period
+        return out
+
+    def _ticker_24h(self, symbol: str) -> dict:
+        now = self.clock.now_ms()
+        price = self.market.price(symbol)
+        prev = self.market.price(symbol, now - 86_400_000)
+        return {"symbol": symbol, "lastPrice": str(price), "openPrice": str(prev),
+                "priceChange": str(price - prev), "priceChangePercent": f"{(price / prev - 1) * 100:.3f}",
+                "quoteVolume": f"{self.market.quote_volume_24h(symbol):.2f}", "closeTime": now}
+
+    # ── HTTP ─────────────────────────────────────────────────────────────
+    def _create_app(self):
+        from flask import Flask, Response, g, request
+
+        app = Flask("mock_binance")
+        mock = self
+
+        def params() -> dict:
+            return {k: v for k, v in request.values.items() if k not in ("signature", "timestamp", "recvWindow")}
+
+        def ok(data, status: int = 200):
+            return Response(json.dumps(data), status=status, mimetype="application/json")
+
+        @app.errorhandler(MockError)
+        def _mock_error(e: MockError):
+            return ok({"code": e.code, "msg": e.msg}, e.status)
+
+        @app.errorhandler(ValueError)
+        def _bad_param(e):
+            return ok({"code": -1100, "msg": f"Illegal characters found in a parameter: {e}"}, 400)
+
+        @app.before_request
+        def _before():
+            g.t0 = time.perf_counter()
+            g.cost = 0
+            if request.path.startswith("/mock/"):
+                return None
+            if mock.latency_ms or mock.jitter_ms:
+                time.sleep(max(0.0, mock.latency_ms + random.uniform(-mock.jitter_ms, mock.jitter_ms)) / 1000)
+            g.cost = rest_scheduler.endpoint_cost(request.method, request.path, params())
+            is_order = request.method in ("POST", "DELETE") and request.path in rest_scheduler.ORDER_PATHS
+            status, retry_after, g.weight = mock.limiter.charge(request.remote_addr or "-", g.cost, is_order)
+            if status is not None:
+                msg = ("Way too many requests; IP banned." if status == 418 else
+                       "Too many requests; current limit of IP is exceeded.")
+                response = ok({"code": -1003, "msg": msg}, status)
+                response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+                return response
+            return None
+
+        @app.after_request
+        def _after(response):
+            weight = getattr(g, "weight", None)
+            if weight is not None:
+                response.headers["X-MBX-USED-WEIGHT-1M"] = str(weight["used"])
+                response.headers["X-MBX-ORDER-COUNT-1M"] = str(weight["orders"])
+            if not request.path.startswith("/mock/"):
+                mock.stats.record(f"{request.method} {request.path}", response.status_code,
+                                  getattr(g, "cost", 0), time.perf_counter() - g.t0)
+            return response
+
+        # Spot: solo lo que usa el constructor de Client
+        @app.route("/api/v3/ping")
+        def _spot_ping():
+            return ok({})
+
+        @app.route("/api/v3/time")
+        @app.route("/fapi/v1/time")
+        def _time():
+            return ok({"serverTime": mock.clock.now_ms()})
+
+        @app.route("/fapi/v1/ping")
+        def _ping():
+            return ok({})
+
+        @app.route("/fapi/v1/exchangeInfo")
+        def _exchange_info():
+            return ok(dict(mock._exchange_info, serverTime=mock.clock.now_ms()))
+
+        @app.route("/fapi/v1/klines")
+        def _klines():
+            p = params()
+            return ok(mock.market.klines(p.get("symbol", ""), p.get("interval", ""), int(p.get("limit", 500)),
+                                         p.get("startTime"), p.get("endTime")))
+
+        @app.route("/fapi/v1/premiumIndex")
+        def _premium():
+            symbol = params().get("symbol")
+            if symbol:
+                return ok(mock._premium_index(symbol))
+            return ok([mock._premium_index(s) for s in mock.market.symbols])
+
+        @app.route("/fapi/v1/fundingRate")
+        def _funding_rate():
+            p = params()
+            return ok(mock._funding_history(p.get("symbol", ""), p.get("startTime"), p.get("endTime"),
+                                            min(int(p.get("limit", 100)), 1000)))
+
+        @app.route("/fapi/v1/ticker/price")
+        @app.route("/fapi/v2/ticker/price")
+        def _ticker_price():
+            symbol = params().get("symbol")
+            now = mock.clock.now_ms()
+            if symbol:
+                return ok({"symbol": symbol, "price": str(mock.market.price(symbol)), "time": now})
+            return ok([{"symbol": s, "price": str(mock.market.price(s)), "time": now} for s in mock.market.symbols])
+
+        @app.route("/fapi/v1/ticker/24hr")
+        def _ticker_24h():
+            symbol = params().get("symbol")
+            if symbol:
+                return ok(mock._ticker_24h(symbol))
+            return ok([mock._ticker_24h(s) for s in mock.market.symbols])
+
+        # Cuenta y órdenes (la firma no se valida)
+        @app.route("/fapi/v2/balance")
+        def _balance():
+            return ok(mock.account.balance())
+
+        @app.route("/fapi/v2/account")
+        def _account():
+            return ok(mock.account.account())
+
+        @app.route("/fapi/v2/positionRisk")
+        def _position_risk():
+            return ok(mock.account.position_risk(params().get("symbol")))
+
+        @app.route("/fapi/v1/leverage", methods=["POST"])
+        def _leverage():
+            p = params()
+            return ok(mock.account.set_leverage(p.get("symbol", ""), int(p.get("leverage", 0))))
+
+        @app.route("/fapi/v1/marginType", methods=["POST"])
+        def _margin_type():
+            p = params()
+            return ok(mock.account.set_margin_type(p.get("symbol", ""), p.get("marginType", "")))
+
+        @app.route("/fapi/v1/order", methods=["POST", "DELETE"])
+        def _order():
+            p = params()
+            if request.method == "DELETE":
+                return ok(mock.account.cancel_order(p.get("symbol", ""), int(p.get("orderId", 0))))
+            return ok(mock.account.place_order(p))
+
+        @app.route("/fapi/v1/batchOrders", methods=["POST"])
+        def _batch_orders():
+            raw = params().get("batchOrders", "[]")
+            batch = json.loads(unquote(raw) if raw.startswith("%") else raw)   # python-binance la codifica dos veces
+            results = []
+            for leg in batch[:5]:
+                try:
+                    results.append(mock.account.place_order(leg))
+                except MockError as e:
+                    results.append({"code": e.code, "msg": e.msg})
+            return ok(results)
+
+        @app.route("/fapi/v1/openOrders")
+        def _open_orders():
+            return ok(mock.account.open_orders(params().get("symbol")))
+
+        @app.route("/fapi/v1/allOpenOrders", methods=["DELETE"])
+        def _cancel_all():
+            return ok(mock.account.cancel_all(params().get("symbol", "")))
+
+        @app.route("/fapi/v1/listenKey", methods=["POST", "PUT", "DELETE"])
+        def _listen_key():
+            if request.method == "POST":
+                return ok({"listenKey": mock.account.new_listen_key()})
+            if request.method == "DELETE":
+                mock.account.close_listen_key(params().get("listenKey", ""))
+            return ok({})
+
+        # Control del mock
+        @app.route("/mock/stats")
+        def _stats():
+            return ok(mock.snapshot())
+
+        @app.route("/mock/reset", methods=["POST"])
+        def _reset():
+            mock.stats.reset()
+            return ok({"reset": True})
+
+        return app
+
+    def snapshot(self) -> dict:
+        return dict(self.stats.snapshot(), account=dict(self.account.counters, wallet=round(self.account.wallet, 4),
+                                                        open_positions=len(self.account.positions),
+                                                        open_orders=len(self.account.orders)),
+                    clock={"now_ms": self.clock.now_ms(), "speed": self.clock.speed},
+                    symbols=len(self.market.symbols), replayed=self.market.replayed)
+
+    # ── WebSocket ────────────────────────────────────────────────────────
+    def _kline_event(self, symbol: str, interval: str, row: list, closed: bool) -> dict:
+        return {"e": "kline", "E": self.clock.now_ms(), "s": symbol, "k": {
+            "t": row[0], "T": row[6], "s": symbol, "i": interval, "o": row[1], "c": row[4], "h": row[2],
+            "l": row[3], "v": row[5], "n": row[8], "x": closed, "q": row[7], "V": row[9], "Q": row[10]}}
+
+    async def _push_klines(self, stream: str, queue: asyncio.Queue):
+        symbol, interval = stream.split("@kline_")
+        symbol = symbol.upper()
+        last_open = None
+        while True:
+            rows = self.market.klines(symbol, interval, limit=2)
+            if last_open is not None and rows[-1][0] != last_open and len(rows) > 1:
+                queue.put_nowait((stream, self._kline_event(symbol, interval, rows[-2], True)))
+            last_open = rows[-1][0]
+            queue.put_nowait((stream, self._kline_event(symbol, interval, rows[-1], False)))
+            await asyncio.sleep(KLINE_PUSH_SECS)
+
+    async def _ws_handler(self, ws, path: str | None = None):
+        url = urlparse(path if path is not None else ws.request.path)
+        if url.path.startswith("/ws/"):
+            streams, combined = [url.path[4:]], False
+        elif url.path == "/stream":
+            streams, combined = parse_qs(url.query).get("streams", [""])[0].split("/"), True
+        else:
+            await ws.close(code=1008, reason="unknown path")
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks, callbacks = [], []
+        for stream in streams:
+            if stream in self.account.listen_keys:
+                def callback(event, _stream=stream):
+                    loop.call_soon_threadsafe(queue.put_nowait, (_stream, event))
+                self.account.subscribe(callback)
+                callbacks.append(callback)
+            elif "@kline_" in stream:
+                tasks.append(asyncio.ensure_future(self._push_klines(stream, queue)))
+        self.stats.ws_event("connections")
+        try:
+            while True:
+                stream, event = await queue.get()
+                await ws.send(json.dumps({"stream": stream, "data": event} if combined else event))
+                self.stats.ws_event("messages")
+        except Exception:
+            pass   # Cliente desconectado
+        finally:
+            for callback in callbacks:
+                self.account.unsubscribe(callback)
+            for task in tasks:
+                task.cancel()
+
+    def _serve_ws(self, host: str, port: int, ready: threading.Event):
+        try:
+            import websockets
+        except ImportError:
+            logger.warning("⚠️ mock_binance: 'websockets' no instalado — solo REST")
+            ready.set()
+            return
+
+        async def main():
+            self._ws_loop = asyncio.get_running_loop()
+            self._ws_stop = self._ws_loop.create_future()
+            async with websockets.serve(self._ws_handler, host, port):
+                self.ws_url = f"ws://{host}:{port}"
+                ready.set()
+                await self._ws_stop
+
+        asyncio.run(main())
+
+    # ── Ciclo de vida ────────────────────────────────────────────────────
+    def _match_loop(self):
+        while not self._stop.wait(MATCH_SECS):
+            try:
+                self.account.match()
+            except Exception as e:
+                logger.error(f"mock_binance: motor de órdenes: {e}")
+
+    def start(self, host: str = "127.0.0.1", port: int = 8090, ws_port: int | None = 8091) -> "MockBinance":
+        """Arranca HTTP, WebSocket y el motor de órdenes en hilos daemon."""
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass   # Una línea por petición ahoga el log bajo carga: ver /mock/stats
+
+        self._http = make_server(host, port, self.app, threaded=True, request_handler=QuietHandler)
+        self.base_url = f"http://{host}:{self._http.server_port}"
+        threading.Thread(target=self._http.serve_forever, name="mock-http", daemon=True).start()
+        threading.Thread(target=self._match_loop, name="mock-matcher", daemon=True).start()
+        if ws_port is not None:
+            ready = threading.Event()
+            threading.Thread(target=self._serve_ws, args=(host, ws_port, ready), name="mock-ws", daemon=True).start()
+            ready.wait(5)
+        logger.success(f"🧪 Mock Binance en {self.base_url} | WS {self.ws_url or '—'} | "
+                       f"{len(self.market.symbols)} pares ({self.market.replayed} grabados) | x{self.clock.speed:g}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._http is not None:
+            self._http.shutdown()
+        if self._ws_loop is not None and self._ws_stop is not None:
+            self._ws_loop.call_soon_threadsafe(lambda: self._ws_stop.done() or self._ws_stop.set_result(None))
+
+
+def make_universe(n: int) -> list[str]:
+    """Los pares de BASE_PRICES primero y después MOCK001USDT, MOCK002USDT..."""
+    symbols = list(BASE_PRICES)[:n]
+    return symbols + [f"MOCK{i:03d}USDT" for i in range(1, n - len(symbols) + 1)]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# BENCHMARK
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _bench_target(target: str, symbols: list[str], interval: str, concurrency: int):
+    """Devuelve una función que ejecuta UN ciclo del componente a medir contra el mock."""
+    import config
+    config.SYMBOLS = symbols   # dashboard y bot recorren config.SYMBOLS
+
+    if target == "paper":
+        import paper_trade
+        engine = paper_trade.PaperEngine(symbols, interval, paper_trade.PaperPortfolio(10_000.0))
+        return engine.run_cycle
+    if target == "scanner":
+        from scanner import UniverseScanner
+        scanner = UniverseScanner(interval, min_quote_volume=0)
+        return lambda: scanner.scan(force=True)
+    if target == "dashboard":
+        from concurrent.futures import ThreadPoolExecutor
+        import dashboard
+        client = dashboard.app.test_client()
+        paths = ["/api/status", "/api/market", "/api/signals"] * concurrency
+
+        def cycle():
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(client.get, paths))
+        return cycle
+    if target == "bot":
+        import bot
+        from exchange import BinanceFuturesExchange
+        exchange = BinanceFuturesExchange()
+        return lambda: bot.run_cycle(exchange)
+    raise ValueError(f"Objetivo de benchmark desconocido: {target}")
+
+
+def run_bench(mock: MockBinance, target: str, cycles: int, interval: str, concurrency: int,
+              pause: float = 0.0) -> dict:
+    """
+    Mide `cycles` ciclos de bot / paper / scanner / dashboard contra el mock.
+    Las URL del mock se fijan en config (y en el entorno, para subprocesos) y
+    el peso REST se cuenta en un archivo propio.
+    """
+    import config
+    config.BINANCE_BASE_URL = os.environ["BINANCE_BASE_URL"] = mock.base_url
+    if mock.ws_url:
+        config.BINANCE_WS_URL = os.environ["BINANCE_WS_URL"] = mock.ws_url
+    # No mezclar el peso del benchmark con el de los procesos reales
+    os.environ.setdefault("BINANCE_WEIGHT_FILE", os.path.join(tempfile.mkdtemp(), "weight.json"))
+    rest_scheduler.SCHEDULER.shared_file = os.environ["BINANCE_WEIGHT_FILE"]
+
+    cycle = _bench_target(target, mock.market.symbols, interval, concurrency)
+    mock.stats.reset()
+    times = []
+    for i in range(cycles):
+        t0 = time.perf_counter()
+        cycle()
+        times.append(time.perf_counter() - t0)
+        logger.info(f"⏱️ {target} ciclo {i + 1}/{cycles}: {times[-1]:.2f}s")
+        if pause and i < cycles - 1:
+            time.sleep(pause)
+    return {"target": target, "cycles": cycles, "median_secs": round(statistics.median(times), 3),
+            "max_secs": round(max(times), 3), "first_secs": round(times[0], 3), "mock": mock.snapshot()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita Binance Futures (REST + WebSocket)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--ws-port", type=int, default=8091)
+    parser.add_argument("--symbols", type=int, default=4, help="Número de pares (los de config primero)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Aceleración del reloj simulado")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latencia de cada respuesta REST")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--fill-latency-ms", type=float, default=0.0, help="Retraso de ejecución de órdenes MARKET")
+    parser.add_argument("--slippage-bps", type=float, default=0.0)
+    parser.add_argument("--balance", type=float, default=10_000.0)
+    parser.add_argument("--weight-limit", type=int, default=rest_scheduler.WEIGHT_LIMIT)
+    parser.add_argument("--replay", nargs="?", const=HISTORY_DIR, default=None,
+                        help=f"Reproducir velas de 1m grabadas (<PAR>_1m.pkl, por defecto en {HISTORY_DIR}/)")
+    parser.add_argument("--bench", choices=["paper", "scanner", "dashboard", "bot"], default=None)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--concurrency", type=int, default=10, help="Peticiones simultáneas (bench dashboard)")
+    parser.add_argument("--pause", type=float, default=0.0, help="Segundos entre ciclos del benchmark")
+    args = parser.parse_args()
+
+    server = MockBinance(make_universe(args.symbols), speed=args.speed, seed=args.seed,
+                         latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         fill_latency_ms=args.fill_latency_ms, slippage_bps=args.slippage_bps,
+                         balance=args.balance, weight_limit=args.weight_limit, replay_dir=args.replay)
+    server.start(args.host, args.port, args.ws_port)
+
+    if args.bench:
+        result = run_bench(server, args.bench, args.cycles, args.interval, args.concurrency, args.pause)
+        server.stop()
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"BINANCE_BASE_URL={server.base_url} BINANCE_WS_URL={server.ws_url or ''}")
+        try:
+            while True:
+                time.sleep(60)
+                s = server.stats.snapshot()
+                logger.info(f"📊 {s['requests']} peticiones | peso {s['weight']} | status {s['status']} | "
+                            f"ws {s['ws']['messages']} msgs")
+        except KeyboardInterrupt:
+            server.stop()
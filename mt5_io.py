@@ -0,0 +1,50 @@
+"""
+mt5_io.py — Acceso serializado a la API de MetaTrader5
+======================================================
+La librería MetaTrader5 de Python habla con el terminal por un único canal
+IPC y no está documentada como thread-safe. Desde que las señales se evalúan
+en un pool (SIGNAL_WORKERS) y EquityMonitor corre en su propio hilo, varias
+llamadas mt5.* pueden coincidir en el tiempo.
+
+`from mt5_io import mt5` devuelve un proxy del módulo:
+  🔒 Cada función (copy_rates_*, positions_get, order_send...) se ejecuta bajo
+     un único RLock (MT5_LOCK): la I/O con el terminal queda en serie.
+  ⚡ Las constantes (TIMEFRAME_*, ORDER_TYPE_*...) se devuelven tal cual.
+
+El lock cubre solo la llamada: indicadores y estrategias siguen en paralelo,
+y nunca se espera otro lock con MT5_LOCK tomado (sin riesgo de deadlock).
+"""
+
+import functools
+import threading
+
+import MetaTrader5 as _mt5
+
+MT5_LOCK = threading.RLock()
+
+
+class SerializedMT5:
+    """Proxy de un módulo: sus funciones se llaman con MT5_LOCK tomado."""
+
+    def __init__(self, module):
+        self._module = module
+        self._wrapped: dict[str, callable] = {}
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._module, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+        fn = self._wrapped.get(name)
+        if fn is None:
+            module = self._module
+
+            @functools.wraps(attr)
+            def fn(*args, **kwargs):
+                with MT5_LOCK:
+                    # Resuelta en cada llamada: respeta funciones parcheadas en el módulo
+                    return getattr(module, name)(*args, **kwargs)
+            self._wrapped[name] = fn
+        return fn
+
+
+mt5 = SerializedMT5(_mt5)
@@ -6,6 +6,19 @@ y simula las órdenes localmente con un balance virtual.
 
 No necesitas crear cuenta ni API keys.
 
+Motor:
+  🧵 Una tarea por par en cada ciclo (PAPER_WORKERS hilos) en lugar de
+     recorrer los pares en serie con pausas de 0.3s.
+  🗄️ MarketDataCache: velas por (par, intervalo) compartidas por todas las
+     estrategias; tras la primera carga solo se piden las últimas velas.
+  🎯 Varias estrategias por par (XAUUSDT: Asian Breakout 15m + EMA/RSI),
+     cada una con su propia posición. Las señales se evalúan una vez por vela.
+  📈 Mark-to-market de todas las posiciones en cada actualización (SL/TP con
+     los máximos/mínimos desde la entrada y PnL no realizado).
+  💾 Estado con StateStore: bot_state.json solo se reescribe cuando cambian
+     balance/posiciones (o, como mucho, cada PAPER_MARK_FLUSH_SECS por las
+     marcas); las estadísticas por estrategia van a bot_state_history.json.
+
 Uso:
     python paper_trade.py                    # Paper trade todos los pares
     python paper_trade.py --symbol BTCUSDT   # Solo un par
@@ -16,10 +29,12 @@ Uso:
 import argparse
 import time
 import csv
-import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from dataclasses import dataclass, field
+from typing import Callable
 
 import pandas as pd
 from binance.client import Client
@@ -29,22 +44,40 @@ from indicators import add_indicators, get_last_signal_data
 from strategy import check_signal, FUNDING_RATE_THRESHOLD
 from strategy_xau import check_signal_xau
 from risk_manager import calc_sl_tp, calc_position_size
+from funding import FundingSnapshot
+from kline_downloader import INTERVAL_MS
+from kline_parser import klines_to_frame
+from state_store import StateStore
+import rest_scheduler
 import logger
 
 XAU_SYMBOL   = "XAUUSDT"   # Par que usa la estrategia Asian Breakout
 XAU_INTERVAL = "15m"        # XAU siempre en 15m para resolución de sesión
+XAU_LIMIT    = 50
+
+PAPER_WORKERS         = int(os.getenv("PAPER_WORKERS", 8))
+MARKET_REFRESH_SECS   = float(os.getenv("PAPER_MARKET_REFRESH_SECS", 5))   # Velas "frescas" para otras tareas
+TAIL_BARS             = 3          # Velas pedidas en cada refresco incremental (peso 1)
+MARK_FLUSH_SECS       = float(os.getenv("PAPER_MARK_FLUSH_SECS", 30))      # Marcas → disco como mucho cada N s
+HEARTBEAT_SECS        = 300        # Sin cambios: last_update se refresca igualmente
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CLIENTE PÚBLICO (sin API keys, solo datos de mercado)
 # ─────────────────────────────────────────────────────────────────────────────
+config.use_binance_endpoint()    # BINANCE_BASE_URL (mock_binance.py) si está definido
 public_client = Client("", "")   # ← Sin autenticación, 100% gratuito
+rest_scheduler.install(public_client, rest_scheduler.DATA)    # Cede peso al bot real
+funding = FundingSnapshot(public_client.futures_mark_price)   # premiumIndex de todos los pares
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # ESTRUCTURAS DE DATOS
 # ─────────────────────────────────────────────────────────────────────────────
 
+DEFAULT_STRATEGY = "EMA"
+
+
 @dataclass
 class SimulatedPosition:
     symbol:      str
@@ -54,6 +87,17 @@ class SimulatedPosition:
     stop_loss:   float
     take_profit: float
     opened_at:   str = field(default_factory=lambda: datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"))
+    strategy:    str = DEFAULT_STRATEGY
+    opened_bar:  pd.Timestamp | None = None   # Velas posteriores → SL/TP por máximos/mínimos
+    bar_high:    float = 0.0                  # Máximo/mínimo de opened_bar al entrar: lo que los
+    bar_low:     float = 0.0                  # supere después ocurrió con la posición abierta
+    mark_price:  float = 0.0
+    unrealized:  float = 0.0
+
+    def pnl_at(self, price: float) -> float:
+        if self.side == "LONG":
+            return (price - self.entry_price) * self.qty
+        return (self.entry_price - price) * self.qty
 
 
 @dataclass
@@ -67,80 +111,187 @@ class TradeResult:
     result:      str          # "WIN" o "LOSS"
     opened_at:   str
     closed_at:   str
+    strategy:    str = DEFAULT_STRATEGY
 
 
 class PaperPortfolio:
-    """Gestiona el balance virtual y las posiciones simuladas."""
+    """
+    Gestiona el balance virtual y las posiciones simuladas (una por par y
+    estrategia). Thread-safe: lo comparten las tareas de todos los pares.
+    """
 
-    def __init__(self, initial_capital: float):
+    def __init__(self, initial_capital: float, store: StateStore | None = None):
         self.initial_capital = initial_capital
         self.balance         = initial_capital
-        self.positions: dict[str, SimulatedPosition] = {}
+        self.positions: dict[tuple[str, str], SimulatedPosition] = {}
         self.trade_history: list[TradeResult] = []
+        self.store = store
+        self._lock = threading.RLock()
+        self._marked = False
+        self._last_write = 0.0
 
-    def has_position(self, symbol: str) -> bool:
-        return symbol in self.positions
+    def _changed(self):
+        if self.store is not None:
+            self.store.mark_dirty()
+
+    def has_position(self, symbol: str, strategy: str = DEFAULT_STRATEGY) -> bool:
+        with self._lock:
+            return (symbol, strategy) in self.positions
 
     def open_position(self, symbol: str, side: str, entry_price: float,
-                      qty: float, stop_loss: float, take_profit: float):
+                      qty: float, stop_loss: float, take_profit: float,
+                      strategy: str = DEFAULT_STRATEGY, opened_bar: pd.Timestamp | None = None,
+                      bar_high: float | None = None, bar_low: float | None = None):
         """Abre una posición simulada."""
-        self.positions[symbol] = SimulatedPosition(
-            symbol=symbol, side=side, entry_price=entry_price,
-            qty=qty, stop_loss=stop_loss, take_profit=take_profit,
-        )
+        with self._lock:
+            self.positions[(symbol, strategy)] = SimulatedPosition(
+                symbol=symbol, side=side, entry_price=entry_price,
+                qty=qty, stop_loss=stop_loss, take_profit=take_profit,
+                strategy=strategy, opened_bar=opened_bar, mark_price=entry_price,
+                bar_high=entry_price if bar_high is None else bar_high,
+                bar_low=entry_price if bar_low is None else bar_low,
+            )
+            self._changed()
         arrow = "📈" if side == "LONG" else "📉"
         logger.success(
-            f"[PAPER] {arrow} {side} abierto en {symbol} | "
+            f"[PAPER] {arrow} {side} abierto en {symbol} ({strategy}) | "
             f"Precio: {entry_price:.4f} | Qty: {qty:.6f} | "
             f"SL: {stop_loss:.4f} | TP: {take_profit:.4f}"
         )
 
     def check_and_close(self, symbol: str, current_high: float,
-                        current_low: float) -> TradeResult | None:
+                        current_low: float, strategy: str = DEFAULT_STRATEGY) -> TradeResult | None:
         """
         Verifica si el SL o TP fue alcanzado con los precios actuales.
         Retorna el resultado si se cerró, None si sigue abierta.
         """
-        if symbol not in self.positions:
-            return None
-
-        pos = self.positions[symbol]
-        hit_sl = (pos.side == "LONG"  and current_low  <= pos.stop_loss)  or \
-                 (pos.side == "SHORT" and current_high >= pos.stop_loss)
-        hit_tp = (pos.side == "LONG"  and current_high >= pos.take_profit) or \
-                 (pos.side == "SHORT" and current_low  <= pos.take_profit)
-
-        if not hit_sl and not hit_tp:
-            return None
-
-        exit_price = pos.stop_loss if hit_sl else pos.take_profit
-        result_str = "LOSS" if hit_sl else "WIN"
-
-        if pos.side == "LONG":
-            pnl = (exit_price - pos.entry_price) * pos.qty
-        else:
-            pnl = (pos.entry_price - exit_price) * pos.qty
-
-        self.balance += pnl
-        del self.positions[symbol]
-
-        trade = TradeResult(
-            symbol=symbol, side=pos.side,
-            entry_price=pos.entry_price, exit_price=exit_price,
-            qty=pos.qty, pnl=round(pnl, 4),
-            result=result_str,
-            opened_at=pos.opened_at,
-            closed_at=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-        )
-        self.trade_history.append(trade)
+        with self._lock:
+            pos = self.positions.get((symbol, strategy))
+            if pos is None:
+                return None
+
+            hit_sl = (pos.side == "LONG"  and current_low  <= pos.stop_loss)  or \
+                     (pos.side == "SHORT" and current_high >= pos.stop_loss)
+            hit_tp = (pos.side == "LONG"  and current_high >= pos.take_profit) or \
+                     (pos.side == "SHORT" and current_low  <= pos.take_profit)
+
+            if not hit_sl and not hit_tp:
+                return None
+
+            exit_price = pos.stop_loss if hit_sl else pos.take_profit
+            result_str = "LOSS" if hit_sl else "WIN"
+            pnl = pos.pnl_at(exit_price)
+
+            self.balance += pnl
+            del self.positions[(symbol, strategy)]
+
+            trade = TradeResult(
+                symbol=symbol, side=pos.side,
+                entry_price=pos.entry_price, exit_price=exit_price,
+                qty=pos.qty, pnl=round(pnl, 4),
+                result=result_str,
+                opened_at=pos.opened_at,
+                closed_at=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                strategy=strategy,
+            )
+            self.trade_history.append(trade)
+            self._changed()
+            balance = self.balance
 
         emoji = "✅" if result_str == "WIN" else "❌"
         logger.info(
-            f"[PAPER] {emoji} {result_str} | {symbol} | "
-            f"PnL: {pnl:+.4f} USDT | Balance: {self.balance:.2f} USDT"
+            f"[PAPER] {emoji} {result_str} | {symbol} ({strategy}) | "
+            f"PnL: {pnl:+.4f} USDT | Balance: {balance:.2f} USDT"
         )
         return trade
 
+    def mark_to_market(self, symbol: str, strategy: str, df: pd.DataFrame) -> TradeResult | None:
+        """
+        Actualiza la posición con las velas más recientes: SL/TP contra los
+        máximos/mínimos de las velas posteriores a la entrada y el precio
+        actual; si sigue abierta, marca el PnL no realizado.
+
+        La vela de entrada cuenta solo por lo que supere su máximo/mínimo al
+        entrar (entrada intrabar: su rango previo es anterior a la posición).
+        """
+        with self._lock:
+            pos = self.positions.get((symbol, strategy))
+            if pos is None or df.empty:
+                return None
+            price = float(df["close"].iloc[-1])
+            after = df[df.index > pos.opened_bar] if pos.opened_bar is not None else df.iloc[0:0]
+            high = max(float(after["high"].max()), price) if len(after) else price
+            low  = min(float(after["low"].min()), price) if len(after) else price
+            if pos.opened_bar in df.index:
+                bar = df.loc[pos.opened_bar]
+                if float(bar["high"]) > pos.bar_high:
+                    high = max(high, float(bar["high"]))
+                if float(bar["low"]) < pos.bar_low:
+                    low = min(low, float(bar["low"]))
+            trade = self.check_and_close(symbol, high, low, strategy)
+            if trade is None:
+                pos.mark_price = price
+                pos.unrealized = pos.pnl_at(price)
+                self._marked = True
+            return trade
+
+    def equity(self) -> float:
+        with self._lock:
+            return self.balance + sum(p.unrealized for p in self.positions.values())
+
+    # ── Persistencia ─────────────────────────────────────────────────────
+    def state(self, running: bool = True) -> dict:
+        """Estado para el dashboard: hot (balance, posiciones) + cold (estadísticas)."""
+        with self._lock:
+            positions = {
+                f"{sym}:{strat}": {
+                    "symbol":         pos.symbol,
+                    "strategy":       pos.strategy,
+                    "side":           pos.side,
+                    "entry_price":    pos.entry_price,
+                    "qty":            pos.qty,
+                    "stop_loss":      pos.stop_loss,
+                    "take_profit":    pos.take_profit,
+                    "opened_at":      pos.opened_at,
+                    "mark_price":     pos.mark_price,
+                    "unrealized_pnl": round(pos.unrealized, 4),
+                }
+                for (sym, strat), pos in self.positions.items()
+            }
+            strategies: dict[str, dict] = {}
+            for t in self.trade_history:
+                s = strategies.setdefault(t.strategy, {"trades": 0, "wins": 0, "pnl": 0.0})
+                s["trades"] += 1
+                s["wins"] += t.result == "WIN"
+                s["pnl"] = round(s["pnl"] + t.pnl, 4)
+            return {
+                "balance":         round(self.balance, 4),
+                "initial_capital": round(self.initial_capital, 4),
+                "equity":          round(self.balance + sum(p.unrealized for p in self.positions.values()), 4),
+                "positions":       positions,
+                "running":         running,
+                "last_update":     datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                "strategies":      strategies,
+            }
+
+    def flush(self, force: bool = False, running: bool = True) -> bool:
+        """
+        Escribe el estado solo si hace falta: inmediatamente tras abrir/cerrar,
+        cada MARK_FLUSH_SECS si solo cambiaron las marcas y cada HEARTBEAT_SECS
+        como latido. Retorna True si escribió.
+        """
+        if self.store is None:
+            return False
+        now = time.time()
+        since = now - self._last_write
+        due = (self._marked and since >= MARK_FLUSH_SECS) or since >= HEARTBEAT_SECS
+        if not (force or self.store.dirty or due):
+            return False
+        self.store.write(self.state(running), force=True)
+        self._marked = False
+        self._last_write = now
+        return True
+
     def print_summary(self):
         """Imprime el resumen del portfolio actual."""
         wins   = [t for t in self.trade_history if t.result == "WIN"]
@@ -157,8 +308,10 @@ class PaperPortfolio:
         print(f"  PnL Total       : ${total_pnl:+,.2f} USDT  ({(self.balance/self.initial_capital-1)*100:+.2f}%)")
         print(f"  Trades totales  : {total}  (✅ {len(wins)} wins | ❌ {len(losses)} losses)")
         print(f"  Win Rate        : {win_rate:.1f}%")
+        for name, s in self.state()["strategies"].items():
+            print(f"    {name:<10}: {s['trades']} trades | {s['wins']} wins | PnL ${s['pnl']:+,.2f}")
         if self.positions:
-            print(f"  Posiciones abiertas: {list(self.positions.keys())}")
+            print(f"  Posiciones abiertas: {[f'{sym} ({strat})' for sym, strat in self.positions]}")
         print("═" * 60 + "\n")
 
 
@@ -170,31 +323,75 @@ def get_klines_public(symbol: str, interval: str, limit: int = 200) -> pd.DataFr
     """Descarga velas de Binance Futures usando la API pública (sin auth)."""
     try:
         raw = public_client.futures_klines(symbol=symbol, interval=interval, limit=limit)
-        df = pd.DataFrame(raw, columns=[
-            "timestamp", "open", "high", "low", "close", "volume",
-            "close_time", "quote_volume", "trades",
-            "taker_buy_base", "taker_buy_quote", "ignore"
-        ])
-        df = df[["timestamp", "open", "high", "low", "close", "volume"]].copy()
-        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-        for col in ["open", "high", "low", "close", "volume"]:
-            df[col] = df[col].astype(float)
-        df.set_index("timestamp", inplace=True)
-        return df
+        return klines_to_frame(raw)
     except Exception as e:
         logger.error(f"Error descargando {symbol}: {e}")
         return pd.DataFrame()
 
 
 def get_funding_rate_public(symbol: str) -> float:
-    """Obtiene el funding rate actual usando la API pública (sin auth)."""
-    try:
-        data = public_client.futures_funding_rate(symbol=symbol, limit=1)
-        if data:
-            return float(data[-1]["fundingRate"])
-        return 0.0
-    except Exception:
-        return 0.0
+    """Obtiene el funding rate actual del snapshot compartido de premiumIndex (API pública)."""
+    return funding.funding_rate(symbol)
+
+
+class MarketDataCache:
+    """
+    Velas por (par, intervalo) compartidas por todas las estrategias y tareas.
+
+    Primera petición: `limit` velas. Después solo las últimas TAIL_BARS
+    (peso 1 en vez de 2), que se fusionan con lo cacheado. Varias estrategias
+    que piden la misma serie dentro de MARKET_REFRESH_SECS comparten una
+    única descarga.
+    """
+
+    def __init__(self, fetch: Callable[[str, str, int], pd.DataFrame] = get_klines_public,
+                 refresh_secs: float = MARKET_REFRESH_SECS):
+        self.fetch = fetch
+        self.refresh_secs = refresh_secs
+        self._frames: dict[tuple[str, str], tuple[pd.DataFrame, float]] = {}
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.hits = 0
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        key = (symbol, interval)
+        with self._key_lock(key):
+            cached, fetched_at = self._frames.get(key, (None, 0.0))
+            now = time.time()
+            if cached is not None and len(cached) >= limit and now - fetched_at < self.refresh_secs:
+                self.hits += 1
+                return cached.iloc[-limit:]
+
+            step = pd.Timedelta(milliseconds=INTERVAL_MS.get(interval, 0))
+            fresh_enough = (cached is not None and len(cached) >= limit and step > pd.Timedelta(0) and
+                            pd.Timestamp(now, unit="s") - cached.index[-1] < step * (TAIL_BARS - 1))
+            df = None
+            if fresh_enough:
+                tail = self.fetch(symbol, interval, TAIL_BARS)
+                self.tail_fetches += 1
+                if tail.empty:
+                    return cached.iloc[-limit:]   # Error ya registrado: se sigue con lo último conocido
+                # El reloj local no garantiza el solape (proceso parado, mock acelerado):
+                # sin solape con la última vela cacheada habría un hueco → descarga completa
+                if tail.index[0] <= cached.index[-1]:
+                    df = pd.concat([cached, tail])
+                    df = df[~df.index.duplicated(keep="last")].iloc[-max(limit, len(cached)):]
+            if df is None:
+                df = self.fetch(symbol, interval, limit)
+                self.full_fetches += 1
+                if df.empty:
+                    return df
+            self._frames[key] = (df, now)
+            return df.iloc[-limit:]
+
+    def stats(self) -> dict:
+        return {"full_fetches": self.full_fetches, "tail_fetches": self.tail_fetches, "hits": self.hits}
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -214,47 +411,148 @@ class PublicExchangeMock:
         return rate
 
 
+mock_exchange = PublicExchangeMock()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ESTRATEGIAS
+# ─────────────────────────────────────────────────────────────────────────────
+
+# (signal, entrada, SL, TP, vela de entrada) o None
+Entry = tuple[str, float, float, float, pd.Timestamp]
+
+
+@dataclass(frozen=True)
+class PaperStrategy:
+    name:     str
+    interval: str
+    limit:    int
+    evaluate: Callable[[pd.DataFrame, str], Entry | None]
+    note:     str = "PAPER"
+    intrabar: bool = False   # Lee la vela en curso → se evalúa cada ciclo, no una vez por vela
+
+
+def ema_rsi_entry(df: pd.DataFrame, symbol: str) -> Entry | None:
+    """EMA 9/20 + RSI + ADX + Funding Rate: entrada al cierre de la última vela cerrada."""
+    signal = check_signal(df, symbol, exchange=mock_exchange)
+    if signal is None:
+        return None
+    data = get_last_signal_data(add_indicators(df))
+    entry_price = data["close"]
+    sl_price, tp_price = calc_sl_tp(entry_price, data["atr"], signal, symbol)
+    return signal, entry_price, sl_price, tp_price, df.index[-2]
+
+
+def asian_breakout_entry(df: pd.DataFrame, symbol: str) -> Entry | None:
+    """XAUUSDT → Asian Range Breakout (15m): entrada al precio actual."""
+    signal, sl_price, tp_price = check_signal_xau(df, symbol)
+    if not signal or sl_price <= 0:
+        return None
+    return signal, float(df["close"].iloc[-1]), sl_price, tp_price, df.index[-1]
+
+
+def strategies_for(symbol: str, interval: str) -> list[PaperStrategy]:
+    """Estrategias que corren en paralelo sobre un par (cada una con su posición)."""
+    if symbol == XAU_SYMBOL:
+        return [PaperStrategy("XAU-ARB", XAU_INTERVAL, XAU_LIMIT, asian_breakout_entry,
+                              note="PAPER-XAU-ARB", intrabar=True),
+                PaperStrategy(DEFAULT_STRATEGY, interval, config.KLINES_LIMIT, ema_rsi_entry, note="PAPER-XAU-EMA")]
+    return [PaperStrategy(DEFAULT_STRATEGY, interval, config.KLINES_LIMIT, ema_rsi_entry)]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # LOGGER CSV DE TRADES
 # ─────────────────────────────────────────────────────────────────────────────
 
-PAPER_LOG_FILE = "paper_trades.csv"
-STATE_FILE     = "bot_state.json"
+PAPER_LOG_FILE     = "paper_trades.csv"
+STATE_FILE         = "bot_state.json"
+STATE_HISTORY_FILE = "bot_state_history.json"   # Campos cold (estadísticas por estrategia)
+CSV_COLUMNS = ["opened_at", "closed_at", "symbol", "side", "entry", "exit", "qty", "pnl", "result", "strategy"]
+_csv_lock = threading.Lock()
+
 
 def _save_trade_csv(trade: TradeResult):
-    file_exists = os.path.exists(PAPER_LOG_FILE)
-    with open(PAPER_LOG_FILE, "a", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["opened_at", "closed_at", "symbol", "side",
-                             "entry", "exit", "qty", "pnl", "result"])
-        writer.writerow([
-            trade.opened_at, trade.closed_at, trade.symbol, trade.side,
-            trade.entry_price, trade.exit_price, trade.qty, trade.pnl, trade.result
-        ])
-
-def _save_state_json(portfolio: PaperPortfolio):
-    """Escribe el estado del bot en JSON para que el dashboard lo lea."""
-    positions_data = {
-        sym: {
-            "side":        pos.side,
-            "entry_price": pos.entry_price,
-            "qty":         pos.qty,
-            "stop_loss":   pos.stop_loss,
-            "take_profit": pos.take_profit,
-            "opened_at":   pos.opened_at,
-        }
-        for sym, pos in portfolio.positions.items()
+    row = {
+        "opened_at": trade.opened_at, "closed_at": trade.closed_at, "symbol": trade.symbol,
+        "side": trade.side, "entry": trade.entry_price, "exit": trade.exit_price,
+        "qty": trade.qty, "pnl": trade.pnl, "result": trade.result, "strategy": trade.strategy,
     }
-    state = {
-        "balance":         round(portfolio.balance, 4),
-        "initial_capital": round(portfolio.initial_capital, 4),
-        "positions":       positions_data,
-        "running":         True,
-        "last_update":     datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f, indent=2)
+    with _csv_lock:
+        columns = CSV_COLUMNS
+        if os.path.exists(PAPER_LOG_FILE):
+            with open(PAPER_LOG_FILE, "r", newline="") as f:
+                header = next(csv.reader(f), None)
+            if header:
+                columns = header   # CSV antiguo sin "strategy": se respeta su cabecera
+        file_exists = os.path.exists(PAPER_LOG_FILE)
+        with open(PAPER_LOG_FILE, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MOTOR
+# ─────────────────────────────────────────────────────────────────────────────
+
+class PaperEngine:
+    """Una tarea por par en cada ciclo; todas comparten caché de velas y portfolio."""
+
+    def __init__(self, symbols: list[str], interval: str, portfolio: PaperPortfolio,
+                 cache: MarketDataCache | None = None, workers: int = PAPER_WORKERS):
+        self.symbols = symbols
+        self.portfolio = portfolio
+        self.cache = cache or MarketDataCache()
+        self.strategies = {s: strategies_for(s, interval) for s in symbols}
+        self._evaluated: dict[tuple[str, str], pd.Timestamp] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(symbols))),
+                                        thread_name_prefix="paper")
+
+    def run_symbol(self, symbol: str):
+        for strat in self.strategies[symbol]:
+            df = self.cache.get(symbol, strat.interval, strat.limit)
+            if df.empty:
+                continue
+
+            # ── 1. Mark-to-market y SL/TP ─────────────────────────────────
+            if self.portfolio.has_position(symbol, strat.name):
+                trade = self.portfolio.mark_to_market(symbol, strat.name, df)
+                if trade:
+                    _save_trade_csv(trade)
+                continue  # No buscar nueva señal si había posición
+
+            # ── 2. Señal: una evaluación por vela (intrabar: cada ciclo) ──
+            key = (symbol, strat.name)
+            if not strat.intrabar:
+                if self._evaluated.get(key) == df.index[-1]:
+                    continue
+                self._evaluated[key] = df.index[-1]
+            entry = strat.evaluate(df, symbol)
+            if entry is None:
+                continue
+            signal, entry_price, sl_price, tp_price, entry_bar = entry
+            qty = calc_position_size(self.portfolio.balance, entry_price, sl_price, symbol)
+            if qty <= 0:
+                logger.warning(f"{symbol} ({strat.name}): Cantidad calculada inválida. Saltando.")
+                continue
+            bar = df.loc[entry_bar]
+            self.portfolio.open_position(symbol, signal, entry_price, qty, sl_price, tp_price,
+                                         strategy=strat.name, opened_bar=entry_bar,
+                                         bar_high=float(bar["high"]), bar_low=float(bar["low"]))
+            logger.log_trade(symbol, signal, entry_price, sl_price, tp_price, qty, note=strat.note)
+
+    def _safe_run_symbol(self, symbol: str):
+        try:
+            self.run_symbol(symbol)
+        except Exception as e:
+            logger.error(f"[PAPER] {symbol}: error en la tarea del par: {e}")
+
+    def run_cycle(self):
+        list(self._pool.map(self._safe_run_symbol, self.symbols))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -273,8 +571,9 @@ def run_paper_trading(symbols: list[str], interval: str,
         initial_capital: Capital virtual inicial en USDT
         check_seconds:  Segundos entre cada ciclo
     """
-    portfolio    = PaperPortfolio(initial_capital)
-    mock_exchange = PublicExchangeMock()
+    portfolio = PaperPortfolio(initial_capital, StateStore(STATE_FILE, STATE_HISTORY_FILE,
+                                                           cold_keys=("strategies",)))
+    engine = PaperEngine(symbols, interval, portfolio)
 
     logger.info("🤖 PAPER TRADING INICIADO (API pública, sin auth)")
     logger.info(f"   Pares:           {', '.join(symbols)}")
@@ -284,99 +583,26 @@ def run_paper_trading(symbols: list[str], interval: str,
     logger.info(f"   Trades → CSV:    {PAPER_LOG_FILE}")
     logger.info("   Presiona Ctrl+C para detener y ver resumen.\n")
 
+    portfolio.flush(force=True)
     try:
         while True:
             ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-            logger.info(f"─── Ciclo {ts} UTC | Balance: ${portfolio.balance:.2f} USDT ───")
+            logger.info(f"─── Ciclo {ts} UTC | Balance: ${portfolio.balance:.2f} USDT | "
+                        f"Equity: ${portfolio.equity():.2f} USDT ───")
 
-            for symbol in symbols:
-                # ── 1. Descargar velas ────────────────────────────────────
-                df = get_klines_public(symbol, interval, limit=config.KLINES_LIMIT)
-                if df.empty:
-                    continue
+            t0 = time.perf_counter()
+            engine.run_cycle()
+            logger.debug(f"[PAPER] Ciclo en {time.perf_counter() - t0:.2f}s | velas {engine.cache.stats()}")
 
-                # ── 2. Verificar si SL/TP fue alcanzado ───────────────────
-                if portfolio.has_position(symbol) and len(df) >= 2:
-                    last_row = df.iloc[-2]  # Última vela cerrada
-                    trade = portfolio.check_and_close(
-                        symbol,
-                        current_high=float(last_row["high"]),
-                        current_low=float(last_row["low"]),
-                    )
-                    if trade:
-                        _save_trade_csv(trade)
-                    continue  # No buscar nueva señal si había posición
-
-                # ── 3. Detectar señal (estrategia según el par) ───────────────
-                if portfolio.has_position(symbol):
-                    continue  # Ya tiene posición, no abrir otra
-
-                if symbol == XAU_SYMBOL:
-                    # ═══════════════════════════════════════════════════════
-                    # XAUUSDT → ASIAN RANGE BREAKOUT (82% win rate backtest)
-                    # Siempre usa 15m para tener resolución de sesión
-                    # ═══════════════════════════════════════════════════════
-                    df_xau = get_klines_public(symbol, XAU_INTERVAL, limit=50)
-                    if df_xau.empty:
-                        continue
-                    signal, sl_price, tp_price = check_signal_xau(df_xau, symbol)
-                    
-                    if signal:
-                        # 📈 Estrategia 1: ASIAN BREAKOUT (Mañana London)
-                        entry_price = float(df_xau["close"].iloc[-1])
-                        qty = calc_position_size(portfolio.balance, entry_price, sl_price, symbol)
-                        if qty > 0 and sl_price > 0:
-                            portfolio.open_position(symbol, signal, entry_price, qty, sl_price, tp_price)
-                            logger.log_trade(symbol, signal, entry_price, sl_price, tp_price, qty, note="PAPER-XAU-ARB")
-                            continue
-
-                    # 📉 Estrategia 2: EMA/RSI Fallback (Si no hay rotura o es otra hora)
-                    # Usamos el dataframe estándar (df) que puede ser 5m, 15m, etc.
-                    signal = check_signal(df, symbol, exchange=mock_exchange)
-                    if signal:
-                        df_ind = add_indicators(df)
-                        data   = get_last_signal_data(df_ind)
-                        entry_price = data["close"]
-                        atr         = data["atr"]
-                        sl_price, tp_price = calc_sl_tp(entry_price, atr, signal, symbol)
-                        qty = calc_position_size(portfolio.balance, entry_price, sl_price, symbol)
-                        
-                        if qty > 0:
-                            portfolio.open_position(symbol, signal, entry_price, qty, sl_price, tp_price)
-                            logger.log_trade(symbol, signal, entry_price, sl_price, tp_price, qty, note="PAPER-XAU-EMA")
-
-                else:
-                    # ═══════════════════════════════════════════════════════
-                    # Resto de pares → EMA 9/20 + RSI + ADX + Funding Rate
-                    # ═══════════════════════════════════════════════════════
-                    signal = check_signal(df, symbol, exchange=mock_exchange)
-                    if signal is None:
-                        continue
-
-                    df_ind = add_indicators(df)
-                    data   = get_last_signal_data(df_ind)
-                    entry_price = data["close"]
-                    atr         = data["atr"]
-
-                    sl_price, tp_price = calc_sl_tp(entry_price, atr, signal, symbol)
-                    qty = calc_position_size(portfolio.balance, entry_price, sl_price, symbol)
-
-                    if qty <= 0:
-                        logger.warning(f"{symbol}: Cantidad calculada inválida. Saltando.")
-                        continue
-
-                    portfolio.open_position(symbol, signal, entry_price, qty, sl_price, tp_price)
-                    logger.log_trade(symbol, signal, entry_price, sl_price, tp_price, qty, note="PAPER")
-
-                time.sleep(0.3)  # Pausa entre pares
-
-            # ── Guardar estado para el dashboard ──────────────────────
-            _save_state_json(portfolio)
+            # ── Guardar estado para el dashboard (solo si cambió) ─────
+            portfolio.flush()
 
             time.sleep(check_seconds)
 
     except KeyboardInterrupt:
         logger.info("\n🛑 Paper trading detenido por el usuario.")
+        engine.shutdown()
+        portfolio.flush(force=True, running=False)
         portfolio.print_summary()
         print(f"\n📄 Trades guardados en: {PAPER_LOG_FILE}")
 
@@ -0,0 +1,82 @@
+"""
+regime_cache.py — Caché del régimen macro D1 (SMA200 / SMA50 / SMA10 / ATR14)
+==============================================================================
+TREND_MOMENTUM_D1 y HYBRID_D1_ICT recalculaban rolling(200/50/10) y el ATR
+sobre 250 velas D1 en cada evaluación, aunque solo cambia la vela en curso.
+
+DailyRegimeCache guarda, por símbolo, las sumas de las velas D1 YA CERRADAS
+(199 / 49 / 9 cierres y 13 true ranges). En cada llamada solo se añade la vela
+en curso en O(1). Las sumas se reconstruyen cuando cierra una vela nueva, y
+snapshot()/restore() las conservan entre reinicios (warm start).
+
+El resultado coincide con df.rolling(n).mean().iloc[-1] y _atr(...).iloc[-1].
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+SMA_LENGTHS = (200, 50, 10)
+ATR_LENGTH = 14
+
+
+class DailyRegimeCache:
+    """símbolo → sumas de las velas D1 cerradas + cierre previo."""
+
+    def __init__(self):
+        self._data: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, df_d1: pd.DataFrame) -> dict | None:
+        closed = df_d1.iloc[:-1]
+        closes = closed["close"].to_numpy(dtype=float)
+        highs = closed["high"].to_numpy(dtype=float)
+        lows = closed["low"].to_numpy(dtype=float)
+        if len(closes) < max(SMA_LENGTHS[0], ATR_LENGTH + 1):
+            return None
+        prev = closes[:-1]
+        tr = np.maximum.reduce([highs[1:] - lows[1:],
+                                np.abs(highs[1:] - prev),
+                                np.abs(lows[1:] - prev)])
+        entry = {
+            "closed_time": closed.index[-1],
+            "prev_close": float(closes[-1]),
+            "tr_sum": float(tr[-(ATR_LENGTH - 1):].sum()),
+        }
+        for n in SMA_LENGTHS:
+            entry[f"sum{n}"] = float(closes[-(n - 1):].sum())
+        if any(np.isnan(v) for k, v in entry.items() if k != "closed_time"):
+            return None
+        return entry
+
+    def get(self, symbol: str, df_d1: pd.DataFrame) -> dict | None:
+        """{close, sma200, sma50, sma10, atr_d1} con la vela D1 en curso; None si faltan datos."""
+        if len(df_d1) < 2:
+            return None
+        closed_time = df_d1.index[-2]
+        with self._lock:
+            entry = self._data.get(symbol)
+        if entry is None or entry["closed_time"] != closed_time:
+            entry = self._build(df_d1)
+            if entry is None:
+                return None
+            with self._lock:
+                self._data[symbol] = entry
+
+        last = df_d1.iloc[-1]
+        close, high, low = float(last["close"]), float(last["high"]), float(last["low"])
+        pc = entry["prev_close"]
+        tr_now = max(high - low, abs(high - pc), abs(low - pc))
+        out = {"close": close, "atr_d1": (entry["tr_sum"] + tr_now) / ATR_LENGTH}
+        for n in SMA_LENGTHS:
+            out[f"sma{n}"] = (entry[f"sum{n}"] + close) / n
+        return out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._data)
+
+    def restore(self, data: dict):
+        with self._lock:
+            self._data.update(data)
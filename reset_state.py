@@ -11,6 +11,7 @@ USO: python reset_state.py
 import json, os
 
 STATE_FILE = "bot_state_mt5_v5.json"
+STATE_HISTORY_FILE = "bot_state_mt5_v5_history.json"  # Campos cold (trade_history, _saved_tickets)
 STARTING_BALANCE = 25000.0  # Tu balance inicial del reto
 
 fresh_state = {
@@ -35,5 +36,10 @@ fresh_state = {
 with open(STATE_FILE, "w") as f:
     json.dump(fresh_state, f, indent=2)
 
+# El bot mezcla el archivo cold con el hot al cargar: sin borrarlo, el
+# historial y los tickets guardados sobrevivirían al reset
+if os.path.exists(STATE_HISTORY_FILE):
+    os.remove(STATE_HISTORY_FILE)
+
 print(f"\n[OK] Estado reseteado. Balance inicial: ${STARTING_BALANCE:,.0f}")
 print("     Ahora abre el watchdog.bat\n")
@@ -0,0 +1,295 @@
+"""
+rest_scheduler.py — Planificador de peticiones REST según el peso de Binance
+============================================================================
+bot.py, paper_trade.py y dashboard.py crean cada uno su Client y consumen el
+mismo límite de peso POR IP (2400/min en Futures) sin saber lo que gastan los
+demás. Una ráfaga del dashboard (get_signal_proximity: 200 velas por par en
+cada petición HTTP) podía provocar un 429 y, si se insiste, un baneo 418 que
+también tumba las órdenes del bot.
+
+install(client, prioridad) intercepta Client._request:
+  ⚖️  Coste por endpoint (ENDPOINT_WEIGHTS; klines según `limit`, sin
+      símbolo = coste de "todos los pares").
+  📡 El peso real usado por la IP llega en X-MBX-USED-WEIGHT-1M y se
+      comparte entre procesos en WEIGHT_FILE (escritura atómica).
+  🚦 Cada prioridad puede usar solo una fracción del límite (BUDGET_SHARE):
+       ORDER      órdenes / cancelaciones → siempre pasan (salvo baneo)
+       TRADING    cuenta, posiciones, klines del bot → esperan al minuto siguiente
+       DATA       paper trading → esperan al minuto siguiente
+       DASHBOARD  lecturas del dashboard → se descartan (RateLimitError)
+     Mientras hay peticiones de mayor prioridad en espera, las de menor
+     prioridad no adelantan.
+  ⛔ 429 / 418 con Retry-After → pausa compartida por todos los procesos.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import logger
+
+WEIGHT_LIMIT = int(os.getenv("BINANCE_WEIGHT_LIMIT", 2400))   # Peso por minuto (Futures, por IP)
+WEIGHT_FILE = os.getenv("BINANCE_WEIGHT_FILE", "binance_weight.json")
+MAX_QUEUE_SECS = 65       # Espera máxima de una petición encolada
+SHARED_WRITE_SECS = 1.0   # Frecuencia máxima de escritura del archivo compartido...
+SHARED_WRITE_STEP = 0.05  # ...salvo que el peso haya subido un 5% del límite desde la última
+
+# Prioridades (menor = más importante)
+ORDER, TRADING, DATA, DASHBOARD = 0, 1, 2, 3
+PRIORITY_NAMES = {ORDER: "ORDER", TRADING: "TRADING", DATA: "DATA", DASHBOARD: "DASHBOARD"}
+
+# Fracción del límite que puede ocupar cada prioridad
+BUDGET_SHARE = {ORDER: 1.00, TRADING: 0.85, DATA: 0.70, DASHBOARD: 0.50}
+SHED = {DASHBOARD}        # Prioridades que se descartan en vez de esperar
+
+# (método, path) → peso. Los que dependen de parámetros se calculan en endpoint_cost
+ENDPOINT_WEIGHTS = {
+    ("GET",    "/fapi/v1/ping"):                1,
+    ("GET",    "/fapi/v1/time"):                1,
+    ("GET",    "/fapi/v1/exchangeInfo"):        1,
+    ("GET",    "/fapi/v1/fundingRate"):         1,
+    ("POST",   "/fapi/v1/order"):               1,
+    ("DELETE", "/fapi/v1/order"):               1,
+    ("POST",   "/fapi/v1/batchOrders"):         5,
+    ("DELETE", "/fapi/v1/allOpenOrders"):       1,
+    ("GET",    "/fapi/v1/openOrders"):          1,    # 40 sin símbolo
+    ("POST",   "/fapi/v1/leverage"):            1,
+    ("POST",   "/fapi/v1/marginType"):          1,
+    ("GET",    "/fapi/v2/balance"):             5,
+    ("GET",    "/fapi/v2/account"):             5,
+    ("GET",    "/fapi/v2/positionRisk"):        5,
+    ("GET",    "/fapi/v1/userTrades"):          5,
+    ("POST",   "/fapi/v1/listenKey"):           1,
+    ("PUT",    "/fapi/v1/listenKey"):           1,
+    ("DELETE", "/fapi/v1/listenKey"):           1,
+}
+# Sin `symbol` estos endpoints devuelven todos los pares y pesan más
+ALL_SYMBOLS_WEIGHTS = {
+    "/fapi/v1/premiumIndex":   10,
+    "/fapi/v1/ticker/price":   2,
+    "/fapi/v2/ticker/price":   2,
+    "/fapi/v1/ticker/24hr":    40,
+    "/fapi/v1/openOrders":     40,
+}
+ORDER_PATHS = {"/fapi/v1/order", "/fapi/v1/batchOrders", "/fapi/v1/allOpenOrders"}
+
+
+class RateLimitError(Exception):
+    """Petición descartada o bloqueada por el planificador (presupuesto / baneo)."""
+
+
+def _klines_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def endpoint_cost(method: str, path: str, params: dict | None = None) -> int:
+    params = params or {}
+    if path.endswith(("/klines", "/continuousKlines", "/markPriceKlines", "/indexPriceKlines")):
+        return _klines_weight(int(params.get("limit", 500)))
+    if path in ALL_SYMBOLS_WEIGHTS and "symbol" not in params:
+        return ALL_SYMBOLS_WEIGHTS[path]
+    return ENDPOINT_WEIGHTS.get((method.upper(), path), 1)
+
+
+def classify(method: str, path: str, default: int) -> int:
+    """Las órdenes siempre van con prioridad ORDER, sea cual sea el cliente."""
+    if method.upper() in ("POST", "DELETE") and path in ORDER_PATHS:
+        return ORDER
+    return default
+
+
+class WeightScheduler:
+    """Contabilidad del peso por minuto compartida entre hilos (y procesos vía archivo)."""
+
+    def __init__(self, limit: int = WEIGHT_LIMIT, shared_file: str | None = WEIGHT_FILE):
+        self.limit = limit
+        self.shared_file = shared_file
+        self._cond = threading.Condition()
+        self._minute = self._current_minute()
+        self._used = 0              # Peso usado por la IP en el minuto actual
+        self._pending = 0           # Peso reservado por peticiones en vuelo de este proceso
+        self._banned_until = 0.0
+        self._waiting = {p: 0 for p in PRIORITY_NAMES}
+        self._shared_mtime = None
+        self._last_write = 0.0
+        self._written_used = 0
+        self.shed = 0
+        self.queued = 0
+
+    @staticmethod
+    def _current_minute() -> int:
+        return int(time.time() // 60)
+
+    # ── Estado compartido entre procesos ─────────────────────────────────
+    def _read_shared(self):
+        if not self.shared_file:
+            return
+        try:
+            mtime = os.stat(self.shared_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._shared_mtime:
+            return
+        self._shared_mtime = mtime
+        try:
+            with open(self.shared_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("minute") == self._minute:
+            self._used = max(self._used, int(data.get("used", 0)))
+        self._banned_until = max(self._banned_until, float(data.get("banned_until", 0)))
+
+    def _write_shared(self, force: bool = False):
+        if not self.shared_file:
+            return
+        now = time.time()
+        grew = self._used - self._written_used >= self.limit * SHARED_WRITE_STEP
+        if not (force or grew) and now - self._last_write < SHARED_WRITE_SECS:
+            return
+        self._last_write = now
+        self._written_used = self._used
+        tmp = f"{self.shared_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"minute": self._minute, "used": self._used,
+                           "banned_until": self._banned_until, "pid": os.getpid()}, f)
+            os.replace(tmp, self.shared_file)
+            self._shared_mtime = os.stat(self.shared_file).st_mtime_ns
+        except OSError:
+            pass
+
+    def _roll(self):
+        minute = self._current_minute()
+        if minute != self._minute:
+            self._minute = minute
+            self._used = 0
+            self._written_used = 0
+            self._cond.notify_all()
+
+    # ── Reserva / liberación ─────────────────────────────────────────────
+    def _allowed(self, cost: int, priority: int) -> bool:
+        if priority != ORDER and any(self._waiting[p] for p in PRIORITY_NAMES if p < priority):
+            return False
+        budget = self.limit * BUDGET_SHARE[priority]
+        return self._used + self._pending + cost <= budget
+
+    def acquire(self, cost: int, priority: int):
+        deadline = time.time() + MAX_QUEUE_SECS
+        with self._cond:
+            waited = False
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    self._roll()
+                    self._read_shared()
+                    now = time.time()
+                    if now < self._banned_until:
+                        raise RateLimitError(f"IP bloqueada por Binance hasta {time.strftime('%H:%M:%S', time.localtime(self._banned_until))}")
+                    if priority == ORDER or self._allowed(cost, priority):
+                        break
+                    if priority in SHED:
+                        self.shed += 1
+                        raise RateLimitError(
+                            f"Peso {self._used + self._pending}/{self.limit}: petición {PRIORITY_NAMES[priority]} descartada")
+                    if now >= deadline:
+                        raise RateLimitError(f"Peso {self._used}/{self.limit}: tiempo de espera agotado")
+                    if not waited:
+                        waited = True
+                        self.queued += 1
+                        logger.warning(f"⚖️ Peso REST {self._used}/{self.limit}: petición "
+                                       f"{PRIORITY_NAMES[priority]} en cola hasta el próximo minuto")
+                    next_minute = (self._minute + 1) * 60
+                    self._cond.wait(timeout=max(0.05, min(next_minute - now, deadline - now, 1.0)))
+            finally:
+                self._waiting[priority] -= 1
+            self._pending += cost
+
+    def release(self, cost: int):
+        with self._cond:
+            self._pending -= cost
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, cost: int, priority: int):
+        self.acquire(cost, priority)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+    # ── Respuestas ───────────────────────────────────────────────────────
+    def observe(self, status: int | None, headers, cost: int):
+        """Actualiza el peso usado con las cabeceras de la respuesta (o con el coste estimado)."""
+        with self._cond:
+            self._roll()
+            used = headers.get("X-MBX-USED-WEIGHT-1M") if headers is not None else None
+            if used is not None:
+                self._used = int(used)
+            else:
+                self._used += cost
+            force = False
+            if status in (418, 429):
+                retry_after = headers.get("Retry-After") if headers is not None else None
+                pause = float(retry_after) if retry_after else 60.0
+                self._banned_until = max(self._banned_until, time.time() + pause)
+                force = True
+                logger.error(f"⛔ Binance respondió {status}: peticiones REST en pausa {pause:.0f}s")
+            self._write_shared(force=force)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._roll()
+            return {
+                "used_weight": self._used,
+                "limit": self.limit,
+                "pending": self._pending,
+                "banned_until": self._banned_until if self._banned_until > time.time() else None,
+                "queued": self.queued,
+                "shed": self.shed,
+            }
+
+
+# Instancia por proceso; el estado se comparte entre procesos vía WEIGHT_FILE
+SCHEDULER = WeightScheduler()
+
+
+def install(client, priority: int = TRADING, scheduler: WeightScheduler | None = None):
+    """Hace que todas las peticiones REST de `client` pasen por el planificador."""
+    sched = scheduler or SCHEDULER
+    original_request = client._request
+    original_handle = client._handle_response
+    local = threading.local()   # Coste de la petición en curso de ESTE hilo
+
+    def _handle_response(response):
+        # Recibe la respuesta de cada llamada: no depende de client.response,
+        # que comparten todos los hilos que usan el mismo Client
+        local.observed = True
+        sched.observe(response.status_code, response.headers, local.cost)
+        return original_handle(response)
+
+    def _request(method, uri, signed, force_params=False, **kwargs):
+        path = urlparse(uri).path
+        params = kwargs.get("data") or kwargs.get("params") or {}
+        cost = endpoint_cost(method, path, params if isinstance(params, dict) else {})
+        with sched.slot(cost, classify(method, path, priority)):
+            local.cost, local.observed = cost, False
+            try:
+                return original_request(method, uri, signed, force_params, **kwargs)
+            finally:
+                if not local.observed:   # Error de red: sin cabeceras, contar el coste estimado
+                    sched.observe(None, None, cost)
+
+    client._handle_response = _handle_response
+    client._request = _request
+    return client
@@ -0,0 +1,277 @@
+"""
+scanner.py — Escáner de todo el universo de perpetuos USDT-M
+=============================================================
+config.SYMBOLS estaba fijado a cuatro pares porque evaluar más con REST en
+serie + pandas por par era demasiado lento.
+
+UniverseScanner.scan():
+  1. Universo: exchangeInfo (perpetuos USDT en TRADING) filtrado por volumen
+     24h (ticker sin símbolo, una sola petición). Se refresca cada hora.
+  2. Velas: SCAN_BARS (= config.KLINES_LIMIT, peso 2) por par, en paralelo y
+     con prioridad DATA en el planificador de peso REST. Parseo con kline_parser.
+  3. Indicadores como lote 2-D (símbolos × velas) con NumPy: EMA 9/20,
+     RSI 14, ADX 14, ATR 14 y media de volumen; mismas fórmulas que
+     pandas_ta (EMA con semilla SMA, RMA = ewm(alpha=1/n)).
+  4. Mismos filtros que strategy.check_signal sobre la última vela CERRADA
+     (cruce EMA + RSI + ADX + volumen, umbrales por par de config) y ranking
+     por fuerza: ADX × ratio de volumen.
+
+Solo se escanea una vez por vela: entre cierres se devuelven los candidatos
+cacheados. run_cycle vuelve a confirmar cada candidato con check_signal
+(funding, horario del oro...) antes de operar.
+
+Uso:
+    python bot.py --scan --dry-run
+    python scanner.py                  # escaneo único, imprime el ranking
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config
+import logger
+import rest_scheduler
+from kline_parser import parse_klines
+
+# Misma ventana que bot.py/check_signal: EMA/RSI/ADX dependen de la semilla y de
+# la historia, con menos velas el pre-filtro divergiría de la confirmación
+SCAN_BARS = config.KLINES_LIMIT
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", 8))
+SCAN_MIN_QUOTE_VOLUME = float(os.getenv("SCAN_MIN_QUOTE_VOLUME", 20_000_000))   # USDT en 24h
+SCAN_TOP_N = int(os.getenv("SCAN_TOP_N", 10))
+UNIVERSE_TTL_SECS = 3600
+VOLUME_FACTOR = 0.8                  # Igual que check_signal: volumen >= 80% de la media
+
+INTERVAL_SECS = {"1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600,
+                 "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800, "12h": 43200, "1d": 86400}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# INDICADORES 2-D (filas = símbolos, columnas = velas)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def ema_2d(x: np.ndarray, length: int) -> np.ndarray:
+    """EMA de pandas_ta: semilla = SMA de las primeras `length` velas, luego ewm(adjust=False)."""
+    out = np.full_like(x, np.nan)
+    if x.shape[1] < length:
+        return out
+    alpha = 2.0 / (length + 1)
+    out[:, length - 1] = x[:, :length].mean(axis=1)
+    for t in range(length, x.shape[1]):
+        out[:, t] = alpha * x[:, t] + (1 - alpha) * out[:, t - 1]
+    return out
+
+
+def rma_2d(x: np.ndarray, length: int) -> np.ndarray:
+    """RMA de pandas_ta: ewm(alpha=1/length, min_periods=length, adjust=True). NaN iniciales ignorados."""
+    alpha = 1.0 / length
+    decay = 1 - alpha
+    n, t_len = x.shape
+    num = np.zeros(n)
+    den = np.zeros(n)
+    count = np.zeros(n, dtype=int)
+    out = np.full_like(x, np.nan)
+    for t in range(t_len):
+        v = x[:, t]
+        valid = ~np.isnan(v)
+        num = decay * num + np.where(valid, v, 0.0)
+        den = decay * den + valid
+        count += valid
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, t] = np.where(count >= length, num / den, np.nan)
+    return out
+
+
+def rsi_2d(close: np.ndarray, length: int) -> np.ndarray:
+    diff = np.full_like(close, np.nan)
+    diff[:, 1:] = np.diff(close, axis=1)
+    gain = rma_2d(np.where(np.isnan(diff), np.nan, np.clip(diff, 0, None)), length)
+    loss = rma_2d(np.where(np.isnan(diff), np.nan, np.clip(-diff, 0, None)), length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 * gain / (gain + loss)
+
+
+def true_range_2d(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    tr = np.full_like(close, np.nan)
+    prev = close[:, :-1]
+    tr[:, 1:] = np.maximum.reduce([high[:, 1:] - low[:, 1:],
+                                   np.abs(high[:, 1:] - prev),
+                                   np.abs(low[:, 1:] - prev)])
+    return tr
+
+
+def adx_2d(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> tuple[np.ndarray, np.ndarray]:
+    """(adx, atr) con las fórmulas de pandas_ta.adx / pandas_ta.atr (mamode rma)."""
+    atr = rma_2d(true_range_2d(high, low, close), length)
+    up = np.full_like(high, np.nan)
+    dn = np.full_like(low, np.nan)
+    up[:, 1:] = high[:, 1:] - high[:, :-1]
+    dn[:, 1:] = low[:, :-1] - low[:, 1:]
+    pos = np.where((up > dn) & (up > 0), up, 0.0)
+    neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    pos[:, 0] = neg[:, 0] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = 100 / atr
+        dmp = k * rma_2d(pos, length)
+        dmn = k * rma_2d(neg, length)
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return rma_2d(dx, length), atr
+
+
+def compute_signals(high, low, close, volume, rsi_long, rsi_short, adx_min) -> dict:
+    """
+    Señales de la última vela CERRADA (columna -2) para todos los símbolos a la vez.
+    rsi_long / rsi_short / adx_min: arrays (N,) con los umbrales de cada par.
+    """
+    ema_fast = ema_2d(close, config.EMA_FAST)
+    ema_slow = ema_2d(close, config.EMA_SLOW)
+    rsi = rsi_2d(close, config.RSI_PERIOD)
+    adx, atr = adx_2d(high, low, close, config.ADX_PERIOD)
+    vol_ma = np.full_like(volume, np.nan)
+    w = config.VOL_MA_PERIOD
+    if volume.shape[1] >= w:
+        csum = np.cumsum(volume, axis=1)
+        vol_ma[:, w - 1] = csum[:, w - 1] / w
+        vol_ma[:, w:] = (csum[:, w:] - csum[:, :-w]) / w
+
+    i = -2   # Última vela cerrada (la -1 está en curso)
+    above = ema_fast > ema_slow
+    cross = above[:, i].astype(int) - above[:, i - 1].astype(int)
+    valid = ~np.isnan(ema_slow[:, i - 1]) & ~np.isnan(adx[:, i]) & ~np.isnan(rsi[:, i]) & ~np.isnan(vol_ma[:, i])
+    trend = valid & (adx[:, i] >= adx_min) & (volume[:, i] >= vol_ma[:, i] * VOLUME_FACTOR)
+    long_ = trend & (cross == 1) & (rsi[:, i] > rsi_long)
+    short = trend & (cross == -1) & (rsi[:, i] < rsi_short)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vol_ratio = volume[:, i] / vol_ma[:, i]
+    return {
+        "long": long_, "short": short, "ema_cross": cross,
+        "rsi": rsi[:, i], "adx": adx[:, i], "atr": atr[:, i],
+        "close": close[:, i], "vol_ratio": vol_ratio,
+        "score": np.where(long_ | short, adx[:, i] * np.minimum(vol_ratio, 3.0), 0.0),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ESCÁNER
+# ─────────────────────────────────────────────────────────────────────────────
+
+class UniverseScanner:
+    """Escaneo vectorizado de todos los perpetuos USDT-M, una vez por vela cerrada."""
+
+    def __init__(self, interval: str = config.TIMEFRAME, client=None,
+                 min_quote_volume: float = SCAN_MIN_QUOTE_VOLUME, workers: int = SCAN_WORKERS):
+        self.interval = interval
+        self.bar_secs = INTERVAL_SECS[interval]
+        self.min_quote_volume = min_quote_volume
+        self.workers = workers
+        self._client = client
+        self._lock = threading.Lock()
+        self._universe: list[str] = []
+        self._universe_at = 0.0
+        self._last_bar = None
+        self._candidates: list[dict] = []
+        self.last_scan_secs = 0.0
+
+    @property
+    def client(self):
+        if self._client is None:
+            from binance.client import Client
+            config.use_binance_endpoint()
+            self._client = rest_scheduler.install(Client("", "", testnet=config.USE_TESTNET),
+                                                  rest_scheduler.DATA)
+        return self._client
+
+    def universe(self) -> list[str]:
+        """Perpetuos USDT en TRADING con volumen 24h >= min_quote_volume (caché 1h)."""
+        if self._universe and time.time() - self._universe_at < UNIVERSE_TTL_SECS:
+            return self._universe
+        info = self.client.futures_exchange_info()
+        perps = {s["symbol"] for s in info["symbols"]
+                 if s.get("contractType") == "PERPETUAL" and s.get("quoteAsset") == "USDT"
+                 and s.get("status") == "TRADING"}
+        tickers = self.client.futures_ticker()   # 24h de todos los pares en una petición
+        liquid = sorted(((float(t["quoteVolume"]), t["symbol"]) for t in tickers
+                         if t["symbol"] in perps and float(t["quoteVolume"]) >= self.min_quote_volume),
+                        reverse=True)
+        self._universe = [s for _, s in liquid]
+        self._universe_at = time.time()
+        logger.info(f"🌐 Universo del escáner: {len(self._universe)} perpetuos USDT "
+                    f"(de {len(perps)}, volumen 24h >= {self.min_quote_volume / 1e6:.0f}M)")
+        return self._universe
+
+    def _fetch(self, symbols: list[str]) -> tuple[list[str], dict[str, np.ndarray]]:
+        def one(symbol):
+            try:
+                return symbol, parse_klines(self.client.futures_klines(
+                    symbol=symbol, interval=self.interval, limit=SCAN_BARS))
+            except Exception as e:
+                logger.debug(f"{symbol}: escáner sin velas ({e})")
+                return symbol, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(one, symbols))
+
+        # Alinear: solo pares con la historia completa y la misma última vela
+        complete = [(s, k) for s, k in results if k is not None and len(k) == SCAN_BARS]
+        if not complete:
+            return [], {}
+        last_open = max(int(k["timestamp"][-1]) for _, k in complete)
+        complete = [(s, k) for s, k in complete if int(k["timestamp"][-1]) == last_open]
+        names = [s for s, _ in complete]
+        arrays = {f: np.vstack([k[f] for _, k in complete]) for f in ("high", "low", "close", "volume")}
+        arrays["last_open"] = last_open
+        return names, arrays
+
+    def scan(self, force: bool = False) -> list[dict]:
+        """Candidatos ordenados por score: [{symbol, signal, score, rsi, adx, atr, close, vol_ratio}]."""
+        bar = int(time.time() // self.bar_secs)
+        with self._lock:
+            if not force and bar == self._last_bar:
+                return self._candidates
+            t0 = time.perf_counter()
+            symbols = self.universe()
+            names, arrays = self._fetch(symbols)
+            if not names:
+                logger.warning("🌐 Escáner: sin datos de velas")
+                return []
+            cfgs = [config.get_symbol_config(s) for s in names]
+            sig = compute_signals(arrays["high"], arrays["low"], arrays["close"], arrays["volume"],
+                                  np.array([c["rsi_long"] for c in cfgs], dtype=float),
+                                  np.array([c["rsi_short"] for c in cfgs], dtype=float),
+                                  np.array([c["adx_min"] for c in cfgs], dtype=float))
+            candidates = []
+            for i in np.flatnonzero(sig["long"] | sig["short"]):
+                candidates.append({
+                    "symbol":    names[i],
+                    "signal":    "LONG" if sig["long"][i] else "SHORT",
+                    "score":     round(float(sig["score"][i]), 2),
+                    "rsi":       round(float(sig["rsi"][i]), 1),
+                    "adx":       round(float(sig["adx"][i]), 1),
+                    "atr":       float(sig["atr"][i]),
+                    "close":     float(sig["close"][i]),
+                    "vol_ratio": round(float(sig["vol_ratio"][i]), 2),
+                })
+            candidates.sort(key=lambda c: c["score"], reverse=True)
+            self._candidates = candidates
+            self._last_bar = bar
+            self.last_scan_secs = time.perf_counter() - t0
+        logger.info(f"🌐 Escáner: {len(names)} pares en {self.last_scan_secs:.1f}s → "
+                    f"{len(candidates)} candidatos"
+                    + (f" ({', '.join(c['symbol'] + ' ' + c['signal'] for c in candidates[:5])})" if candidates else ""))
+        return candidates
+
+    def top_symbols(self, n: int = SCAN_TOP_N) -> list[str]:
+        return [c["symbol"] for c in self.scan()[:n]]
+
+
+if __name__ == "__main__":
+    scanner = UniverseScanner()
+    ranked = scanner.scan(force=True)
+    print(f"\n🌐 {len(ranked)} candidatos en {scanner.last_scan_secs:.1f}s ({scanner.interval})")
+    for c in ranked[:SCAN_TOP_N]:
+        print(f"  {c['symbol']:<14} {c['signal']:<5}  score {c['score']:>6.1f}  "
+              f"ADX {c['adx']:>5.1f}  RSI {c['rsi']:>5.1f}  vol×{c['vol_ratio']:.2f}")
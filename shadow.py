@@ -0,0 +1,186 @@
+"""
+shadow.py — Modo sombra: N variantes de estrategia sobre el mismo feed en vivo
+===============================================================================
+El modo virtual ("live": False) solo admite UNA estrategia por símbolo y paga
+la descarga completa de velas en cada evaluación.
+
+ShadowBook evalúa variantes (otra estrategia del registro o la misma con
+parámetros distintos) sobre el BarView YA descargado para el símbolo. Una
+variante solo se evalúa en los ciclos en que se evalúa la estrategia principal
+y si sus velas están cubiertas por las que ésta ya descargó: nunca provoca
+descargas propias. Desactivado por defecto (SHADOW_ENABLED=true + variantes en
+SHADOW_VARIANTS de bot_mt5.py para activarlo):
+
+    SHADOW_VARIANTS = {
+        "XAUUSD": [
+            {"name": "TMD1_ADX25", "strategy": "TREND_MOMENTUM_D1", "adx_min": 25.0},
+            {"name": "ENSEMBLE",   "strategy": "ENSEMBLE"},
+        ],
+    }
+
+Cada variante tiene su cartera virtual (1 posición por símbolo) y estadísticas
+en state["shadow"]. Las posiciones se resuelven con VirtualEngine (ticks,
+first-touch, R-múltiplos) y cada cierre se anota en shadow_trades.csv para
+comparar candidatas A/B en condiciones reales sin carga extra en el terminal.
+"""
+
+import csv
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import logger
+import strategy_registry
+
+SHADOW_ENABLED = os.getenv("SHADOW_ENABLED", "false").lower() == "true"
+SHADOW_JOURNAL_FILE = "shadow_trades.csv"
+
+JOURNAL_FIELDS = [
+    "variant", "base_name", "symbol", "strategy", "direction",
+    "time_open", "price_open", "sl", "tp",
+    "time_close", "price_close", "exit_reason", "r", "mfe_r", "mae_r",
+]
+
+
+def variant_key(base_name: str, variant: dict) -> str:
+    return f"{base_name}:{variant['name']}"
+
+
+def variant_config(cfg: dict, variant: dict) -> dict:
+    """Config de la variante = config del símbolo + overrides (sin la clave 'name')."""
+    return {**cfg, **{k: v for k, v in variant.items() if k != "name"}}
+
+
+def _new_stats() -> dict:
+    return {"trades": 0, "wins": 0, "losses": 0, "total_r": 0.0,
+            "peak_r": 0.0, "max_dd_r": 0.0, "win_rate": 0.0, "avg_r": 0.0,
+            "open": 0, "last_trade": None}
+
+
+class ShadowBook:
+    """Carteras virtuales por variante dentro de state["shadow"]."""
+
+    def __init__(self, variants: dict, lock=None,
+                 journal_file: str = SHADOW_JOURNAL_FILE):
+        self.variants = variants          # base_name → [variant, ...]
+        self.lock = lock or threading.RLock()
+        self.journal_file = journal_file
+
+    def active_variants(self, base_name: str, cfg: dict, now: datetime,
+                        available: dict) -> list[tuple[dict, dict]]:
+        """
+        [(variant, cfg_variante)] con estrategia registrada, dentro de su ventana
+        y cuyas velas cubre `available` ({timeframe: velas} que la estrategia
+        principal descarga en este ciclo).
+        """
+        if not SHADOW_ENABLED:
+            return []
+        out = []
+        for variant in self.variants.get(base_name, []):
+            vcfg = variant_config(cfg, variant)
+            spec = strategy_registry.get(vcfg["strategy"])
+            if spec is None or not spec.in_session(now):
+                continue
+            reqs = strategy_registry.requirements(spec.name, vcfg, now)
+            if all(available.get(tf, 0) >= count for tf, count in reqs.items()):
+                out.append((variant, vcfg))
+        return out
+
+    @staticmethod
+    def _book(state: dict, key: str) -> dict:
+        # state["shadow"] se crea en load_state: aquí solo se añaden carteras bajo el lock
+        return state["shadow"].setdefault(key, {"positions": [], "stats": _new_stats()})
+
+    def evaluate(self, state: dict, symbol: str, base_name: str, bars, active: list[tuple[dict, dict]]):
+        """Evalúa las variantes sobre `bars` (sin descargas) y abre posiciones virtuales."""
+        for variant, vcfg in active:
+            key = variant_key(base_name, variant)
+            book = state["shadow"].get(key)
+            if book and any(p["symbol"] == symbol for p in book["positions"]):
+                continue
+            spec = strategy_registry.get(vcfg["strategy"])
+            try:
+                setup = spec.func(symbol, base_name, bars, vcfg)
+            except Exception as e:
+                logger.error(f"👥 [SHADOW {key}] Error evaluando: {e}")
+                continue
+            if not setup:
+                continue
+            with self.lock:
+                book = self._book(state, key)
+                book["positions"].append({
+                    "symbol": symbol,
+                    "base_name": base_name,
+                    "variant": key,
+                    "strategy": spec.name,
+                    "signal": setup.signal,
+                    "entry": setup.entry,
+                    "sl": setup.sl,
+                    "tp": setup.tp,
+                    "time": bars.now.isoformat(),
+                })
+                book["stats"]["open"] = len(book["positions"])
+            logger.info(f"👥 [SHADOW {key}] {setup.signal} {symbol} @ {setup.entry:.5f}")
+
+    def update(self, state: dict, engine):
+        """Resuelve TODAS las posiciones sombra en una sola pasada del VirtualEngine."""
+        books = state.get("shadow", {})
+        positions = [p for book in books.values() for p in book["positions"]]
+        if not positions:
+            return
+        still_open, closed = engine.update(positions)
+        with self.lock:
+            for book in books.values():
+                book["positions"] = []
+            for pos in still_open:
+                books[pos["variant"]]["positions"].append(pos)
+            for pos in closed:
+                self._record_close(books[pos["variant"]]["stats"], pos)
+            for book in books.values():
+                book["stats"]["open"] = len(book["positions"])
+        if closed:
+            self._journal(closed)
+
+    @staticmethod
+    def _record_close(stats: dict, pos: dict):
+        r = pos["r"]
+        stats["trades"] += 1
+        stats["wins" if r > 0 else "losses"] += 1
+        stats["total_r"] = round(stats["total_r"] + r, 3)
+        stats["peak_r"] = max(stats["peak_r"], stats["total_r"])
+        stats["max_dd_r"] = round(max(stats["max_dd_r"], stats["peak_r"] - stats["total_r"]), 3)
+        stats["win_rate"] = round(stats["wins"] / stats["trades"] * 100, 1)
+        stats["avg_r"] = round(stats["total_r"] / stats["trades"], 3)
+        stats["last_trade"] = {"symbol": pos["symbol"], "signal": pos["signal"],
+                               "r": r, "exit_reason": pos["exit_reason"]}
+        logger.info(f"👥 [SHADOW {pos['variant']}] {pos['symbol']} {pos['exit_reason']} "
+                    f"{r:+.2f}R | Total: {stats['total_r']:+.2f}R ({stats['trades']} trades)")
+
+    def _journal(self, closed: list[dict]):
+        file_exists = Path(self.journal_file).exists()
+        try:
+            with open(self.journal_file, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=JOURNAL_FIELDS)
+                if not file_exists:
+                    writer.writeheader()
+                for pos in closed:
+                    writer.writerow({
+                        "variant": pos["variant"],
+                        "base_name": pos["base_name"],
+                        "symbol": pos["symbol"],
+                        "strategy": pos["strategy"],
+                        "direction": pos["signal"],
+                        "time_open": pos["time"],
+                        "price_open": pos["entry"],
+                        "sl": pos["sl0"],
+                        "tp": pos["tp"],
+                        "time_close": datetime.fromtimestamp(pos["exit_ms"] / 1000, timezone.utc).isoformat(),
+                        "price_close": pos["exit_price"],
+                        "exit_reason": pos["exit_reason"],
+                        "r": pos["r"],
+                        "mfe_r": pos["mfe_r"],
+                        "mae_r": pos["mae_r"],
+                    })
+        except Exception as e:
+            logger.error(f"Error escribiendo {self.journal_file}: {e}")
@@ -0,0 +1,127 @@
+"""
+state_store.py — Persistencia atómica y diferida del estado del bot
+====================================================================
+El bot escribía el JSON de estado completo (con indent=2) varias veces por
+ciclo, y dashboard_mt5 podía leer un archivo a medio escribir.
+
+StateStore resuelve ambos problemas:
+  ⏱️ Coalescing: save_state() solo marca el estado como "sucio";
+     la escritura real ocurre una vez por ciclo (flush).
+  💾 Escritura atómica: archivo temporal + os.replace() → el lector
+     siempre ve el archivo anterior o el nuevo, nunca uno truncado.
+  🔥/🧊 Hot/Cold: los campos pequeños y frecuentes (account, prop_firm,
+     live_positions...) van al archivo principal; los voluminosos
+     (trade_history, _saved_tickets) van a un archivo aparte que solo se
+     reescribe cuando su contenido cambia.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write_json(path, data, indent: int | None = None):
+    """Escribe JSON de forma atómica (tmp en el mismo directorio + os.replace)."""
+    path = Path(path)
+    payload = json.dumps(data, indent=indent, default=str,
+                         separators=None if indent else (",", ":"))
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp",
+                               dir=str(path.parent.resolve()))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path, default=None):
+    """Lee un JSON; devuelve `default` si no existe o está corrupto."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+COLD_KEYS = ("trade_history", "_saved_tickets")
+
+
+def load_split_state(path, cold_path, cold_keys=COLD_KEYS) -> dict | None:
+    """
+    Lee el estado hot y le mezcla los campos cold (para el bot y el dashboard).
+
+    Si el archivo cold existe es la fuente de verdad de `cold_keys`: una copia
+    vieja de esos campos en el hot (p.ej. la versión del repo que restaura
+    `git checkout` en auto_update) se descarta. Sin archivo cold (estado
+    anterior al split) se conservan los del hot.
+    """
+    hot = read_json(path)
+    if hot is None:
+        return None
+    cold = read_json(cold_path)
+    if isinstance(cold, dict):
+        for k in cold_keys:
+            hot.pop(k, None)
+        hot.update(cold)
+    return hot
+
+
+class StateStore:
+    """Guarda un dict de estado separando campos hot/cold con escritura diferida."""
+
+    def __init__(self, path, cold_path, cold_keys=COLD_KEYS):
+        self.path = Path(path)
+        self.cold_path = Path(cold_path)
+        self.cold_keys = tuple(cold_keys)
+        self._dirty = False
+        self._cold_digest = None
+        self.writes_hot = 0
+        self.writes_cold = 0
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def load(self) -> dict | None:
+        state = load_split_state(self.path, self.cold_path, self.cold_keys)
+        if state is not None:
+            self._cold_digest = self._digest(self._cold_part(state))
+        return state
+
+    def _cold_part(self, state: dict) -> dict:
+        return {k: state[k] for k in self.cold_keys if k in state}
+
+    @staticmethod
+    def _digest(data: dict) -> str:
+        raw = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def write(self, state: dict, force: bool = False) -> bool:
+        """Escribe el estado si está sucio (o si force=True). Retorna True si escribió."""
+        if not (self._dirty or force):
+            return False
+
+        cold = self._cold_part(state)
+        digest = self._digest(cold)
+        if digest != self._cold_digest:
+            atomic_write_json(self.cold_path, cold)
+            self._cold_digest = digest
+            self.writes_cold += 1
+
+        hot = {k: v for k, v in state.items() if k not in self.cold_keys}
+        atomic_write_json(self.path, hot)
+        self.writes_hot += 1
+        self._dirty = False
+        return True
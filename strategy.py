@@ -43,13 +43,13 @@ def check_signal(df: pd.DataFrame, symbol: str,
 
     # ── Filtro horario para XAUUSDT ──────────────────────────────────
     if symbol == "XAUUSDT" and not _is_xauusdt_trading_hours():
-        logger.info(f"{symbol}: Fuera de horario de trading del oro. Sin señal.")
+        logger.info("%s: Fuera de horario de trading del oro. Sin señal.", symbol)
         return None
 
     # ── Calcular indicadores ────────────────────────────────────────
     df = add_indicators(df)
     if df.empty or len(df) < 2:
-        logger.warning(f"{symbol}: Datos insuficientes para calcular señal.")
+        logger.warning("%s: Datos insuficientes para calcular señal.", symbol)
         return None
 
     data = get_last_signal_data(df)
@@ -72,26 +72,24 @@ def check_signal(df: pd.DataFrame, symbol: str,
                     funding_bias = "SHORT"  # Longs pagan → sesgo SHORT
                 else:
                     funding_bias = "LONG"   # Shorts pagan → sesgo LONG
-                logger.info(
-                    f"{symbol}: 💰 Funding Rate {rate*100:+.4f}% → Sesgo: {funding_bias}"
-                )
+                logger.info("%s: 💰 Funding Rate %+.4f%% → Sesgo: %s",
+                            symbol, rate * 100, funding_bias)
         except Exception:
             pass  # Si falla, ignorar el filtro y continuar normalmente
 
     # ── Log de estado actual ────────────────────────────────────────
-    logger.info(
-        f"{symbol} | EMA Cross: {ema_cross:+.0f} | RSI: {rsi:.1f} | "
-        f"ADX: {adx:.1f} | Vol: {volume:.0f} (MA: {vol_ma:.0f})"
-    )
+    # Formateo perezoso: el string solo se construye si INFO está activo (en el hilo del logger)
+    logger.info("%s | EMA Cross: %+.0f | RSI: %.1f | ADX: %.1f | Vol: %.0f (MA: %.0f)",
+                symbol, ema_cross, rsi, adx, volume, vol_ma)
 
     # ── Filtro ADX: solo operar en tendencia fuerte ─────────────────────
     if adx < cfg["adx_min"]:
-        logger.info(f"{symbol}: ADX {adx:.1f} < {cfg['adx_min']} → Mercado lateral, sin señal.")
+        logger.info("%s: ADX %.1f < %s → Mercado lateral, sin señal.", symbol, adx, cfg["adx_min"])
         return None
 
     # ── Filtro de volumen ──────────────────────────────────────────
     if volume < vol_ma * 0.8:
-        logger.info(f"{symbol}: Volumen bajo ({volume:.0f} < {vol_ma * 0.8:.0f}), sin señal.")
+        logger.info("%s: Volumen bajo (%.0f < %.0f), sin señal.", symbol, volume, vol_ma * 0.8)
         return None
 
     # ── SEÑAL LONG ─────────────────────────────────────────────────
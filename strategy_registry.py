@@ -0,0 +1,168 @@
+"""
+strategy_registry.py — Registro de estrategias con requisitos de datos declarados
+==================================================================================
+Antes run_bot elegía la estrategia con un if/elif sobre config["strategy"] y
+cada estrategia (y cada sub-estrategia de ENSEMBLE / HYBRID_D1_ICT) descargaba
+sus propias velas.
+
+Ahora cada estrategia se registra declarando lo que necesita:
+
+    @register("TREND_MOMENTUM_D1",
+              requires={mt5.TIMEFRAME_D1: 250, mt5.TIMEFRAME_H1: 60},
+              session=(7, 17), skip_monday=True)
+    def get_signal_trend_momentum_d1(symbol, base_name, bars, cfg=None): ...
+
+El motor:
+  1. Descarta la estrategia sin tocar MT5 si está fuera de su ventana horaria.
+  2. Une los requisitos (propios + compuestos EN SESIÓN) → máximo de velas por
+     timeframe.
+  3. Descarga UNA vez por símbolo/ciclo y entrega un BarView inmutable.
+
+`params` declara las claves de SYMBOL_CONFIGS[base] que la estrategia lee sin
+valor por defecto (config["min_range"]...): config_reload rechaza un overlay
+que deje un símbolo sin ellas en vez de fallar con KeyError en pleno ciclo.
+
+Las estrategias solo leen del BarView (incluido bars.now), así que pueden
+ejecutarse en un backtest o en tests sin MT5.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Callable
+
+import pandas as pd
+
+CONFIG_TF = "config"   # Requisito sobre el timeframe de SYMBOL_CONFIGS[base]["timeframe"]
+
+
+@dataclass(frozen=True)
+class StrategySpec:
+    name:        str
+    func:        Callable
+    requires:    MappingProxyType               # timeframe → nº de velas
+    session:     tuple[int, int] | None = None  # [inicio, fin) en horas UTC
+    skip_monday: bool = False
+    composes:    tuple[str, ...] = field(default_factory=tuple)
+    params:      tuple[str, ...] = field(default_factory=tuple)   # claves obligatorias de la config
+
+    def in_session(self, now: datetime) -> bool:
+        if self.skip_monday and now.weekday() == 0:
+            return False
+        if self.session is None:
+            return True
+        start, end = self.session
+        return start <= now.hour < end
+
+
+REGISTRY: dict[str, StrategySpec] = {}
+
+
+def register(name: str, requires: dict | None = None, session: tuple[int, int] | None = None,
+             skip_monday: bool = False, composes: tuple[str, ...] = (), params: tuple[str, ...] = ()):
+    """Decorador: registra una estrategia (symbol, base_name, bars, cfg=None) → TradeSetup | None."""
+    def deco(func):
+        REGISTRY[name] = StrategySpec(
+            name=name,
+            func=func,
+            requires=MappingProxyType(dict(requires or {})),
+            session=session,
+            skip_monday=skip_monday,
+            composes=tuple(composes),
+            params=tuple(params),
+        )
+        return func
+    return deco
+
+
+def get(name: str) -> StrategySpec | None:
+    return REGISTRY.get(name)
+
+
+def _closure(name: str, now: datetime | None = None):
+    """La estrategia y todas sus compuestas (recursivo, sin repetir).
+
+    Con `now`, se omiten las que están fuera de su ventana (y sus compuestas):
+    HYBRID_D1_ICT no necesita las M5 de ICT_SILVER_BULLET fuera de 15-16 UTC.
+    """
+    pending, seen = [name], set()
+    while pending:
+        spec = REGISTRY.get(pending.pop())
+        if spec is None or spec.name in seen:
+            continue
+        seen.add(spec.name)
+        if now is not None and not spec.in_session(now):
+            continue
+        yield spec
+        pending.extend(spec.composes)
+
+
+def requirements(name: str, cfg: dict, now: datetime | None = None) -> dict:
+    """Unión de requisitos de la estrategia y sus compuestas en sesión: {timeframe: velas}.
+
+    Sin `now` se ignoran las ventanas horarias (warm-up).
+    """
+    out: dict = {}
+    for spec in _closure(name, now):
+        for tf, count in spec.requires.items():
+            tf = cfg["timeframe"] if tf == CONFIG_TF else tf
+            out[tf] = max(out.get(tf, 0), count)
+    return out
+
+
+def required_params(name: str) -> set[str]:
+    """Claves de config obligatorias de la estrategia y sus compuestas."""
+    out: set[str] = set()
+    for spec in _closure(name):
+        out.update(spec.params)
+        if CONFIG_TF in spec.requires:
+            out.add("timeframe")   # requires={CONFIG_TF: n} lee config["timeframe"]
+    return out
+
+
+class BarView:
+    """
+    Vista de solo lectura de las velas de un símbolo en un ciclo.
+    get(tf, count) devuelve una COPIA de las últimas `count` velas: la estrategia
+    puede añadir columnas sin afectar a las demás.
+    """
+
+    __slots__ = ("symbol", "now", "_frames")
+
+    def __init__(self, symbol: str, frames: dict, now: datetime | None = None):
+        self.symbol = symbol
+        self.now = now or datetime.now(timezone.utc)
+        self._frames = MappingProxyType(dict(frames))
+
+    def get(self, timeframe, count: int | None = None) -> pd.DataFrame:
+        df = self._frames.get(timeframe)
+        if df is None:
+            return pd.DataFrame()
+        if count is not None:
+            df = df.iloc[-count:]
+        return df.copy()
+
+    def __contains__(self, timeframe) -> bool:
+        return timeframe in self._frames
+
+    def timeframes(self) -> tuple:
+        return tuple(self._frames)
+
+
+def prefetch(symbol: str, name: str, cfg: dict, fetch, now: datetime | None = None) -> BarView:
+    """Descarga la unión de requisitos con `fetch(symbol, timeframe, count)`."""
+    return prefetch_many(symbol, [(name, cfg)], fetch, now)
+
+
+def prefetch_many(symbol: str, items: list[tuple[str, dict]], fetch, now: datetime | None = None) -> BarView:
+    """Un solo BarView para varias estrategias [(nombre, cfg)] del mismo símbolo.
+
+    Con `now` solo se descargan los requisitos de las estrategias en su ventana;
+    sin él (warm-up) se precarga todo.
+    """
+    reqs: dict = {}
+    for name, cfg in items:
+        for tf, count in requirements(name, cfg, now).items():
+            reqs[tf] = max(reqs.get(tf, 0), count)
+    frames = {tf: fetch(symbol, tf, count) for tf, count in reqs.items()}
+    return BarView(symbol, frames, now)
@@ -0,0 +1,155 @@
+"""
+symbol_registry.py — Registro en caché de especificaciones de símbolos del broker
+==================================================================================
+calc_lot_size, execute_trade y find_symbol consultaban mt5.symbol_info() en
+cada trade / cada guardado de estado. Este registro:
+
+  🔎 Resuelve los alias (XAUUSD / GOLD / XAUUSD.a...) una sola vez al arrancar.
+  📐 Cachea tick size, volume step/min/max, filling mode y el cap de lote.
+  🔄 Refresca solo por calendario (REFRESH_SECS) o cuando el broker rechaza una orden.
+  💱 trade_tick_value NO es estático: en pares cruzados y CFDs cotizados en otra
+     divisa depende del tipo de cambio. for_sizing() lo relee en cada cálculo
+     de lote (una llamada symbol_info, barata) sobre la especificación cacheada.
+
+Con la especificación en memoria, el cálculo del lote es matemática pura.
+snapshot()/restore() conservan alias y especificaciones entre reinicios (warm start).
+"""
+
+import time
+from dataclasses import dataclass, replace
+
+from mt5_io import mt5
+
+REFRESH_SECS = 6 * 3600   # Re-lectura programada de especificaciones estáticas (6h)
+DEFAULT_LOT_CAP = 1.0
+
+
+@dataclass(frozen=True)
+class SymbolSpec:
+    base_name:   str
+    symbol:      str
+    tick_size:   float
+    tick_value:  float    # Valor al cargar: el lote usa el vigente (for_sizing)
+    volume_step: float
+    volume_min:  float
+    volume_max:  float
+    filling:     int      # mt5.ORDER_FILLING_*
+    lot_cap:     float
+    digits:      int
+    loaded_at:   float
+
+    def calc_lot(self, balance: float, sl_dist: float, risk_pct: float) -> float:
+        """Lote por riesgo: balance × riesgo / (ticks de SL × valor del tick), redondeado y acotado."""
+        if balance <= 0 or sl_dist <= 0 or self.tick_value <= 0 or self.tick_size <= 0:
+            return 0.01
+        risk_amount = balance * (risk_pct / 100)
+        sl_ticks = sl_dist / self.tick_size
+        lot = risk_amount / (sl_ticks * self.tick_value)
+        # Redondear al step del lote y clamp
+        lot = round(lot / self.volume_step) * self.volume_step
+        lot = max(self.volume_min, min(min(self.volume_max, self.lot_cap), lot))
+        return round(lot, 2)
+
+
+def _pick_filling(filling_mode: int) -> int:
+    """Detecta el mejor modo de ejecución soportado por el broker."""
+    if filling_mode & 1:    # SYMBOL_FILLING_FOK
+        return mt5.ORDER_FILLING_FOK
+    if filling_mode & 2:    # SYMBOL_FILLING_IOC
+        return mt5.ORDER_FILLING_IOC
+    return mt5.ORDER_FILLING_IOC
+
+
+class SymbolRegistry:
+    """Alias → símbolo del broker y símbolo → SymbolSpec, con refresco programado."""
+
+    def __init__(self, symbol_configs: dict, lot_caps: dict, refresh_secs: float = REFRESH_SECS):
+        self.symbol_configs = symbol_configs
+        self.lot_caps = lot_caps
+        self.refresh_secs = refresh_secs
+        self._aliases: dict[str, tuple[str | None, float]] = {}   # base → (symbol, ts)
+        self._specs: dict[str, SymbolSpec] = {}
+        self._base_of: dict[str, str] = {}
+
+    # ── Alias ────────────────────────────────────────────────────────────
+    def resolve(self, base_name: str) -> str | None:
+        """Devuelve el símbolo real del broker para base_name (cacheado, también si no existe)."""
+        cached = self._aliases.get(base_name)
+        if cached is not None and time.time() - cached[1] < self.refresh_secs:
+            return cached[0]
+        symbol = None
+        for name in self.symbol_configs[base_name].get("aliases", [base_name]):
+            if mt5.symbol_info(name):
+                symbol = name
+                break
+        self._aliases[base_name] = (symbol, time.time())
+        if symbol:
+            self._base_of[symbol] = base_name
+        return symbol
+
+    def resolve_all(self) -> dict[str, str]:
+        """Resuelve todos los símbolos configurados (una vez al arrancar)."""
+        return {bn: sym for bn in self.symbol_configs if (sym := self.resolve(bn))}
+
+    # ── Especificaciones ─────────────────────────────────────────────────
+    def get(self, symbol: str) -> SymbolSpec | None:
+        spec = self._specs.get(symbol)
+        if spec is not None and time.time() - spec.loaded_at < self.refresh_secs:
+            return spec
+        return self._load(symbol)
+
+    def for_sizing(self, symbol: str) -> SymbolSpec | None:
+        """Especificación cacheada con el trade_tick_value vigente del broker."""
+        spec = self.get(symbol)
+        if spec is None:
+            return None
+        info = mt5.symbol_info(symbol)
+        if info and info.trade_tick_value > 0:
+            spec = replace(spec, tick_value=info.trade_tick_value)
+        return spec
+
+    def _load(self, symbol: str) -> SymbolSpec | None:
+        info = mt5.symbol_info(symbol)
+        if not info:
+            return None
+        base_name = self._base_of.get(symbol, symbol)
+        cap = self.lot_caps.get(symbol, self.lot_caps.get(base_name, DEFAULT_LOT_CAP))
+        spec = SymbolSpec(
+            base_name=base_name,
+            symbol=symbol,
+            tick_size=info.trade_tick_size,
+            tick_value=info.trade_tick_value,
+            volume_step=info.volume_step,
+            volume_min=info.volume_min,
+            volume_max=info.volume_max,
+            filling=_pick_filling(info.filling_mode),
+            lot_cap=cap,
+            digits=info.digits,
+            loaded_at=time.time(),
+        )
+        self._specs[symbol] = spec
+        return spec
+
+    def invalidate(self, symbol: str):
+        """Fuerza la re-lectura en el próximo uso (p.ej. tras un rechazo del broker)."""
+        self._specs.pop(symbol, None)
+
+    def forget(self, base_name: str):
+        """Olvida el alias resuelto (p.ej. tras cambiar los alias en la config)."""
+        cached = self._aliases.pop(base_name, None)
+        if cached and cached[0]:
+            self._base_of.pop(cached[0], None)
+            self._specs.pop(cached[0], None)
+
+    # ── Warm start ───────────────────────────────────────────────────────
+    def snapshot(self) -> dict:
+        return {"aliases": dict(self._aliases), "specs": dict(self._specs), "base_of": dict(self._base_of)}
+
+    def restore(self, data: dict):
+        """Carga alias/especificaciones guardados; conservan su timestamp (el refresco sigue su calendario)."""
+        self._aliases.update({b: a for b, a in data.get("aliases", {}).items() if b in self.symbol_configs})
+        self._base_of.update(data.get("base_of", {}))
+        for symbol, spec in data.get("specs", {}).items():
+            # El cap de lote viene del código actual, no del proceso anterior
+            cap = self.lot_caps.get(symbol, self.lot_caps.get(spec.base_name, DEFAULT_LOT_CAP))
+            self._specs[symbol] = replace(spec, lot_cap=cap)
@@ -18,10 +18,16 @@ Configuración:
 import os
 import json
 import ssl
+import time
+import queue
+import atexit
+import threading
 import urllib.request
 import urllib.error
 from datetime import datetime, timezone
 
+import latency
+
 # Contexto SSL sin verificación (necesario en algunos VPS Windows)
 _SSL_CTX = ssl.create_default_context()
 _SSL_CTX.check_hostname = False
@@ -53,17 +59,27 @@ _INSTANCE_HEADER = (
 # Si no hay token/chat_id, las notificaciones se desactivan silenciosamente
 _ENABLED = bool(BOT_TOKEN and CHAT_ID)
 
+# URL base de la API (sobrescribible para apuntar a un servidor local en pruebas)
+API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+
+# Cola de envío en segundo plano
+QUEUE_MAX         = 200    # Mensajes pendientes máximos (si se llena, se descartan)
+COALESCE_WINDOW   = 1.0    # Segundos que se espera para agrupar una ráfaga
+MIN_INTERVAL_SECS = 1.0    # Límite de Telegram: ~1 mensaje/segundo por chat
+MAX_RETRIES       = 5
+MAX_MESSAGE_LEN   = 4000   # Límite de Telegram: 4096 caracteres
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # ENVÍO DE MENSAJES
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _send_message(text: str, parse_mode: str = "HTML") -> bool:
-    """Envía un mensaje por Telegram. Retorna True si se envió."""
-    if not _ENABLED:
-        return False
-
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+def _post(text: str, parse_mode: str = "HTML") -> tuple[bool, float | None]:
+    """
+    POST síncrono a sendMessage.
+    Retorna (enviado, reintentar_en): reintentar_en=None si el error no es recuperable.
+    """
+    url = f"{API_BASE}/bot{BOT_TOKEN}/sendMessage"
     payload = json.dumps({
         "chat_id": CHAT_ID,
         "text": _INSTANCE_HEADER + text,
@@ -79,14 +95,129 @@ def _send_message(text: str, parse_mode: str = "HTML") -> bool:
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=10, context=_SSL_CTX) as resp:
-            return resp.status == 200
+        with latency.span("telegram"), urllib.request.urlopen(req, timeout=10, context=_SSL_CTX) as resp:
+            return resp.status == 200, None
     except urllib.error.HTTPError as e:
-        print(f"❌ Telegram API Error: {e.code} - {e.read().decode('utf-8')}")
-        return False
+        body = e.read().decode("utf-8", errors="replace")
+        print(f"❌ Telegram API Error: {e.code} - {body}")
+        if e.code == 429:
+            try:
+                return False, float(json.loads(body)["parameters"]["retry_after"])
+            except Exception:
+                return False, 5.0
+        return False, (2.0 if e.code >= 500 else None)
     except (urllib.error.URLError, Exception) as e:
         print(f"❌ Connection Error: {e}")
+        return False, 2.0
+
+
+def _send_message_sync(text: str, parse_mode: str = "HTML") -> bool:
+    """Envía un mensaje bloqueando hasta recibir respuesta (sin reintentos)."""
+    if not _ENABLED:
         return False
+    return _post(text, parse_mode)[0]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# COLA ASÍNCRONA (el loop de trading nunca espera a Telegram)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_queue: "queue.Queue[tuple[str, str, object]]" = queue.Queue(maxsize=QUEUE_MAX)
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_last_sent: dict[str, float] = {}   # chat_id → monotonic del último envío
+dropped = 0
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_sender_loop, name="telegram-sender", daemon=True)
+            _worker.start()
+
+
+def _send_message(text: str, parse_mode: str = "HTML", coalesce_key=None) -> bool:
+    """
+    Encola un mensaje para Telegram y retorna inmediatamente.
+    coalesce_key: si varios mensajes con la misma clave llegan en la misma
+    ráfaga, solo se envía el último (p.ej. actualizaciones de trailing).
+    """
+    global dropped
+    if not _ENABLED:
+        return False
+    _ensure_worker()
+    try:
+        _queue.put_nowait((text, parse_mode, coalesce_key))
+        return True
+    except queue.Full:
+        dropped += 1
+        return False
+
+
+def _coalesce(items: list) -> list:
+    """Deduplica por coalesce_key (se queda el último) y agrupa en bloques ≤ MAX_MESSAGE_LEN."""
+    last_idx = {key: i for i, (_, _, key) in enumerate(items) if key is not None}
+    kept = [(t, pm) for i, (t, pm, key) in enumerate(items) if key is None or last_idx[key] == i]
+
+    batches: list[tuple[str, str]] = []
+    for text, pm in kept:
+        if batches and batches[-1][1] == pm and len(batches[-1][0]) + len(text) + 2 <= MAX_MESSAGE_LEN:
+            batches[-1] = (batches[-1][0] + "\n\n" + text, pm)
+        else:
+            batches.append((text[:MAX_MESSAGE_LEN], pm))
+    return batches
+
+
+def _deliver(text: str, parse_mode: str):
+    """Envía respetando el rate limit por chat, con reintentos y backoff exponencial."""
+    for attempt in range(MAX_RETRIES):
+        wait = MIN_INTERVAL_SECS - (time.monotonic() - _last_sent.get(CHAT_ID, 0.0))
+        if wait > 0:
+            time.sleep(wait)
+        ok, retry_in = _post(text, parse_mode)
+        _last_sent[CHAT_ID] = time.monotonic()
+        if ok or retry_in is None:
+            return
+        time.sleep(min(60.0, max(retry_in, 2.0 ** attempt)))
+    print(f"❌ Telegram: mensaje descartado tras {MAX_RETRIES} intentos")
+
+
+def _sender_loop():
+    while True:
+        first = _queue.get()
+        items = [first]
+        # Ventana de coalescing: recoger la ráfaga completa antes de enviar
+        deadline = time.monotonic() + COALESCE_WINDOW
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            for text, pm in _coalesce(items):
+                _deliver(text, pm)
+        except Exception as e:
+            print(f"❌ Telegram sender error: {e}")
+        finally:
+            for _ in items:
+                _queue.task_done()
+
+
+def flush(timeout: float = 10.0) -> bool:
+    """Espera a que la cola se vacíe (útil al cerrar el proceso). Retorna True si se vació."""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not _queue.unfinished_tasks
+
+
+atexit.register(flush, 5.0)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -150,7 +281,8 @@ def notify_break_even(symbol: str, new_sl: float):
 
 def notify_trailing_stop(symbol: str, new_sl: float):
     """Notifica movimiento de trailing stop."""
-    _send_message(f"📈 <b>Trailing Stop</b> | {symbol} | SL → {new_sl:.2f}")
+    _send_message(f"📈 <b>Trailing Stop</b> | {symbol} | SL → {new_sl:.2f}",
+                  coalesce_key=("trailing", symbol))
 
 
 def notify_eod_close(symbol: str, pnl: float):
@@ -223,7 +355,7 @@ def notify_reconnection(attempt: int, success: bool):
 if __name__ == "__main__":
     if _ENABLED:
         print("Enviando mensaje de prueba...")
-        ok = _send_message("🧪 <b>Test</b> — El bot de trading está conectado.")
+        ok = _send_message_sync("🧪 <b>Test</b> — El bot de trading está conectado.")
         print(f"{'✅ Enviado' if ok else '❌ Error'}")
     else:
         print("⚠️ Telegram no configurado.")
@@ -0,0 +1,289 @@
+"""
+user_stream.py — User data stream de Binance Futures (posiciones y balance)
+===========================================================================
+Cada run_cycle pedía futures_position_information() (todos los pares, peso 5)
+y futures_account_balance() (peso 5), y close_position / has_open_position
+volvían a consultar posiciones.
+
+UserDataStream mantiene un libro en memoria alimentado por eventos push:
+  📒 ACCOUNT_UPDATE       → balance (wb / cw) y posiciones (pa / ep / up)
+  📝 ORDER_TRADE_UPDATE   → órdenes abiertas y fills (SL / TP ejecutados)
+  🔑 listenKeyExpired     → nuevo listenKey y reconexión
+
+El listenKey se crea por REST, se renueva cada KEEPALIVE_SECS (caduca a los
+60 min) y se cierra al parar. El REST solo se usa para RECONCILIAR: al
+conectar, cada RECONCILE_SECS y tras una desconexión. Mientras el stream no
+está sincronizado (book.live() == False) exchange.py vuelve al polling.
+
+Fuentes intercambiables:
+  BinanceUserSocket  → websocket real (wss://fstream.binance.com/ws/<listenKey>)
+  LocalEventFeed     → eventos de una lista o un .jsonl (tests / replays sin red)
+
+Balance disponible: ACCOUNT_UPDATE no trae availableBalance. Como el bot opera
+solo en ISOLATED, se usa el cross wallet balance (cw), que ya excluye el margen
+aislado; la reconciliación REST corrige cualquier desvío.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+import config
+import logger
+
+FSTREAM_URL = "wss://fstream.binance.com/ws/"
+FSTREAM_TESTNET_URL = "wss://stream.binancefuture.com/ws/"
+KEEPALIVE_SECS = 30 * 60
+RECONCILE_SECS = float(os.getenv("USER_STREAM_RECONCILE_SECS", 300))
+RECONNECT_DELAY_SECS = 5
+STALE_AFTER_SECS = RECONCILE_SECS * 2   # Sin reconciliar ni eventos → no confiar en el libro
+
+
+class UserDataBook:
+    """Posiciones, balance y órdenes abiertas según el stream (thread-safe)."""
+
+    def __init__(self, asset: str = "USDT"):
+        self.asset = asset
+        self._lock = threading.Lock()
+        self._positions: dict[str, dict] = {}
+        self._position_ts: dict[str, float] = {}
+        self._orders: dict[int, dict] = {}
+        self._balance: dict | None = None
+        self._balance_ts = 0.0
+        self._connected = False
+        self._synced_at = 0.0
+        self.events = 0
+        self.fills: list[dict] = []    # Últimos fills (SL / TP / entradas)
+
+    # ── Estado ───────────────────────────────────────────────────────────
+    def set_connected(self, connected: bool):
+        with self._lock:
+            self._connected = connected
+            if not connected:
+                self._synced_at = 0.0
+
+    def connected(self) -> bool:
+        with self._lock:
+            return self._connected
+
+    def live(self) -> bool:
+        """True si el stream está conectado y reconciliado recientemente."""
+        with self._lock:
+            return self._connected and time.time() - self._synced_at < STALE_AFTER_SECS
+
+    # ── Eventos ──────────────────────────────────────────────────────────
+    def apply(self, event: dict):
+        kind = event.get("e")
+        now = time.time()
+        with self._lock:
+            self.events += 1
+            if kind == "ACCOUNT_UPDATE":
+                data = event.get("a", {})
+                for b in data.get("B", []):
+                    if b.get("a") == self.asset:
+                        self._balance = {"wallet": float(b["wb"]), "available": float(b["cw"])}
+                        self._balance_ts = now
+                for p in data.get("P", []):
+                    symbol = p["s"]
+                    self._position_ts[symbol] = now
+                    if float(p["pa"]) == 0:
+                        self._positions.pop(symbol, None)
+                    else:
+                        self._positions[symbol] = {
+                            "symbol":           symbol,
+                            "positionAmt":      p["pa"],
+                            "entryPrice":       p["ep"],
+                            "unRealizedProfit": p.get("up", "0"),
+                            "marginType":       p.get("mt", "isolated"),
+                            "positionSide":     p.get("ps", "BOTH"),
+                        }
+            elif kind == "ORDER_TRADE_UPDATE":
+                o = event.get("o", {})
+                order_id, status = o.get("i"), o.get("X")
+                if status in ("NEW", "PARTIALLY_FILLED"):
+                    self._orders[order_id] = {"symbol": o.get("s"), "side": o.get("S"),
+                                              "type": o.get("o"), "status": status,
+                                              "stopPrice": o.get("sp")}
+                else:
+                    self._orders.pop(order_id, None)
+                if o.get("x") == "TRADE":
+                    self.fills.append({"symbol": o.get("s"), "side": o.get("S"), "type": o.get("o"),
+                                       "price": float(o.get("L") or o.get("ap") or 0),
+                                       "qty": float(o.get("l") or 0),
+                                       "realized_pnl": float(o.get("rp") or 0),
+                                       "time": event.get("T") or event.get("E")})
+                    del self.fills[:-50]
+        if kind == "ORDER_TRADE_UPDATE" and event["o"].get("X") == "FILLED":
+            o = event["o"]
+            logger.info(f"{o.get('s')}: 📬 {o.get('o')} {o.get('S')} ejecutada @ {o.get('ap')} "
+                        f"(PnL realizado {float(o.get('rp') or 0):+.2f})")
+
+    # ── Reconciliación REST ──────────────────────────────────────────────
+    def reconcile(self, positions: list[dict], balance: dict | None, requested_at: float):
+        """
+        Sustituye el libro por el snapshot REST, salvo los símbolos que recibieron
+        eventos DESPUÉS de lanzar la petición (el evento es más reciente).
+        """
+        rest = {p["symbol"]: p for p in positions if float(p["positionAmt"]) != 0}
+        drift = []
+        with self._lock:
+            was_synced = self._synced_at > 0   # Tras (re)conectar las diferencias son esperables
+            for symbol in set(self._positions) | set(rest):
+                if self._position_ts.get(symbol, 0) > requested_at:
+                    continue
+                mine = self._positions.get(symbol)
+                theirs = rest.get(symbol)
+                if was_synced and (float(mine["positionAmt"]) if mine else 0.0) != (float(theirs["positionAmt"]) if theirs else 0.0):
+                    drift.append(symbol)
+                if theirs:
+                    self._positions[symbol] = {k: theirs.get(k) for k in
+                                               ("symbol", "positionAmt", "entryPrice", "unRealizedProfit",
+                                                "marginType", "positionSide")}
+                else:
+                    self._positions.pop(symbol, None)
+            if balance is not None and self._balance_ts <= requested_at:
+                self._balance = balance
+            self._synced_at = time.time()
+        for symbol in drift:
+            logger.warning(f"🔄 Reconciliación: posición de {symbol} corregida desde REST")
+
+    # ── Lectura ──────────────────────────────────────────────────────────
+    def positions(self) -> list[dict]:
+        with self._lock:
+            return [dict(p) for p in self._positions.values()]
+
+    def available_balance(self) -> float | None:
+        with self._lock:
+            return self._balance["available"] if self._balance else None
+
+    def open_orders(self, symbol: str | None = None) -> list[dict]:
+        with self._lock:
+            return [dict(o, orderId=i) for i, o in self._orders.items()
+                    if symbol is None or o["symbol"] == symbol]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# FUENTES DE EVENTOS
+# ─────────────────────────────────────────────────────────────────────────────
+
+class BinanceUserSocket:
+    """Websocket del user data stream con gestión del listenKey."""
+
+    def __init__(self, client, testnet: bool = False):
+        self.client = client
+        if config.BINANCE_WS_URL:   # mock_binance.py u otro servidor alternativo
+            self.base_url = config.BINANCE_WS_URL + "/ws/"
+        else:
+            self.base_url = FSTREAM_TESTNET_URL if testnet else FSTREAM_URL
+        self.listen_key = None
+
+    def run(self, on_event, on_connected, stop: threading.Event):
+        """Bloquea hasta desconexión, listenKey caducado o stop. El llamador reconecta."""
+        self.listen_key = self.client.futures_stream_get_listen_key()
+        try:
+            asyncio.run(self._consume(on_event, on_connected, stop))
+        finally:
+            try:
+                self.client.futures_stream_close(listenKey=self.listen_key)
+            except Exception:
+                pass
+
+    async def _consume(self, on_event, on_connected, stop: threading.Event):
+        import websockets   # Solo lo necesita el stream real
+
+        async with websockets.connect(self.base_url + self.listen_key) as ws:
+            on_connected()
+            last_keepalive = time.time()
+            while not stop.is_set():
+                if time.time() - last_keepalive >= KEEPALIVE_SECS:
+                    await asyncio.to_thread(self.client.futures_stream_keepalive, listenKey=self.listen_key)
+                    last_keepalive = time.time()
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                event = json.loads(raw)
+                if event.get("e") == "listenKeyExpired":
+                    logger.warning("🔑 listenKey caducado — reconectando user stream")
+                    return
+                on_event(event)
+
+
+class LocalEventFeed:
+    """Fuente local: reproduce eventos (lista de dicts o archivo .jsonl) sin red."""
+
+    def __init__(self, events=None, path: str | None = None, delay: float = 0.0):
+        self.events = list(events or [])
+        self.path = path
+        self.delay = delay
+
+    def push(self, event: dict):
+        self.events.append(event)
+
+    def run(self, on_event, on_connected, stop: threading.Event):
+        on_connected()
+        if self.path:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.events.extend(json.loads(line) for line in f if line.strip())
+        while not stop.is_set():
+            if not self.events:
+                stop.wait(0.05)
+                continue
+            on_event(self.events.pop(0))
+            if self.delay:
+                stop.wait(self.delay)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# STREAM
+# ─────────────────────────────────────────────────────────────────────────────
+
+class UserDataStream(threading.Thread):
+    """Hilo que mantiene el libro al día: fuente de eventos + reconciliación periódica."""
+
+    def __init__(self, source, fetch_positions=None, fetch_balance=None, book: UserDataBook | None = None):
+        super().__init__(name="user-stream", daemon=True)
+        self.source = source
+        self.fetch_positions = fetch_positions   # callable() → lista REST (positionRisk)
+        self.fetch_balance = fetch_balance       # callable() → {"wallet", "available"} | None
+        self.book = book or UserDataBook()
+        self._stop = threading.Event()
+        self._reconciler = threading.Thread(target=self._reconcile_loop, name="user-stream-reconcile", daemon=True)
+
+    def reconcile(self):
+        if self.fetch_positions is None:
+            self.book.reconcile(self.book.positions(), None, time.time())
+            return
+        requested_at = time.time()
+        try:
+            positions = self.fetch_positions()
+            balance = self.fetch_balance() if self.fetch_balance else None
+        except Exception as e:
+            logger.error(f"Reconciliación del user stream: {e}")
+            return
+        self.book.reconcile(positions, balance, requested_at)
+
+    def _on_connected(self):
+        self.book.set_connected(True)
+        self.reconcile()
+        logger.success("📡 User data stream conectado")
+
+    def run(self):
+        self._reconciler.start()
+        while not self._stop.is_set():
+            try:
+                self.source.run(self.book.apply, self._on_connected, self._stop)
+            except Exception as e:
+                logger.error(f"User data stream desconectado: {e}")
+            self.book.set_connected(False)
+            self._stop.wait(RECONNECT_DELAY_SECS)
+
+    def _reconcile_loop(self):
+        while not self._stop.wait(RECONCILE_SECS):
+            if self.book.connected():
+                self.reconcile()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,221 @@
+"""
+virtual_engine.py — Motor de ejecución virtual a nivel de tick (paper trading)
+===============================================================================
+Antes, las posiciones virtuales se comparaban con UN solo symbol_info_tick por
+minuto: un SL/TP tocado y revertido dentro del minuto se perdía, y el resultado
+se anotaba como ±1.0 fijo.
+
+VirtualEngine procesa TODO el feed desde la última pasada:
+  1. Ticks (mt5.copy_ticks_range) desde el cursor de cada posición.
+     Sin ticks disponibles (histórico del broker, reinicio largo) → velas M1.
+  2. First-touch vectorizado: matriz posiciones × ticks por símbolo; el primer
+     índice donde se cruza SL o TP decide la salida.
+  3. Watermarks (máximo/mínimo alcanzado) por posición → MFE / MAE.
+  4. P&L en múltiplos de R: (salida − entrada) / |entrada − SL inicial|.
+
+Convenciones:
+  - LONG sale por el BID, SHORT por el ASK (igual que un cierre real).
+  - Con ticks, el fill es el precio del tick que cruza (recoge el gap).
+  - Con velas M1 (solo BID), el fill es el nivel; si una misma vela toca SL
+    y TP se asume SL primero (conservador).
+"""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from mt5_io import mt5
+
+TICK_LOOKBACK_SECS = 6 * 3600   # Más atrás que esto se usan velas M1 en vez de ticks
+CHUNK = 20_000                  # Columnas por bloque (limita la matriz N × T en memoria)
+
+
+def _entry_ms(pos: dict) -> int:
+    try:
+        dt = datetime.fromisoformat(pos["time"])
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp() * 1000)
+    except (KeyError, ValueError):
+        return int(time.time() * 1000)
+
+
+def prepare(pos: dict) -> dict:
+    """Completa los campos que usa el motor (idempotente)."""
+    if "cursor_ms" not in pos:
+        pos["cursor_ms"] = _entry_ms(pos)
+    pos.setdefault("sl0", pos["sl"])            # SL inicial: define 1R
+    pos.setdefault("high", pos["entry"])
+    pos.setdefault("low", pos["entry"])
+    return pos
+
+
+def r_multiple(pos: dict, price: float) -> float:
+    risk = abs(pos["entry"] - pos["sl0"])
+    if risk <= 0:
+        return 0.0
+    side = 1 if pos["signal"] == "LONG" else -1
+    return side * (price - pos["entry"]) / risk
+
+
+def resolve_first_touch(t_ms, hi, lo, side, sl, tp, start_ms, inclusive=False, fill_at_level=False):
+    """
+    Resolución vectorizada sobre un bloque del feed de UN símbolo.
+
+    t_ms, hi, lo : arrays (T,) — para ticks hi == lo == precio de salida
+    side, sl, tp, start_ms : arrays (N,) por posición (side = +1 LONG / −1 SHORT)
+    hi/lo son (T,) o (N, T) si el precio de salida depende del lado.
+
+    Retorna (exit_idx, exit_kind, exit_px, wm_hi, wm_lo):
+      exit_idx  (N,) índice del primer toque o −1
+      exit_kind (N,) 1 = TP, −1 = SL, 0 = abierta
+      exit_px   (N,) precio de salida (NaN si abierta)
+      wm_hi/lo  (N,) extremo alcanzado hasta la salida (NaN sin datos)
+    """
+    n, t = len(side), len(t_ms)
+    hi2 = np.broadcast_to(hi, (n, t))
+    lo2 = np.broadcast_to(lo, (n, t))
+    after = (t_ms[None, :] >= start_ms[:, None]) if inclusive else (t_ms[None, :] > start_ms[:, None])
+
+    long_ = side[:, None] > 0
+    sl_hit = after & np.where(long_, lo2 <= sl[:, None], hi2 >= sl[:, None])
+    tp_hit = after & np.where(long_, hi2 >= tp[:, None], lo2 <= tp[:, None])
+
+    big = np.iinfo(np.int64).max
+    idx = np.arange(t)
+    first_sl = np.where(sl_hit.any(axis=1), np.where(sl_hit, idx, big).min(axis=1), big)
+    first_tp = np.where(tp_hit.any(axis=1), np.where(tp_hit, idx, big).min(axis=1), big)
+
+    # Empate en la misma columna (solo posible con velas) → SL primero
+    exit_kind = np.where(first_sl <= first_tp, -1, 1)
+    exit_idx = np.minimum(first_sl, first_tp)
+    exit_kind[exit_idx == big] = 0
+    exit_idx = np.where(exit_idx == big, -1, exit_idx)
+
+    rows = np.arange(n)
+    col = np.clip(exit_idx, 0, max(t - 1, 0))
+    if fill_at_level:
+        exit_px = np.where(exit_kind == 1, tp, sl).astype(float)
+    else:
+        exit_px = np.where(long_[:, 0], lo2[rows, col], hi2[rows, col]).astype(float)
+    exit_px[exit_kind == 0] = np.nan
+
+    # Watermarks solo hasta el toque (lo posterior no pertenece a la posición)
+    upto = after & ((idx[None, :] <= exit_idx[:, None]) | (exit_idx[:, None] < 0))
+    has = upto.any(axis=1)
+    wm_hi = np.where(has, np.where(upto, hi2, -np.inf).max(axis=1), np.nan)
+    wm_lo = np.where(has, np.where(upto, lo2, np.inf).min(axis=1), np.nan)
+    return exit_idx, exit_kind, exit_px, wm_hi, wm_lo
+
+
+class VirtualEngine:
+    """Actualiza posiciones virtuales (dicts de state) contra el feed de ticks/M1."""
+
+    def __init__(self, tick_source=None, bar_source=None):
+        # Fuentes inyectables (shadow / backtest); por defecto MT5
+        self.tick_source = tick_source or self._mt5_ticks
+        self.bar_source = bar_source or self._mt5_bars
+        self.ticks_processed = 0
+
+    @staticmethod
+    def _mt5_ticks(symbol: str, from_ms: int, to_ms: int):
+        ticks = mt5.copy_ticks_range(
+            symbol,
+            datetime.fromtimestamp(from_ms / 1000, timezone.utc),
+            datetime.fromtimestamp(to_ms / 1000, timezone.utc),
+            mt5.COPY_TICKS_ALL,
+        )
+        if ticks is None or len(ticks) == 0:
+            return None
+        return ticks["time_msc"].astype(np.int64), ticks["bid"].astype(float), ticks["ask"].astype(float)
+
+    @staticmethod
+    def _mt5_bars(symbol: str, from_ms: int, to_ms: int):
+        rates = mt5.copy_rates_range(
+            symbol, mt5.TIMEFRAME_M1,
+            datetime.fromtimestamp(from_ms / 1000, timezone.utc),
+            datetime.fromtimestamp(to_ms / 1000, timezone.utc),
+        )
+        if rates is None or len(rates) == 0:
+            return None
+        return rates["time"].astype(np.int64) * 1000, rates["high"].astype(float), rates["low"].astype(float)
+
+    def update(self, positions: list[dict], now_ms: int | None = None) -> tuple[list[dict], list[dict]]:
+        """
+        Procesa el feed hasta now_ms. Retorna (abiertas, cerradas); las cerradas
+        llevan exit_price, exit_reason ("TP"/"SL"), exit_ms, r, mfe_r y mae_r.
+        """
+        now_ms = now_ms or int(time.time() * 1000)
+        by_symbol: dict[str, list[dict]] = {}
+        for pos in positions:
+            by_symbol.setdefault(pos["symbol"], []).append(prepare(pos))
+
+        still_open, closed = [], []
+        for symbol, group in by_symbol.items():
+            o, c = self._update_symbol(symbol, group, now_ms)
+            still_open.extend(o)
+            closed.extend(c)
+        return still_open, closed
+
+    def _update_symbol(self, symbol: str, group: list[dict], now_ms: int):
+        start = min(p["cursor_ms"] for p in group)
+        feed, is_tick = None, False
+        if now_ms - start <= TICK_LOOKBACK_SECS * 1000:
+            feed = self.tick_source(symbol, start, now_ms)
+            is_tick = feed is not None
+        if feed is None:
+            feed = self.bar_source(symbol, start, now_ms)
+        if feed is None:
+            return group, []
+
+        t_ms, a, b = feed
+        side = np.array([1 if p["signal"] == "LONG" else -1 for p in group])
+        if is_tick:
+            self.ticks_processed += len(t_ms)
+
+        open_mask = np.ones(len(group), dtype=bool)
+        closed = []
+        for c0 in range(0, len(t_ms), CHUNK):
+            live = np.flatnonzero(open_mask)
+            if live.size == 0:
+                break
+            sl_ = slice(c0, c0 + CHUNK)
+            if is_tick:
+                # a = bid, b = ask → precio de salida por lado (LONG bid / SHORT ask),
+                # solo para el bloque: nunca la matriz posiciones × ticks completa
+                blk_hi = blk_lo = np.where(side[live, None] > 0, a[None, sl_], b[None, sl_])
+            else:
+                blk_hi, blk_lo = a[sl_], b[sl_]   # high / low de la vela M1
+            exit_idx, kind, exit_px, wm_hi, wm_lo = resolve_first_touch(
+                t_ms[sl_], blk_hi, blk_lo, side[live],
+                np.array([group[i]["sl"] for i in live], dtype=float),
+                np.array([group[i]["tp"] for i in live], dtype=float),
+                np.array([group[i]["cursor_ms"] for i in live], dtype=np.int64),
+                inclusive=not is_tick, fill_at_level=not is_tick,
+            )
+            blk_t = t_ms[sl_]
+            for j, i in enumerate(live):
+                pos = group[i]
+                if not np.isnan(wm_hi[j]):
+                    pos["high"] = max(pos["high"], float(wm_hi[j]))
+                    pos["low"] = min(pos["low"], float(wm_lo[j]))
+                if kind[j] != 0:
+                    open_mask[i] = False
+                    pos["exit_price"] = float(exit_px[j])
+                    pos["exit_reason"] = "TP" if kind[j] == 1 else "SL"
+                    pos["exit_ms"] = int(blk_t[exit_idx[j]])
+                    closed.append(pos)
+
+        last_ms = int(t_ms[-1])
+        still_open = []
+        for i, pos in enumerate(group):
+            best, worst = (pos["high"], pos["low"]) if pos["signal"] == "LONG" else (pos["low"], pos["high"])
+            pos["mfe_r"] = round(r_multiple(pos, best), 3)
+            pos["mae_r"] = round(r_multiple(pos, worst), 3)
+            if open_mask[i]:
+                pos["cursor_ms"] = max(pos["cursor_ms"], last_ms)
+                still_open.append(pos)
+            else:
+                pos["r"] = round(r_multiple(pos, pos["exit_price"]), 3)
+        return still_open, closed
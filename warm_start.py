@@ -0,0 +1,120 @@
+"""
+warm_start.py — Snapshot de arranque en caliente para reinicios del bot
+========================================================================
+auto_update.py reinicia el bot en cada git pull y el watchdog tras cada caída.
+Cada arranque repetía resolución de alias, descarga completa de velas y
+recálculo del régimen D1 (y podía perder una ventana de entrada).
+
+El bot escribe periódicamente (SAVE_EVERY_SECS) y al salir un snapshot con:
+  🕯️ buffers de velas (CandleCache) → el primer ciclo solo pide velas nuevas
+  🔎 alias y especificaciones de símbolos (SymbolRegistry)
+  📈 sumas del régimen D1 (DailyRegimeCache)
+
+El cursor de deals reconciliados vive en el estado (bot_state_mt5_v5.json).
+
+Validación al cargar (cualquier fallo → arranque en frío normal):
+  - versión del formato (SNAPSHOT_VERSION)
+  - misma cuenta MT5 (login + servidor)
+  - antigüedad máxima (WARM_START_MAX_AGE)
+  - digest blake2b del payload (archivo truncado / corrupto)
+
+Escritura atómica (tmp + os.replace). El pickle solo se lee del archivo que
+escribe el propio bot.
+"""
+
+import hashlib
+import os
+import pickle
+import time
+
+import logger
+
+SNAPSHOT_FILE = "bot_mt5_warm.pkl"
+SNAPSHOT_VERSION = 1
+MAX_AGE_SECS = float(os.getenv("WARM_START_MAX_AGE", 6 * 3600))
+SAVE_EVERY_SECS = float(os.getenv("WARM_START_SAVE_SECS", 300))
+
+
+def _digest(blob: bytes) -> str:
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def save_snapshot(payload: dict, account: tuple, path: str = SNAPSHOT_FILE):
+    blob = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    envelope = {
+        "version": SNAPSHOT_VERSION,
+        "created": time.time(),
+        "account": account,
+        "digest": _digest(blob),
+        "payload": blob,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(envelope, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_snapshot(account: tuple, path: str = SNAPSHOT_FILE, max_age: float = MAX_AGE_SECS) -> dict | None:
+    """Payload validado o None (con el motivo en el log)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            envelope = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"♨️ Warm start descartado: snapshot ilegible ({e})")
+        return None
+
+    reason = None
+    if not isinstance(envelope, dict) or envelope.get("version") != SNAPSHOT_VERSION:
+        reason = "versión distinta"
+    elif tuple(envelope.get("account", ())) != tuple(account):
+        reason = "otra cuenta/servidor"
+    elif time.time() - envelope.get("created", 0) > max_age:
+        reason = f"antigüedad > {max_age / 3600:.1f}h"
+    elif _digest(envelope.get("payload", b"")) != envelope.get("digest"):
+        reason = "digest inválido"
+    if reason:
+        logger.warning(f"♨️ Warm start descartado: {reason}")
+        return None
+    try:
+        return pickle.loads(envelope["payload"])
+    except Exception as e:
+        logger.warning(f"♨️ Warm start descartado: payload ilegible ({e})")
+        return None
+
+
+class WarmStart:
+    """Guarda el snapshot cada SAVE_EVERY_SECS y lo restaura al arrancar."""
+
+    def __init__(self, build_payload, apply_payload, path: str = SNAPSHOT_FILE,
+                 save_every: float = SAVE_EVERY_SECS):
+        self.build_payload = build_payload   # callable() → dict
+        self.apply_payload = apply_payload   # callable(dict)
+        self.path = path
+        self.save_every = save_every
+        self._last_save = 0.0
+
+    def restore(self, account: tuple) -> bool:
+        t0 = time.perf_counter()
+        payload = load_snapshot(account, self.path)
+        if payload is None:
+            return False
+        try:
+            self.apply_payload(payload)
+        except Exception as e:
+            logger.warning(f"♨️ Warm start descartado: {e}")
+            return False
+        logger.success(f"♨️ Warm start: snapshot restaurado en {(time.perf_counter() - t0) * 1000:.0f} ms")
+        return True
+
+    def save(self, account: tuple):
+        try:
+            save_snapshot(self.build_payload(), account, self.path)
+            self._last_save = time.time()
+        except Exception as e:
+            logger.error(f"Error guardando warm start: {e}")
+
+    def maybe_save(self, account: tuple):
+        if time.time() - self._last_save >= self.save_every:
+            self.save(account)